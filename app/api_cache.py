@@ -0,0 +1,112 @@
+# app/api_cache.py — cache persistente (SQLite) delle risposte API-Football
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Any, Optional
+
+NO_CACHE = 0      # non salvare
+FOREVER = -1      # mai scadere (es. fixture concluse)
+
+FINISHED = ("FT", "AET", "PEN")
+NOT_STARTED = ("NS", "TBD")
+
+DEFAULT_ODDS_TTL = 600            # /odds: le quote pre-match cambiano, pochi minuti
+DEFAULT_FIXTURES_DATE_TTL = 600   # /fixtures?date= con partite non ancora concluse
+DEFAULT_TEAM_LAST_TTL = 6 * 3600  # /fixtures?team=&last= cambia solo quando la squadra gioca
+DEFAULT_NS_BY_ID_TTL = 120        # /fixtures?id= non iniziata (poi serve il dato live)
+
+def cache_key(path: str, params: Dict[str, Any]) -> str:
+    """path + parametri normalizzati (ordinati, valori stringa): stessa richiesta → stessa chiave."""
+    norm = "&".join(f"{k}={params[k]}" for k in sorted(params))
+    return f"{path}?{norm}"
+
+def pruned_key(path: str, params: Dict[str, Any]) -> str:
+    """Chiave dei body ridotti in streaming (_get_streamed): mai mescolati con le risposte intere."""
+    return cache_key(path, params) + "#pruned"
+
+def request_cacheable(path: str, params: Dict[str, Any]) -> bool:
+    """Filtro PRIMA della chiamata: il live non passa mai dalla cache."""
+    if "live" in params:
+        return False
+    return path in ("/odds", "/fixtures")
+
+def _statuses(js: Dict[str, Any]):
+    return [((fx.get("fixture") or {}).get("status") or {}).get("short") or "" for fx in (js.get("response") or [])]
+
+class ResponseCache:
+    """
+    Key/value su SQLite con scadenza per-endpoint.
+    TTL decisi da ttl_for() guardando endpoint, parametri e stato delle fixture:
+    - /fixtures tutte concluse (FT/AET/PEN) per id/ids/date → non scadono mai
+    - /fixtures?team=&last= → qualche ora
+    - /fixtures?league=&season= (anche from/to) → pochi minuti: l'elenco cresce
+    - /fixtures?id= non iniziata → pochi minuti; in corso → non salvata
+    - /odds → odds_ttl secondi
+    - live=all, /fixtures/events, ecc. → mai in cache
+    Thread-safe (un lock attorno all'unica connessione).
+    """
+
+    def __init__(self, path: str, odds_ttl: int = DEFAULT_ODDS_TTL):
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.odds_ttl = int(odds_ttl)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS api_cache (
+                  k TEXT PRIMARY KEY,
+                  body BLOB NOT NULL,
+                  expires_at REAL NULL
+                )""")
+            self._db.execute("DELETE FROM api_cache WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+            self._db.commit()
+
+    def ttl_for(self, path: str, params: Dict[str, Any], js: Dict[str, Any]) -> int:
+        if not request_cacheable(path, params):
+            return NO_CACHE
+        if js.get("errors"):
+            return NO_CACHE
+        if path == "/odds":
+            return self.odds_ttl
+        sts = _statuses(js)
+        if "team" in params:
+            return DEFAULT_TEAM_LAST_TTL
+        if "league" in params:
+            # elenco di lega/stagione: tutte chiuse ma l'elenco cresce (sync FixtureStore)
+            return DEFAULT_FIXTURES_DATE_TTL
+        if sts and all(st in FINISHED for st in sts):
+            return FOREVER
+        if "id" in params or "ids" in params:
+            return DEFAULT_NS_BY_ID_TTL if sts and all(st in NOT_STARTED for st in sts) else NO_CACHE
+        if "date" in params:
+            return DEFAULT_FIXTURES_DATE_TTL
+        return NO_CACHE
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT body, expires_at FROM api_cache WHERE k=?", (key,)).fetchone()
+        if not row:
+            return None
+        body, exp = row
+        if exp is not None and exp < time.time():
+            return None
+        try:
+            return json.loads(zlib.decompress(body))
+        except Exception:
+            return None
+
+    def put(self, key: str, js: Dict[str, Any], ttl: int):
+        if ttl == NO_CACHE:
+            return
+        exp = None if ttl == FOREVER else time.time() + ttl
+        body = zlib.compress(json.dumps(js, separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO api_cache (k, body, expires_at) VALUES (?,?,?)", (key, body, exp))
+            self._db.commit()
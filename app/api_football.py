@@ -1,58 +1,330 @@
 # app/api_football.py — aggiunti live_fixtures() e fixture_by_id()
-import requests
-from typing import Dict, Any, List
+from __future__ import annotations
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Iterable, List, Iterator, Tuple, Set
 from dateutil import parser as duparser
 from datetime import timezone
 
+import requests
+
+from .http_session import build_session, DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE
+from .api_cache import ResponseCache, cache_key, pruned_key, request_cacheable, DEFAULT_ODDS_TTL
+from .rate_limiter import RateScheduler, priority_for
+from .jobs import current_job, bind_job
+from .leagues import allowed_league
+from .json_stream import JSONObjectStream
+from .singleflight import SingleFlight
+from .cassette import Cassette, MODE_LIVE
+from .telemetry import metrics, endpoint_label, SRC_NET, SRC_HIT, SRC_REPLAY, SRC_ERROR
+from .records import OddsEntry, Markets
+from .markets import configure_markets, active_markets, bet_group, label_market
+
 BET365_ID = 8
 MIN_VALID_ODD = 1.06
+IDS_BATCH = 20  # max id per /fixtures?ids=
+SNAPSHOT_DATES = 3  # snapshot quote tenuti in RAM (oggi/domani + margine)
 
-REQUIRED_MARKETS = (
-    "1","X","2",
-    "1X","12","X2",
-    "Over 0.5","Over 1.5","Over 2.5",
-    "Under 2.5","Under 3.5",
-    "Gol","No Gol"
-)
-
-_EXCLUDE_PARTIAL = ("half", "period", "1st", "2nd", "first half", "second half")
+STREAM_CHUNK = 64 * 1024
+RETRIES = 3  # tentativi per richiesta, solo su errori transitori (vedi _request)
+_TRANSIENT = (requests.Timeout, requests.ConnectionError, requests.exceptions.ChunkedEncodingError)
 
 class APIFootball:
-    def __init__(self, api_key: str, tz: str = "Europe/Rome"):
+    def __init__(self, api_key: str, tz: str = "Europe/Rome",
+                 pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 cache_path: str | None = None, odds_ttl: int = DEFAULT_ODDS_TTL,
+                 rate_per_minute: int = 30, daily_reserve: int = 100,
+                 page_workers: int = 4, fallback_workers: int = 8,
+                 extra_markets: str | None = None,
+                 api_mode: str = MODE_LIVE, cassette_path: str | None = None):
         self.base = "https://v3.football.api-sports.io"
         self.headers = {"x-apisports-key": api_key}
         self.tz = tz
+        if extra_markets:
+            configure_markets(extra_markets)
+        # una sola Session keep-alive condivisa da tutti i thread che usano questa istanza
+        self.session = build_session(pool_connections, pool_maxsize, headers=self.headers)
+        # cache su disco: sopravvive a restart, /regen e /plan → /plan_publish
+        self.cache = ResponseCache(cache_path, odds_ttl=odds_ttl) if cache_path else None
+        # scheduler centrale: ogni richiesta HTTP reale prende un token (priorità dal job corrente)
+        self.limiter = RateScheduler(per_minute=rate_per_minute, daily_reserve=daily_reserve)
+        metrics.watch_limiter("api", self.limiter)
+        self.page_workers = max(1, int(page_workers))
+        self.fallback_workers = max(1, int(fallback_workers))
+        # snapshot quote per data: fixture_id → (lastUpdate bookmaker, entry normalizzata)
+        self._snapshots: Dict[str, Dict[int, Tuple[str, OddsEntry]]] = {}
+        self._snap_lock = threading.Lock()
+        # candidati di value_builder per data (fixture → (entry, candidati)), limitati come gli snapshot
+        self._day_cands: Dict[str, Dict[int, Tuple[OddsEntry, List[Any]]]] = {}
+        # richieste/crawl identici in volo da più thread → una sola esecuzione condivisa
+        self._flight = SingleFlight()
+        # record/replay su cassetta (profilazione offline); live = solo rete
+        self.cassette = Cassette(cassette_path, api_mode) if api_mode != MODE_LIVE and cassette_path else None
 
     def _get(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
         if "timezone" not in params:
             params["timezone"] = self.tz
-        r = requests.get(f"{self.base}{path}", params=params, headers=self.headers, timeout=25)
-        if not r.ok:
-            raise RuntimeError(f"API-Football error {r.status_code}: {r.text}")
-        return r.json()
+        key = cache_key(path, params)
+        return self._flight.do(("get", key), lambda: self._recorded(key, self._fetch(path, params)))
+
+    def _recorded(self, key: str, js: Dict[str, Any]) -> Dict[str, Any]:
+        if self.cassette is not None and self.cassette.recording:
+            self.cassette.record(key, js)
+        return js
+
+    def _fetch(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        t0 = time.perf_counter(); ep = endpoint_label(path, params)
+        replaying = self.cassette is not None and self.cassette.replaying
+        # in replay la cassetta è l'unica sorgente: niente letture (replay deterministico)
+        # né scritture (i dati registrati non finiscono nella cache di produzione)
+        cacheable = self.cache is not None and not replaying and request_cacheable(path, params)
+        if cacheable:
+            key = cache_key(path, params)
+            hit = self.cache.get(key)
+            if hit is not None:
+                metrics.observe("api", ep, t0, SRC_HIT)
+                return hit
+        if replaying:
+            js = self.cassette.play(cache_key(path, params))
+            metrics.observe("api", ep, t0, SRC_REPLAY)
+        else:
+            nbytes = [0]
+            def read(r):
+                nbytes[0] += len(r.content)
+                return r.json()
+            try:
+                js = self._request(path, params, read)
+            except Exception:
+                metrics.observe("api", ep, t0, SRC_ERROR, nbytes[0])
+                raise
+            metrics.observe("api", ep, t0, SRC_NET, nbytes[0])
+        if cacheable:
+            self.cache.put(key, js, self.cache.ttl_for(path, params, js))
+        return js
+
+    def _request(self, path: str, params: Dict[str, Any], read, stream: bool = False) -> Dict[str, Any]:
+        """
+        HTTP reale, con l'UNICO livello di retry: un token dallo scheduler per tentativo, header rate-limit,
+        al massimo RETRIES tentativi e solo per errori transitori (429 o errors.rateLimit, 5xx, timeout e
+        connessione). Un 4xx è definitivo: RuntimeError subito, senza spendere altra quota. read(r) → body.
+        """
+        prio = priority_for(current_job())
+        for attempt in range(RETRIES):
+            last = attempt == RETRIES - 1
+            self.limiter.acquire(prio)
+            try:
+                r = self.session.get(f"{self.base}{path}", params=params, timeout=25, stream=stream)
+                try:
+                    self.limiter.update_from_headers(r.headers)
+                    if r.status_code == 429 and not last:
+                        self.limiter.on_rate_limited(r.headers.get("Retry-After"))
+                        continue
+                    if r.status_code >= 500 and not last:
+                        time.sleep(1.0 * (attempt + 1))
+                        continue
+                    if not r.ok:
+                        raise RuntimeError(f"API-Football error {r.status_code}: {r.text}")
+                    js = read(r)
+                finally:
+                    r.close()
+            except _TRANSIENT:
+                if last:
+                    raise
+                time.sleep(1.0 * (attempt + 1))
+                continue
+            if self._rate_limited_body(js) and not last:
+                self.limiter.on_rate_limited(r.headers.get("Retry-After"))
+                continue
+            return js
+
+    @staticmethod
+    def _rate_limited_body(js: Dict[str, Any]) -> bool:
+        # API-Football segnala il limite al minuto anche con HTTP 200 + errors.rateLimit
+        errs = js.get("errors")
+        return isinstance(errs, dict) and "rateLimit" in errs
+
+    def _get_streamed(self, path: str, params: Dict[str, Any], keep) -> Dict[str, Any]:
+        """
+        Come _get ma decodifica la risposta in streaming: ogni elemento di "response"
+        passa da keep(item) → item ridotto o None, e solo i ridotti restano in memoria
+        (e in cache). Le altre chiavi (paging, errors) arrivano intatte.
+        """
+        if "timezone" not in params:
+            params["timezone"] = self.tz
+        key = cache_key(path, params)
+        return self._flight.do(("stream", key), lambda: self._recorded(key, self._fetch_streamed(path, params, keep)))
+
+    def _fetch_streamed(self, path: str, params: Dict[str, Any], keep) -> Dict[str, Any]:
+        t0 = time.perf_counter(); ep = endpoint_label(path, params)
+        replaying = self.cassette is not None and self.cassette.replaying
+        # come _fetch: in replay niente cache
+        cacheable = self.cache is not None and not replaying and request_cacheable(path, params)
+        if cacheable:
+            key = pruned_key(path, params)  # body ridotto: chiave sua, _get della stessa richiesta resta intero
+            hit = self.cache.get(key)
+            if hit is not None:
+                hit["response"] = [x for x in (keep(e) for e in (hit.get("response") or [])) if x]
+                metrics.observe("api", ep, t0, SRC_HIT)
+                return hit
+        if replaying:
+            doc = JSONObjectStream(self.cassette.play_chunks(cache_key(path, params), STREAM_CHUNK), array_key="response")
+            items = [x for x in (keep(e) for e in doc.items()) if x]
+            js = dict(doc.meta); js["response"] = items
+            metrics.observe("api", ep, t0, SRC_REPLAY)
+            return js
+        nbytes = [0]
+        def counted(chunks):
+            for c in chunks:
+                nbytes[0] += len(c)
+                yield c
+        def read(r):
+            doc = JSONObjectStream(counted(r.iter_content(STREAM_CHUNK)), array_key="response")
+            items = [x for x in (keep(e) for e in doc.items()) if x]
+            js = dict(doc.meta); js["response"] = items
+            return js
+        try:
+            js = self._request(path, params, read, stream=True)
+        except Exception:
+            metrics.observe("api", ep, t0, SRC_ERROR, nbytes[0])
+            raise
+        metrics.observe("api", ep, t0, SRC_NET, nbytes[0])
+        if cacheable:
+            self.cache.put(key, js, self.cache.ttl_for(path, params, js))
+        return js
+
+    def _get_page(self, path: str, base_params: Dict[str, Any], page: int) -> Dict[str, Any]:
+        """Una pagina; i retry (solo errori transitori) sono tutti in _request."""
+        params = dict(base_params); params["page"] = page
+        return self._get(path, params)
 
     def _get_paged(self, path: str, base_params: Dict[str, Any]) -> List[Dict]:
-        page = 1
-        out: List[Dict] = []
-        while True:
-            params = dict(base_params); params["page"] = page
-            js = self._get(path, params)
-            resp = js.get("response", []) or []
-            out.extend(resp)
-            paging = js.get("paging", {}) or {}
-            cur = int(paging.get("current") or page)
-            tot = int(paging.get("total") or page)
-            if cur >= tot:
-                break
-            page += 1
+        # la prima pagina dice paging.total: le restanti vanno in parallelo (pool limitato)
+        first = self._get_page(path, base_params, 1)
+        out: List[Dict] = list(first.get("response", []) or [])
+        paging = first.get("paging", {}) or {}
+        tot = int(paging.get("total") or 1)
+        if tot <= 1:
+            return out
+        fetch = bind_job(lambda p: self._get_page(path, base_params, p))
+        with ThreadPoolExecutor(max_workers=min(self.page_workers, tot - 1)) as ex:
+            # map() restituisce i risultati nell'ordine delle pagine
+            for js in ex.map(fetch, range(2, tot + 1)):
+                out.extend(js.get("response", []) or [])
         return out
 
+    def _get_odds_page(self, base_params: Dict[str, Any], page: int) -> Dict[str, Any]:
+        params = dict(base_params); params["page"] = page
+        return self._get_streamed("/odds", params, self._prune_odds_item)
+
+    def _iter_odds_pages(self, date: str) -> Iterator[List[Dict]]:
+        """
+        Pagine /odds?date= già ridotte ai soli mercati che mappiamo, una alla volta
+        (in ordine). Le pagine successive alla prima vanno in parallelo come _get_paged.
+        """
+        base = {"date": date, "bookmaker": BET365_ID}
+        first = self._get_odds_page(base, 1)
+        yield first.get("response", []) or []
+        tot = int((first.get("paging", {}) or {}).get("total") or 1)
+        if tot <= 1:
+            return
+        fetch = bind_job(lambda p: self._get_odds_page(base, p))
+        ex = ThreadPoolExecutor(max_workers=min(self.page_workers, tot - 1))
+        try:
+            for js in ex.map(fetch, range(2, tot + 1)):
+                yield js.get("response", []) or []
+        finally:
+            ex.shutdown(wait=False, cancel_futures=True)
+
     def odds_by_date_bet365(self, date: str) -> List[Dict]:
-        return self._get_paged("/odds", {"date": date, "bookmaker": BET365_ID})
+        return [e for page in self._iter_odds_pages(date) for e in page]
+
+    def iter_odds_entries_bet365(self, date: str) -> Iterator[OddsEntry]:
+        """Entry normalizzate pagina per pagina: memoria piatta anche con giornate piene."""
+        res = _IndexResolver(self)
+        for group in res.resolved(self._iter_odds_pages(date)):
+            yield from self.parse_with_index(group, res.index)
 
     def fixtures_by_date(self, date: str) -> List[Dict]:
         return self._get_paged("/fixtures", {"date": date})
 
+    def fixtures_by_ids(self, fixture_ids: List[int]) -> List[Dict]:
+        """/fixtures?ids=a-b-c: API-Football accetta al massimo 20 id per chiamata."""
+        out: List[Dict] = []
+        ids = [int(x) for x in fixture_ids]
+        for i in range(0, len(ids), IDS_BATCH):
+            chunk = ids[i:i + IDS_BATCH]
+            js = self._get("/fixtures", {"ids": "-".join(str(x) for x in chunk)})
+            out.extend(js.get("response", []) or [])
+        return out
+
+    @staticmethod
+    def _index_fixtures(fixtures: List[Dict], index: Dict[int, Dict[str, Any]]):
+        for fx in fixtures:
+            fid = int(((fx.get("fixture") or {}).get("id")) or 0)
+            if not fid:
+                continue
+            teams = fx.get("teams") or {}
+            index[fid] = {
+                "home": (teams.get("home") or {}).get("name"),
+                "away": (teams.get("away") or {}).get("name"),
+                "home_id": (teams.get("home") or {}).get("id"),
+                "away_id": (teams.get("away") or {}).get("id"),
+                "league": fx.get("league") or {},
+            }
+
+    def fixture_index(self, fixture_ids: List[int], date: str | None = None) -> Dict[int, Dict[str, Any]]:
+        """
+        fixture_id → {"home","away","home_id","away_id","league"} per risolvere i placeholder Home/Away in O(1).
+        Con tanti id e la data nota basta UNA /fixtures?date=; gli id mancanti
+        (o pochi id) vanno a blocchi da 20 con ids=. Errori → indice parziale.
+        """
+        index: Dict[int, Dict[str, Any]] = {}
+        if not fixture_ids:
+            return index
+        if date and len(fixture_ids) > IDS_BATCH:
+            try:
+                self._index_fixtures(self.fixtures_by_date(date), index)
+            except Exception:
+                pass
+        missing = [f for f in fixture_ids if f not in index]
+        if missing:
+            try:
+                self._index_fixtures(self.fixtures_by_ids(missing), index)
+            except Exception:
+                pass
+        return index
+
+    @staticmethod
+    def _ids_of(obj: Dict[str, Any], league: Dict[str, Any], known: Dict[str, Any] | None) -> Dict[str, int]:
+        """league_id/season/home_id/away_id dell'entry; le squadre (assenti in /odds) dall'indice fixture."""
+        fixture = obj.get("fixture", {}) or {}
+        teams = obj.get("teams") or (fixture.get("teams") or {})
+        known = known or {}
+        return {
+            "league_id": int(league.get("id") or 0),
+            "season": int(league.get("season") or 0),
+            "home_id": int((teams.get("home") or {}).get("id") or known.get("home_id") or 0),
+            "away_id": int((teams.get("away") or {}).get("id") or known.get("away_id") or 0),
+        }
+
+    @staticmethod
+    def _names_of(obj: Dict[str, Any]):
+        fixture = obj.get("fixture", {}) or {}
+        teams = obj.get("teams") or (fixture.get("teams") or {})
+        return (teams.get("home") or {}).get("name"), (teams.get("away") or {}).get("name")
+
+    @staticmethod
+    def _bad_fixture_ids(objs: List[Dict]) -> List[int]:
+        out = []
+        for o in objs:
+            fid = int(((o.get("fixture") or {}).get("id")) or 0)
+            home, away = APIFootball._names_of(o)
+            if fid and (APIFootball._bad_team_name(home) or APIFootball._bad_team_name(away)):
+                out.append(fid)
+        return out
+
     def odds_by_fixture_bet365(self, fixture_id: int) -> List[Dict]:
         js = self._get("/odds", {"fixture": fixture_id, "bookmaker": BET365_ID})
         return js.get("response", []) or []
@@ -81,8 +353,23 @@ class APIFootball:
             out[key] = x
 
     @staticmethod
-    def _is_partial(name: str) -> bool:
-        return any(tok in name for tok in _EXCLUDE_PARTIAL)
+    def _kept_bet(raw_name: str) -> bool:
+        return bet_group(raw_name or "") is not None
+
+    @staticmethod
+    def _prune_odds_item(e: Dict) -> Dict | None:
+        """Entry /odds ridotta al primo bookmaker e alle sole scommesse mappate dal registro mercati (standard + extra)."""
+        bms = e.get("bookmakers", []) or []
+        if not bms:
+            return None
+        bm = bms[0]
+        bets = [b for b in (bm.get("bets", []) or []) if APIFootball._kept_bet(b.get("name", ""))]
+        if not bets:
+            return None
+        out = {k: v for k, v in e.items() if k != "bookmakers"}
+        out["bookmakers"] = [{k: v for k, v in bm.items() if k != "bets"}]
+        out["bookmakers"][0]["bets"] = bets
+        return out
 
     @staticmethod
     def _bad_team_name(name: str) -> bool:
@@ -98,47 +385,27 @@ class APIFootball:
 
     @staticmethod
     def _parse_market_block(bets: List[Dict]) -> Dict[str, float]:
+        # registro compilato (app/markets.py): un lookup per nome scommessa, uno per etichetta
         out: Dict[str, float] = {}
+        put = APIFootball._put
         for bet in bets:
-            raw_name = (bet.get("name","") or "")
-            name = raw_name.lower().strip()
-            vals = bet.get("values", []) or []
-
-            if APIFootball._is_partial(name):
+            group = bet_group(bet.get("name","") or "")
+            if group is None:
                 continue
+            for v in bet.get("values", []) or []:
+                key = label_market(group, v.get("value","") or "")
+                if key is not None:
+                    put(out, key, v.get("odd"))
+        return {k: out[k] for k in active_markets() if k in out}
+
+    def parse_odds_entries(self, entries: List[Dict], date: str | None = None) -> List[OddsEntry]:
+        # /odds spesso non porta i nomi squadra: un solo indice per tutte le entry (no N+1)
+        index = self.fixture_index(self._bad_fixture_ids(entries), date=date)
+        return self.parse_with_index(entries, index)
 
-            if name == "match winner" or name == "winner":
-                for v in vals:
-                    val = (v.get("value","") or "").lower(); odd = v.get("odd")
-                    if val.startswith("home") or val == "1": APIFootball._put(out, "1", odd)
-                    elif val.startswith("away") or val == "2": APIFootball._put(out, "2", odd)
-                    elif val.startswith("draw") or val == "x": APIFootball._put(out, "X", odd)
-
-            elif name == "double chance":
-                for v in vals:
-                    lab = (v.get("value","") or "").lower(); odd = v.get("odd")
-                    if "home/draw" in lab or lab in ("1x","home or draw"): APIFootball._put(out, "1X", odd)
-                    elif "home/away" in lab or lab == "12" or "home or away" in lab: APIFootball._put(out, "12", odd)
-                    elif "draw/away" in lab or lab in ("x2","draw or away","away or draw"): APIFootball._put(out, "X2", odd)
-
-            elif name in ("goals over/under", "total"):
-                for v in vals:
-                    lab = (v.get("value","") or "").lower().replace(" ", ""); odd = v.get("odd")
-                    if lab in ("over0.5","o0.5"): APIFootball._put(out, "Over 0.5", odd)
-                    elif lab in ("over1.5","o1.5"): APIFootball._put(out, "Over 1.5", odd)
-                    elif lab in ("over2.5","o2.5"): APIFootball._put(out, "Over 2.5", odd)
-                    elif lab in ("under2.5","u2.5"): APIFootball._put(out, "Under 2.5", odd)
-                    elif lab in ("under3.5","u3.5"): APIFootball._put(out, "Under 3.5", odd)
-
-            elif name in ("both teams to score", "goal/no goal"):
-                for v in vals:
-                    lab = (v.get("value","") or "").lower(); odd = v.get("odd")
-                    if "yes" in lab: APIFootball._put(out, "Gol", odd)
-                    elif "no"  in lab: APIFootball._put(out, "No Gol", odd)
-
-        return {k: out[k] for k in REQUIRED_MARKETS if k in out}
-
-    def parse_odds_entries(self, entries: List[Dict]) -> List[Dict]:
+    @staticmethod
+    def parse_with_index(entries: List[Dict], index: Dict[int, Dict[str, Any]]) -> List[OddsEntry]:
+        """Parsing puro (nessuna chiamata HTTP): i nomi mancanti arrivano da `index`."""
         out = []
         for e in entries:
             fixture = e.get("fixture", {}) or {}
@@ -149,29 +416,21 @@ class APIFootball:
             if not fid:
                 continue
 
-            teams = e.get("teams") or (fixture.get("teams") or {})
-            home = ((teams.get("home") or {}).get("name"))
-            away = ((teams.get("away") or {}).get("name"))
-            if self._bad_team_name(home) or self._bad_team_name(away):
-                try:
-                    fx = self._get("/fixtures", {"id": fid}).get("response", []) or []
-                    if fx:
-                        fteams = (fx[0].get("teams") or {})
-                        home = ((fteams.get("home") or {}).get("name")) or home
-                        away = ((fteams.get("away") or {}).get("name")) or away
-                except Exception:
-                    pass
+            home, away = APIFootball._names_of(e)
+            if (APIFootball._bad_team_name(home) or APIFootball._bad_team_name(away)) and fid in index:
+                home = index[fid]["home"] or home
+                away = index[fid]["away"] or away
 
             # Se non riusciamo a recuperare i nomi reali, scartiamo la entry:
             # meglio non pubblicare un messaggio incompleto (Home/Away).
-            if self._bad_team_name(home) or self._bad_team_name(away):
+            if APIFootball._bad_team_name(home) or APIFootball._bad_team_name(away):
                 continue
 
             bookmakers = e.get("bookmakers", []) or []
             if not bookmakers: continue
             bm = bookmakers[0]
             bets = bm.get("bets", []) or []
-            markets = self._parse_market_block(bets)
+            markets = APIFootball._parse_market_block(bets)
             if not markets: continue
 
             lu = bm.get("lastUpdate"); upd = ""
@@ -182,77 +441,230 @@ class APIFootball:
                 except Exception:
                     upd = ""
 
-            out.append({
-                "fixture_id": fid,
-                "kickoff_iso": kickoff_iso,
-                "league_country": (league.get("country","") or ""),
-                "league_name": (league.get("name","") or ""),
-                "home": home,
-                "away": away,
-                "markets": markets,
-                "last_update": upd
-            })
+            out.append(OddsEntry(
+                fixture_id=fid,
+                kickoff_iso=kickoff_iso,
+                league_country=(league.get("country","") or ""),
+                league_name=(league.get("name","") or ""),
+                home=home,
+                away=away,
+                markets=Markets.from_dict(markets),
+                last_update=upd,
+                **APIFootball._ids_of(e, league, index.get(fid))
+            ))
         return out
 
-    def entries_by_date_bet365(self, date: str) -> List[Dict]:
-        odds_entries = self.odds_by_date_bet365(date)
-        parsed_from_odds = self.parse_odds_entries(odds_entries)
-        if parsed_from_odds:
-            return parsed_from_odds
+    def _fixture_odds_entry(self, fx: Dict, home: str, away: str) -> OddsEntry | None:
+        """Fallback per-fixture: /odds?fixture= → entry normalizzata (None se niente quote)."""
+        fid = int(((fx.get("fixture") or {}).get("id")) or 0)
+        return self._entry_from_fixture_odds(fx, home, away, self.odds_by_fixture_bet365(fid))
 
-        fixtures = self.fixtures_by_date(date)
-        out = []
-        for fx in fixtures:
-            fixture = fx.get("fixture", {}) or {}
-            league = fx.get("league", {}) or {}
-            fid = int(fixture.get("id") or 0)
-            if not fid: continue
+    @staticmethod
+    def _entry_from_fixture_odds(fx: Dict, home: str, away: str, oresp: List[Dict]) -> OddsEntry | None:
+        fixture = fx.get("fixture", {}) or {}
+        league = fx.get("league", {}) or {}
+        fid = int(fixture.get("id") or 0)
+        kickoff_iso = fixture.get("date") or ""
+
+        bookmakers = []
+        for e in oresp:
+            for bm in (e.get("bookmakers") or []):
+                bookmakers = [bm]; break
+            if bookmakers: break
+        if not bookmakers: return None
+
+        markets = APIFootball._parse_market_block(bookmakers[0].get("bets", []) or [])
+        if not markets: return None
+
+        lu = bookmakers[0].get("lastUpdate"); upd = ""
+        if lu:
+            try:
+                ts = duparser.isoparse(lu)
+                upd = ts.astimezone(timezone.utc).strftime("%H:%M")
+            except Exception:
+                upd = ""
+
+        return OddsEntry(
+            fixture_id=fid,
+            kickoff_iso=kickoff_iso,
+            league_country=(league.get("country","") or ""),
+            league_name=(league.get("name","") or ""),
+            home=home,
+            away=away,
+            markets=Markets.from_dict(markets),
+            last_update=upd,
+            **APIFootball._ids_of(fx, league, None)
+        )
 
-            teams = fx.get("teams") or (fixture.get("teams") or {})
-            home = ((teams.get("home") or {}).get("name"))
-            away = ((teams.get("away") or {}).get("name"))
+    @staticmethod
+    def _allowed_fixtures(fixtures: List[Dict]) -> List[Dict]:
+        # whitelist PRIMA di spendere una chiamata quote per fixture
+        return [fx for fx in fixtures
+                if allowed_league((fx.get("league") or {}).get("country", ""), (fx.get("league") or {}).get("name", ""))]
 
-            if self._bad_team_name(home) or self._bad_team_name(away):
-                try:
-                    fx_det = self._get("/fixtures", {"id": fid}).get("response", []) or []
-                    if fx_det:
-                        fteams = (fx_det[0].get("teams") or {})
-                        home = ((fteams.get("home") or {}).get("name")) or home
-                        away = ((fteams.get("away") or {}).get("name")) or away
-                except Exception:
-                    pass
+    @staticmethod
+    def _fallback_todo(fixtures: List[Dict], index: Dict[int, Dict[str, Any]]) -> List[Tuple[int, Dict, str, str]]:
+        """(posizione, fixture, home, away) per le fixture con nomi reali."""
+        todo = []
+        for pos, fx in enumerate(fixtures):
+            fid = int(((fx.get("fixture") or {}).get("id")) or 0)
+            if not fid: continue
 
-            if self._bad_team_name(home) or self._bad_team_name(away):
-                continue
-            kickoff_iso = fixture.get("date") or ""
+            home, away = APIFootball._names_of(fx)
+            if (APIFootball._bad_team_name(home) or APIFootball._bad_team_name(away)) and fid in index:
+                home = index[fid]["home"] or home
+                away = index[fid]["away"] or away
 
-            oresp = self.odds_by_fixture_bet365(fid)
-            bookmakers = []
-            for e in oresp:
-                for bm in (e.get("bookmakers") or []):
-                    bookmakers = [bm]; break
-                if bookmakers: break
-            if not bookmakers: continue
+            if APIFootball._bad_team_name(home) or APIFootball._bad_team_name(away):
+                continue
+            todo.append((pos, fx, home, away))
+        return todo
 
-            markets = self._parse_market_block(bookmakers[0].get("bets", []) or [])
-            if not markets: continue
+    def _iter_fallback(self, date: str, only_allowed: bool = True) -> Iterator[Tuple[int, OddsEntry]]:
+        """(posizione, entry) man mano che le /odds?fixture= completano."""
+        fixtures = self.fixtures_by_date(date)
+        if only_allowed:
+            fixtures = self._allowed_fixtures(fixtures)
+        index = self.fixture_index(self._bad_fixture_ids(fixtures))
+        todo = self._fallback_todo(fixtures, index)
+        if not todo:
+            return
 
-            lu = bookmakers[0].get("lastUpdate"); upd = ""
-            if lu:
+        work = bind_job(self._fixture_odds_entry)
+        ex = ThreadPoolExecutor(max_workers=min(self.fallback_workers, len(todo)))
+        try:
+            futs = {ex.submit(work, fx, home, away): pos for pos, fx, home, away in todo}
+            for f in as_completed(futs):
                 try:
-                    ts = duparser.isoparse(lu)
-                    upd = ts.astimezone(timezone.utc).strftime("%H:%M")
+                    entry = f.result()
                 except Exception:
-                    upd = ""
+                    continue  # una fixture in errore non blocca la giornata
+                if entry:
+                    yield futs[f], entry
+        finally:
+            ex.shutdown(wait=False, cancel_futures=True)
 
-            out.append({
-                "fixture_id": fid,
-                "kickoff_iso": kickoff_iso,
-                "league_country": (league.get("country","") or ""),
-                "league_name": (league.get("name","") or ""),
-                "home": home,
-                "away": away,
-                "markets": markets,
-                "last_update": upd
-            })
-        return out
+    def iter_entries_by_fixture_bet365(self, date: str, only_allowed: bool = True) -> Iterator[OddsEntry]:
+        """Fallback in streaming: entry nell'ordine di completamento (non di calendario)."""
+        for _, entry in self._iter_fallback(date, only_allowed=only_allowed):
+            yield entry
+
+    @staticmethod
+    def _raw_last_update(e: Dict) -> str:
+        # /odds mette il timestamp su entry["update"]; alcuni payload anche sul bookmaker
+        bms = e.get("bookmakers", []) or []
+        return ((bms[0].get("lastUpdate") if bms else None) or e.get("update") or "")
+
+    def refresh_odds_snapshot(self, date: str) -> Tuple[List[OddsEntry], Set[int]]:
+        """
+        Aggiorna lo snapshot quote della data e ritorna (entries, fixture cambiate).
+        Si ri-parsano (e si risolvono i nomi) SOLO le fixture il cui blocco Bet365
+        ha un lastUpdate diverso dal giro precedente; le altre riusano l'entry già pronta.
+        """
+        with self._snap_lock:
+            prev = self._snapshots.get(date, {})
+
+        merged: Dict[int, Tuple[str, OddsEntry]] = {}
+        order: List[int] = []
+        changed: Set[int] = set()
+        lu_by_fid: Dict[int, str] = {}
+
+        def stale_pages():
+            for page in self._iter_odds_pages(date):
+                stale: List[Dict] = []
+                for e in page:
+                    fid = int(((e.get("fixture") or {}).get("id")) or 0)
+                    if not fid:
+                        continue
+                    lu = self._raw_last_update(e)
+                    order.append(fid)
+                    old = prev.get(fid)
+                    if lu and old and old[0] == lu:
+                        merged[fid] = old
+                    else:
+                        stale.append(e); lu_by_fid[fid] = lu
+                yield stale
+
+        res = _IndexResolver(self)
+        for group in res.resolved(stale_pages()):
+            for entry in self.parse_with_index(group, res.index):
+                fid = entry["fixture_id"]
+                merged[fid] = (lu_by_fid.get(fid, ""), entry)
+                changed.add(fid)
+
+        with self._snap_lock:
+            self._snapshots[date] = merged
+            while len(self._snapshots) > SNAPSHOT_DATES:
+                self._snapshots.pop(next(iter(self._snapshots)))
+
+        seen: Set[int] = set(); entries: List[OddsEntry] = []
+        for fid in order:
+            if fid in merged and fid not in seen:
+                seen.add(fid); entries.append(merged[fid][1])
+        return entries, changed
+
+    def day_candidates(self, date: str) -> Dict[int, Tuple[OddsEntry, List[Any]]]:
+        """Candidati per fixture dell'ultimo build_daily_candidates della data ({} se mai calcolati)."""
+        with self._snap_lock:
+            return self._day_cands.get(date, {})
+
+    def store_day_candidates(self, date: str, by_fix: Dict[int, Tuple[OddsEntry, List[Any]]]):
+        with self._snap_lock:
+            self._day_cands.pop(date, None)
+            self._day_cands[date] = by_fix
+            while len(self._day_cands) > SNAPSHOT_DATES:
+                self._day_cands.pop(next(iter(self._day_cands)))
+
+    def entries_by_date_bet365(self, date: str) -> List[OddsEntry]:
+        return self.entries_with_changes_bet365(date)[0]
+
+    def entries_with_changes_bet365(self, date: str) -> Tuple[List[OddsEntry], Set[int]]:
+        """
+        (entries, fixture cambiate dal giro precedente): chi tiene risultati per fixture
+        può ricalcolare solo quelle in `changed`. Col fallback per fixture sono tutte nuove.
+        """
+        # 08:00: watchlist + morning (+ magari /quote) chiedono la stessa giornata insieme
+        return self._flight.do(("entries", date), lambda: self._entries_by_date_bet365(date))
+
+    def _entries_by_date_bet365(self, date: str) -> Tuple[List[OddsEntry], Set[int]]:
+        parsed_from_odds, changed = self.refresh_odds_snapshot(date)
+        if parsed_from_odds:
+            return parsed_from_odds, changed
+
+        # fallback: quote per singola fixture, in parallelo; poi riordino come /fixtures
+        done = sorted(self._iter_fallback(date), key=lambda x: x[0])
+        entries = [entry for _, entry in done]
+        return entries, {e["fixture_id"] for e in entries}
+
+
+class _IndexResolver:
+    """
+    Indice nomi squadra per le pagine /odds in streaming. Una pagina ha al massimo 10 entry, meno dei
+    IDS_BATCH id di una /fixtures?ids=: le pagine si accodano finché un'altra farebbe superare il blocco,
+    poi UNA ids= per tutte (niente /fixtures?date=: la giornata non si carica intera). In attesa restano
+    al più ~IDS_BATCH entry; l'indice è in self.index.
+    """
+
+    def __init__(self, api: APIFootball):
+        self.api = api
+        self.index: Dict[int, Dict[str, Any]] = {}
+
+    def _resolve(self, missing: Dict[int, None]):
+        if missing:
+            self.index.update(self.api.fixture_index(list(missing)))
+
+    def resolved(self, pages: Iterable[List[Dict]]) -> Iterator[List[Dict]]:
+        """Le pagine in ordine, raggruppate: quando un gruppo esce, self.index copre tutte le sue entry."""
+        held: List[Dict] = []
+        missing: Dict[int, None] = {}
+        for page in pages:
+            new = [f for f in self.api._bad_fixture_ids(page) if f not in self.index and f not in missing]
+            if held and len(missing) + len(new) > IDS_BATCH:
+                self._resolve(missing)
+                yield held
+                held, missing = [], {}
+            held.extend(page)
+            missing.update(dict.fromkeys(new))
+        if held:
+            self._resolve(missing)
+            yield held
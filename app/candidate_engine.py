@@ -0,0 +1,145 @@
+# app/candidate_engine.py — candidati del giorno come matrice entry × mercati (NumPy), stesse formule di value_builder
+from __future__ import annotations
+from typing import Dict, Any, List, Sequence
+
+import numpy as np
+
+from .records import Candidate, Markets, league_label
+
+_NAN = float("nan")
+
+# statistiche squadra lette da _adj_market
+_FEATS = ("tot_avg", "btts", "cs", "over15", "over25", "under35", "form_pts_rate")
+
+def odds_matrix(entries: Sequence[Any], markets: Sequence[str]) -> np.ndarray:
+    """
+    Quote (E × M), NaN = mercato assente. Le Markets con lo stesso ordine di nomi si impilano
+    dai loro buffer array('d') senza passare dai float Python; il resto cella per cella.
+    """
+    E, M = len(entries), len(markets)
+    mks = [e["markets"] for e in entries]
+    names = getattr(mks[0], "names", None) if mks else None
+    if names is not None and all(isinstance(mk, Markets) and mk.names == names for mk in mks):
+        raw = np.frombuffer(b"".join(mk.vals.tobytes() for mk in mks), dtype=np.float64).reshape(E, len(names))
+        pos = {n: i for i, n in enumerate(names)}
+        out = np.full((E, M), _NAN)
+        for j, m in enumerate(markets):
+            if m in pos:
+                out[:, j] = raw[:, pos[m]]
+        return out
+    out = np.full((E, M), _NAN)
+    for i, mk in enumerate(mks):
+        for j, m in enumerate(markets):
+            v = mk.get(m)
+            if v is not None:
+                out[i, j] = float(v)
+    return out
+
+def _clamp(x, lo: float, hi: float):
+    # come stats_engine.clamp: lo se x < lo, hi se x > hi, altrimenti x
+    return np.where(x < lo, lo, np.where(x > hi, hi, x))
+
+def p_imp(odds: np.ndarray) -> np.ndarray:
+    """_p_imp vettoriale: 1/quota limitata a [0.01, 0.99], 0 per quote assenti o ≤ 1.001."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inv = 1.0 / odds
+    return np.where(odds > 1.001, _clamp(inv, 0.01, 0.99), 0.0)
+
+def _avg(a, b):
+    return (a + b) / 2.0
+
+def adjustments(markets: Sequence[str], P: np.ndarray, h: Dict[str, np.ndarray], a: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    _adj_market per tutte le celle: una colonna per mercato, con le stesse costanti e lo stesso
+    ordine delle operazioni (così i float coincidono al bit con il calcolo per cella).
+    """
+    col = {m: j for j, m in enumerate(markets)}
+    p1 = P[:, col["1"]]; p2 = P[:, col["2"]]
+    gap = np.abs(p1 - p2)
+    fav_home = p1 >= p2
+    tot_avg = _avg(h["tot_avg"], a["tot_avg"])
+    btts_avg = _avg(h["btts"], a["btts"])
+    cs_avg = _avg(h["cs"], a["cs"])
+    form_h = h["form_pts_rate"]; form_a = a["form_pts_rate"]
+
+    adj = np.zeros_like(P)
+    for m, j in col.items():
+        if m == "Over 0.5":
+            x = 0.02*(tot_avg - 2.3) + 0.02*(btts_avg - 0.55)
+        elif m == "Over 1.5":
+            x = 0.04*(_avg(h["over15"], a["over15"]) - 0.60) + 0.03*(tot_avg - 2.4) + 0.02*(btts_avg - 0.55)
+        elif m == "Over 2.5":
+            x = 0.05*(_avg(h["over25"], a["over25"]) - 0.50) + 0.03*(tot_avg - 2.6) + 0.02*(btts_avg - 0.55)
+        elif m == "Under 2.5":
+            x = 0.05*(0.50 - _avg(h["over25"], a["over25"])) + 0.03*(2.5 - tot_avg) + 0.02*(0.55 - btts_avg)
+        elif m == "Under 3.5":
+            x = 0.05*(_avg(h["under35"], a["under35"]) - 0.60) + 0.03*(3.0 - tot_avg) + 0.02*(0.55 - btts_avg)
+        elif m == "Gol":
+            x = 0.06*(btts_avg - 0.50) + 0.03*(tot_avg - 2.5) - 0.02*(cs_avg - 0.30)
+        elif m == "No Gol":
+            x = 0.06*(cs_avg - 0.30) + 0.03*(0.55 - btts_avg) + 0.02*(gap - 0.12)
+        elif m == "1X":
+            base = 0.05*(form_h - 0.50) + 0.03*(gap - 0.12) - 0.02*(form_a - 0.50)
+            x = np.where(fav_home, base, base*0.5)
+        elif m == "X2":
+            base = 0.05*(form_a - 0.50) + 0.03*(gap - 0.12) - 0.02*(form_h - 0.50)
+            x = np.where(fav_home, base*0.5, base)
+        elif m == "1":
+            x = 0.07*(form_h - 0.50) + 0.04*(gap - 0.12) - 0.03*(form_a - 0.50)
+        elif m == "2":
+            x = 0.07*(form_a - 0.50) + 0.04*(gap - 0.12) - 0.03*(form_h - 0.50)
+        else:
+            continue
+        adj[:, j] = x
+    return _clamp(adj, -0.12, 0.12)
+
+def veto_mask(markets: Sequence[str], O: np.ndarray, P: np.ndarray) -> np.ndarray:
+    """_risk_veto per tutte le celle (True = scartata)."""
+    col = {m: j for j, m in enumerate(markets)}
+    gap = np.abs(P[:, col["1"]] - P[:, col["2"]])
+    u35 = np.nan_to_num(O[:, col["Under 3.5"]], nan=99.0)
+    u25 = np.nan_to_num(O[:, col["Under 2.5"]], nan=99.0)
+    o25 = np.nan_to_num(O[:, col["Over 2.5"]], nan=0.0)
+    veto = np.zeros(O.shape, dtype=bool)
+    for m in ("1", "2"):
+        veto[:, col[m]] = gap < 0.08
+    veto[:, col["Gol"]] = (u35 <= 1.22) | (u25 <= 1.35)
+    veto[:, col["No Gol"]] = o25 <= 1.60
+    return veto
+
+def build_candidates(entries: Sequence[Any], feats_at: Dict[int, Dict[str, Any]],
+                     markets: Sequence[str], category) -> List[Candidate]:
+    """
+    Equivalente di: per entry (con features) × mercato, _mk_candidate + _risk_veto, nello stesso ordine.
+    p_imp, aggiustamento, p_mod, value e veto in blocco; round() Python solo sui superstiti.
+    """
+    rows = [pos for pos in range(len(entries)) if pos in feats_at]
+    if not rows:
+        return []
+    ents = [entries[p] for p in rows]
+    O = odds_matrix(ents, markets)
+    P = p_imp(O)
+    h = {k: np.array([feats_at[p]["home"][k] for p in rows], dtype=np.float64) for k in _FEATS}
+    a = {k: np.array([feats_at[p]["away"][k] for p in rows], dtype=np.float64) for k in _FEATS}
+    adj = adjustments(markets, P, h, a)
+    pmod = _clamp(P + adj, 0.01, 0.99)
+    value = pmod - P
+    keep = (P > 0.0) & ~veto_mask(markets, O, P)
+
+    ii, jj = np.nonzero(keep)  # ordine riga-per-riga = ordine entry, poi ordine mercati
+    odds_l = O[ii, jj].tolist(); pi_l = P[ii, jj].tolist(); pm_l = pmod[ii, jj].tolist(); v_l = value[ii, jj].tolist()
+    cats = [category(m) for m in markets]
+    out: List[Candidate] = []
+    for k, (i, j) in enumerate(zip(ii.tolist(), jj.tolist())):
+        e = ents[i]
+        out.append(Candidate(
+            fixture_id=e["fixture_id"],
+            league=league_label(e["league_country"], e["league_name"]),
+            home=e["home"], away=e["away"],
+            kickoff_iso=e["kickoff_iso"],
+            market=markets[j], odd=odds_l[k],
+            p_imp=round(pi_l[k], 4), p_mod=round(pm_l[k], 4), value=round(v_l[k], 4),
+            cat=cats[j],
+            markets_all=e["markets"],
+        ))
+    return out
@@ -0,0 +1,172 @@
+# app/candidate_index.py — indice persistente dei candidati per la selezione (range quota, ranking, fixture usate)
+from __future__ import annotations
+import heapq
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Set, Tuple
+
+def pareto_mask(cands: Iterable[Any]) -> List[bool]:
+    """
+    False per i candidati dominati, nell'ordine dato: stessa fixture e stessa categoria di un candidato
+    PRECEDENTE con quota, p_mod e value tutti >=. Esatto per chi prende il PRIMO candidato valido in
+    quest'ordine (lo stream di _pick_diverse, le leg di pack_optimizer): il dominante passa ogni filtro
+    del dominato e occupa la sua fixture prima. NON lo è per la fase di miglioramento di _pick_diverse,
+    che continua a sostituire e tiene l'ULTIMO candidato valido: lì il dominato può essere la scelta.
+    """
+    return _pareto_keep(((c["fixture_id"], c["cat"]), (float(c["odd"]), c["p_mod"], c["value"])) for c in cands)
+
+def _pareto_keep(points: Iterable[Tuple[Any, Tuple[float, float, float]]]) -> List[bool]:
+    # (gruppo, (quota, p_mod, value)) in ordine → False se un punto precedente dello stesso gruppo lo domina
+    front: Dict[Any, List[Tuple[float, float, float]]] = {}
+    keep: List[bool] = []
+    for key, pt in points:
+        kept = front.get(key)
+        if kept is None:
+            front[key] = [pt]
+            keep.append(True)
+            continue
+        o, p, v = pt
+        for ko, kp, kv in kept:
+            if o <= ko and p <= kp and v <= kv:
+                keep.append(False)
+                break
+        else:
+            kept.append(pt)
+            keep.append(True)
+    return keep
+
+def pareto_front(cands: Iterable[Any]) -> List[Any]:
+    """Solo i candidati non dominati (vedi pareto_mask), nell'ordine dato."""
+    cands = cands if isinstance(cands, list) else list(cands)
+    return [c for c, k in zip(cands, pareto_mask(cands)) if k]
+
+class CandidateIndex:
+    """
+    Costruito una volta per _choose_best_pack, interrogato da tutte le take_fmt:
+    - quote ordinate → range [lo, hi] di un formato con due bisect, senza riscandire la lista;
+    - ranking per (range, chiave) calcolato una volta e riusato, con sotto-liste per categoria
+      fuse con un heap (le categorie sature escono dalla fusione invece di essere saltate a ogni candidato);
+    - fixture già usate come bitset intero (una maschera per piano, un AND per candidato);
+    - con prune=True, pool() ridotto alla frontiera di Pareto del ranking (pareto_mask), calcolata alla
+      prima richiesta: meno candidati nella fase di miglioramento, ma scelte diverse (vedi pool()).
+    A parità di chiave l'ordine resta quello di `cands`, come il sort stabile sulla lista filtrata.
+    """
+
+    def __init__(self, cands: Iterable[Any], prune: bool = False):
+        self.prune = prune
+        self.cands: List[Any] = cands if isinstance(cands, list) else list(cands)
+        ordinal: Dict[Any, int] = {}
+        bits: List[int] = []
+        self.fbit: List[int] = []  # stesso oggetto int per tutti i candidati di una fixture
+        self._fix: List[int] = []  # ordinale della fixture
+        odds: Dict[int, float] = {}
+        for i, c in enumerate(self.cands):
+            k = ordinal.setdefault(c["fixture_id"], len(ordinal))
+            if k == len(bits):
+                bits.append(1 << k)
+            self.fbit.append(bits[k])
+            self._fix.append(k)
+            try:
+                x = float(c["odd"])
+            except Exception:
+                continue  # come _fits_range: quota illeggibile = fuori da ogni range
+            if x == x:
+                odds[i] = x
+        self._ordinal = ordinal
+        self._odd_at = odds
+        self._grp: List[int] = [-1] * len(self.cands)  # vedi _frontier
+        self._cat_ids: Dict[Any, int] = {}
+        self._by_odd = sorted(odds, key=odds.__getitem__)  # a parità di quota, ordine di cands
+        self._odds = [odds[i] for i in self._by_odd]
+        self._ranked: Dict[Any, List[int]] = {}
+        self._by_cat: Dict[Any, Dict[str, List[int]]] = {}
+        self._front: Dict[Any, List[int]] = {}
+
+    def fixture_mask(self, picks: Iterable[Any]) -> int:
+        """Bitset delle fixture dei candidati dati."""
+        m = 0
+        for p in picks:
+            k = self._ordinal.get(p["fixture_id"])
+            if k is not None:
+                m |= 1 << k
+        return m
+
+    def ranked(self, name: Any, lo: float, hi: float, sort_key: Callable[[Any], Any],
+               pred: Callable[[Any], bool] | None = None) -> Any:
+        """Candidati con lo <= quota <= hi (e pred), ordinati per sort_key decrescente. → chiave del ranking."""
+        ck = (name, lo, hi)
+        if ck not in self._ranked:
+            r = sorted(self._by_odd[bisect_left(self._odds, lo):bisect_right(self._odds, hi)])
+            if pred is not None:
+                r = [i for i in r if pred(self.cands[i])]
+            cands = self.cands
+            r.sort(key=lambda i: sort_key(cands[i]), reverse=True)
+            self._ranked[ck] = r
+        return ck
+
+    def _frontier(self, r: List[int]) -> List[int]:
+        """pareto_mask su un ranking: solo chi divide fixture e categoria con altri nel range paga le letture dei campi."""
+        fix, grp, cands = self._fix, self._grp, self.cands
+        per_fix = Counter(map(fix.__getitem__, r))
+        shared = [i for i in r if per_fix[fix[i]] > 1]
+        if not shared:
+            return r
+        cat_ids = self._cat_ids
+        for i in shared:
+            if grp[i] < 0:  # gruppo (fixture, categoria) come int, letto una volta per candidato
+                grp[i] = fix[i] << 16 | cat_ids.setdefault(cands[i]["cat"], len(cat_ids))
+        per_grp = Counter(map(grp.__getitem__, shared))
+        shared = [i for i in shared if per_grp[grp[i]] > 1]
+        if not shared:
+            return r
+        odd_at = self._odd_at
+        keep = _pareto_keep((grp[i], (odd_at[i], cands[i]["p_mod"], cands[i]["value"])) for i in shared)
+        drop = {i for i, k in zip(shared, keep) if not k}
+        return [i for i in r if i not in drop] if drop else r
+
+    def pool(self, ck: Any, used: int = 0) -> List[Any]:
+        """
+        Il ranking come lista, senza le fixture in `used`. Con prune=True anche senza i dominati (in ordine di
+        ranking il dominante precede il dominato, sort_key cresce con value e p_mod): la fase di miglioramento
+        di _pick_diverse, che tiene l'ultimo candidato valido, può allora finire su una leg diversa (sempre
+        valida). Per questo è opzionale (PARETO_PRUNE); stream() resta sempre completo.
+        """
+        if not self.prune:
+            front = self._ranked[ck]
+        else:
+            front = self._front.get(ck)
+            if front is None:
+                front = self._front[ck] = self._frontier(self._ranked[ck])
+        cands, fbit = self.cands, self.fbit
+        if not used:
+            return [cands[i] for i in front]
+        return [cands[i] for i in front if not used & fbit[i]]
+
+    def stream(self, ck: Any, used: int, closed: Set[str]) -> Iterator[Any]:
+        """
+        Stesso ordine di pool(ck, used), ma per categoria: una categoria aggiunta a `closed`
+        da chi consuma (satura o esclusa dal bias) smette di produrre candidati.
+        """
+        by_cat = self._by_cat.get(ck)
+        if by_cat is None:
+            by_cat = {}
+            for rank, i in enumerate(self._ranked[ck]):
+                by_cat.setdefault(self.cands[i]["cat"], []).append(rank)
+            self._by_cat[ck] = by_cat
+        ranked, cands, fbit = self._ranked[ck], self.cands, self.fbit
+        heap = [(ranks[0], cat, 0) for cat, ranks in by_cat.items()]
+        heapq.heapify(heap)
+        while heap:
+            rank, cat, k = heap[0]
+            if cat in closed:
+                heapq.heappop(heap)
+                continue
+            ranks = by_cat[cat]
+            if k + 1 < len(ranks):
+                heapq.heapreplace(heap, (ranks[k + 1], cat, k + 1))
+            else:
+                heapq.heappop(heap)
+            i = ranked[rank]
+            if used & fbit[i]:
+                continue
+            yield cands[i]
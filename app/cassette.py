@@ -0,0 +1,108 @@
+# app/cassette.py — registrazione/riproduzione delle risposte API-Football (JSONL gzip)
+from __future__ import annotations
+import atexit
+import gzip
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Iterator, List
+
+MODE_LIVE = "live"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+MODES = (MODE_LIVE, MODE_RECORD, MODE_REPLAY)
+
+class Cassette:
+    """
+    Nastro di richieste/risposte per profilare offline (plan_day, LiveAlerts.tick, Closer.tick):
+    - record: ogni risposta di _get viene aggiunta come riga {"k","t","body"} a un .jsonl.gz;
+    - replay: le risposte vengono servite dal file al posto della rete, nell'ordine registrato
+      per ogni chiave (più tick live → più risposte); finite quelle, si ripete l'ultima.
+    La chiave è cache_key(path, params): stessa richiesta → stessa risposta.
+    Una richiesta mai registrata in replay è un errore (niente rete di scorta).
+    """
+
+    def __init__(self, path: str, mode: str = MODE_RECORD):
+        if mode not in (MODE_RECORD, MODE_REPLAY):
+            raise RuntimeError(f"cassette: modalità non valida {mode!r}")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._fh = None
+        self._tapes: Dict[str, List[str]] = {}
+        self._cursor: Dict[str, int] = {}
+        if mode == MODE_RECORD:
+            d = os.path.dirname(path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            # append: più sessioni sullo stesso file si accodano (membri gzip concatenati)
+            self._fh = gzip.open(path, "at", encoding="utf-8")
+            atexit.register(self.close)
+        else:
+            self._load()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == MODE_RECORD
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == MODE_REPLAY
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise RuntimeError(f"cassette: file non trovato {self.path}")
+        n = 0
+        with gzip.open(self.path, "rt", encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except Exception:
+                    continue  # riga troncata (processo interrotto durante la scrittura)
+                # il body resta testo: ogni play() lo decodifica come farebbe la risposta HTTP
+                self._tapes.setdefault(rec["k"], []).append(json.dumps(rec["body"], separators=(",", ":")))
+                n += 1
+        print(f"[cassette] replay {self.path}: {n} risposte, {len(self._tapes)} richieste distinte")
+
+    def keys(self) -> List[str]:
+        return list(self._tapes)
+
+    def rewind(self):
+        with self._lock:
+            self._cursor.clear()
+
+    def record(self, key: str, js: Dict[str, Any]):
+        line = json.dumps({"k": key, "t": round(time.time(), 3), "body": js}, separators=(",", ":"))
+        with self._lock:
+            if self._fh is None:
+                return
+            self._fh.write(line + "\n")
+            self._fh.flush()
+
+    def _next(self, key: str) -> str:
+        with self._lock:
+            tape = self._tapes.get(key)
+            if not tape:
+                raise RuntimeError(f"cassette: richiesta non registrata {key}")
+            i = self._cursor.get(key, 0)
+            self._cursor[key] = min(i + 1, len(tape) - 1)
+            return tape[i]
+
+    def play(self, key: str) -> Dict[str, Any]:
+        return json.loads(self._next(key))
+
+    def play_chunks(self, key: str, chunk_size: int) -> Iterator[bytes]:
+        """La risposta come flusso di bytes, per il percorso in streaming."""
+        body = self._next(key).encode("utf-8")
+        for i in range(0, len(body), chunk_size):
+            yield body[i:i + chunk_size]
+
+    def close(self):
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
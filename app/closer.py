@@ -7,6 +7,7 @@ from datetime import datetime
 
 from .api_football import APIFootball
 from .telegram_client import TelegramClient
+from .jobs import job
 from .repo_bets import (
     get_open_betslips, get_selections, update_selection_result, recalc_betslip_status
 )
@@ -100,6 +101,10 @@ class Closer:
             self.energy_sent.add(s["id"])
 
     def tick(self):
+        with job("closer"):
+            self._tick()
+
+    def _tick(self):
         if not self._live_ok():
             time.sleep(5); return
 
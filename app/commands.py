@@ -8,11 +8,14 @@ from .config import Config
 from .telegram_client import TelegramClient
 from .api_football import APIFootball
 from .leagues import allowed_league, label_league
+from .markets import REQUIRED_MARKETS, active_markets
 
 from .value_builder import plan_day, render_plan_blocks
 from .repo_sched import list_today, cancel_by_short_id, cancel_all_today
 from .repo_bets import report_summary
 from .live_alerts import LiveAlerts
+from .jobs import job
+from .telemetry import metrics
 
 def _to_local_hhmm(iso: str, tz: str) -> str:
     try:
@@ -41,6 +44,9 @@ def _format_markets(mk: Dict[str, float]) -> List[str]:
     r4 = [f"{k.replace(' ', '')}: {mk[k]}" for k in ("Under 2.5","Under 3.5") if k in mk]
     if r4: lines.append(" | ".join(r4))
     r5 = [f"{k}: {mk[k]}" for k in ("Gol","No Gol") if k in mk]
+    # mercati extra (EXTRA_MARKETS): solo in visualizzazione, i candidati restano sui 13 standard
+    r6 = [f"{k}: {mk[k]}" for k in active_markets()[len(REQUIRED_MARKETS):] if k in mk]
+    if r6: lines.append(" | ".join(r6))
     return lines
 
 def _render_day(api: APIFootball, cfg: Config, date_str: str) -> List[str]:
@@ -142,6 +148,10 @@ class CommandsLoop:
                     pass
 
     def handle_update(self, upd: Dict[str, Any]):
+        with job("commands"):
+            return self._handle_update(upd)
+
+    def _handle_update(self, upd: Dict[str, Any]):
         msg = upd.get("message") or upd.get("edited_message")
         if not msg:
             return
@@ -158,7 +168,7 @@ class CommandsLoop:
         if low.startswith("/start"):
             self._send(chat_id, "Benvenuto! /quote per quote Bet365, /plan per anteprima giocate."); return
         if low.startswith("/help"):
-            self._send(chat_id, "Comandi: /quote [today|tomorrow|all], /plan [today|tomorrow], /plan_publish [today|tomorrow], /preview_today, /cancel ID, /cancel_all, /regen, /rebuild_watchlist, /watchlist"); return
+            self._send(chat_id, "Comandi: /quote [today|tomorrow|all], /plan [today|tomorrow], /plan_publish [today|tomorrow], /preview_today, /cancel ID, /cancel_all, /regen, /rebuild_watchlist, /watchlist, /stats [reset]"); return
         if low.startswith("/ping"):
             self._send(chat_id, "pong ✅"); return
 
@@ -197,6 +207,13 @@ class CommandsLoop:
                     pass
             return
 
+        if low.startswith("/stats"):
+            # telemetria chiamate API/Telegram per endpoint × job (come /report: solo in privato)
+            if "reset" in low.split()[1:]:
+                metrics.reset()
+                self._send(int(self.cfg.ADMIN_ID), "Statistiche azzerate ✅"); return
+            self._send(int(self.cfg.ADMIN_ID), metrics.render_text()); return
+
         if low.startswith("/quote"):
             parts = text.split()
             mode = parts[1].lower() if len(parts)>=2 else "all"
@@ -26,6 +26,45 @@ class Config:
         except Exception:
             self.QUIET_HOURS = (0, 8)
 
+        # pool HTTP keep-alive (condiviso dai thread: commands, live, watchlist, morning, closer)
+        self.HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))
+        self.HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+
+        # cache su disco delle risposte API-Football (vuoto = disattivata)
+        self.API_CACHE_PATH = os.getenv("API_CACHE_PATH", "data/api_cache.sqlite3").strip() or None
+        self.API_CACHE_ODDS_TTL = int(os.getenv("API_CACHE_ODDS_TTL", "600"))
+
+        # rate limit API-Football (aggiornato a runtime dagli header di risposta)
+        self.API_RATE_PER_MINUTE = int(os.getenv("API_RATE_PER_MINUTE", "30"))
+        self.API_DAILY_RESERVE = int(os.getenv("API_DAILY_RESERVE", "100"))
+
+        # pagine /odds e /fixtures scaricate in parallelo dopo la prima
+        self.API_PAGE_WORKERS = int(os.getenv("API_PAGE_WORKERS", "4"))
+        # fallback quote per-fixture (quando /odds?date= è vuoto)
+        self.API_FALLBACK_WORKERS = int(os.getenv("API_FALLBACK_WORKERS", "8"))
+
+        # storico partite concluse per lo StatsEngine (vuoto = /fixtures?team=&last= come prima)
+        self.FIXTURE_STORE_PATH = os.getenv("FIXTURE_STORE_PATH", "data/fixtures.sqlite3").strip() or None
+
+        # statistiche per fixture calcolate in parallelo nel value builder
+        self.FEATURE_WORKERS = int(os.getenv("FEATURE_WORKERS", "8"))
+
+        # ms di ricerca branch-and-bound del pack in plan_day (0 = solo i piani greedy)
+        self.PACK_OPTIMIZER_MS = int(os.getenv("PACK_OPTIMIZER_MS", "0") or "0")
+
+        # 1 = fase di miglioramento del greedy solo sui candidati non dominati: più veloce, qualche leg diversa
+        self.PARETO_PRUNE = int(os.getenv("PARETO_PRUNE", "0") or "0")
+
+        # mercati extra oltre i 13 standard (es. "Over 3.5,Under 1.5,AH1 -0.5"): letti e mostrati in /quote, non usati per i candidati
+        self.EXTRA_MARKETS = os.getenv("EXTRA_MARKETS", "").strip() or None
+
+        # record = salva ogni risposta API su cassetta, replay = la rilegge senza rete (profilazione offline)
+        self.API_MODE = os.getenv("API_MODE", "live").strip().lower() or "live"
+        self.API_CASSETTE = os.getenv("API_CASSETTE", "data/cassette.jsonl.gz").strip() or None
+
+        # endpoint Prometheus (GET /metrics) con la telemetria API/Telegram; 0 = spento
+        self.METRICS_PORT = int(os.getenv("METRICS_PORT", "0") or "0")
+
         self.DATABASE_URL = os.getenv("DATABASE_URL", "").strip() or None
         self.MYSQL_URL = os.getenv("MYSQL_URL", "").strip() or None
 
@@ -35,3 +74,5 @@ class Config:
             raise RuntimeError("ADMIN_ID mancante o non valido")
         if not self.APIFOOTBALL_KEY:
             raise RuntimeError("APIFOOTBALL_KEY mancante")
+        if self.API_MODE not in ("live", "record", "replay"):
+            raise RuntimeError("API_MODE non valido (live|record|replay)")
@@ -0,0 +1,164 @@
+# app/fixture_store.py — storico locale (SQLite) delle partite chiuse, per lo StatsEngine
+from __future__ import annotations
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
+
+from dateutil import parser as duparser
+
+FINISHED = ("FT", "AET", "PEN")
+# chiuse senza risultato: /fixtures?team=&last= le conta nelle ultime N, quindi si salvano anche loro
+VOID = ("PST", "CANC", "ABD", "AWD", "WO")
+CLOSED = FINISHED + VOID
+CLOSED_PARAM = "-".join(CLOSED)
+
+# una lega già sincronizzata da meno di così non viene richiesta di nuovo (stesso plan, /regen ravvicinati)
+DEFAULT_RESYNC_SECONDS = 15 * 60
+SCHEMA_VERSION = 1
+
+def _kickoff_ts(fx: Dict[str, Any]) -> float:
+    info = fx.get("fixture") or {}
+    ts = info.get("timestamp")
+    if ts:
+        return float(ts)
+    try:
+        return duparser.isoparse(info.get("date") or "").timestamp()
+    except Exception:
+        return 0.0
+
+class FixtureStore:
+    """
+    Partite chiuse (concluse FT/AET/PEN e rinviate/annullate) per lega/stagione, con indice per squadra.
+    - sync_league(): la prima volta scarica tutta la stagione chiusa della lega
+      (/fixtures?league=&season=&status=CLOSED_PARAM), poi solo il delta from=ultimo sync → oggi;
+    - team_last(): come /fixtures?team=&last=N filtrato alle concluse, senza rete,
+      nello stesso formato (ridotto) delle risposte /fixtures usato da _rates_from_last.
+    Thread-safe (un lock attorno all'unica connessione), come ResponseCache.
+    """
+
+    def __init__(self, path: str, resync_seconds: int = DEFAULT_RESYNC_SECONDS):
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.resync_seconds = int(resync_seconds)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS finished_fixtures (
+                  fixture_id INTEGER PRIMARY KEY,
+                  league_id INTEGER NOT NULL,
+                  season INTEGER NOT NULL,
+                  home_id INTEGER NOT NULL,
+                  away_id INTEGER NOT NULL,
+                  kickoff_ts REAL NOT NULL,
+                  status TEXT NOT NULL,
+                  goals_home INTEGER NOT NULL,
+                  goals_away INTEGER NOT NULL
+                )""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_ff_home ON finished_fixtures (home_id, league_id, season, kickoff_ts)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_ff_away ON finished_fixtures (away_id, league_id, season, kickoff_ts)")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS league_sync (
+                  league_id INTEGER NOT NULL,
+                  season INTEGER NOT NULL,
+                  last_date TEXT NOT NULL,
+                  synced_at REAL NOT NULL,
+                  PRIMARY KEY (league_id, season)
+                )""")
+            if self._db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                # file di versioni che salvavano solo le concluse: risincronizza le stagioni intere
+                self._db.execute("DELETE FROM league_sync")
+                self._db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            self._db.commit()
+
+    # --- scrittura ---
+    def upsert(self, fixtures: List[Dict[str, Any]]) -> int:
+        rows = []
+        for fx in fixtures:
+            info = fx.get("fixture") or {}
+            st = (info.get("status") or {}).get("short") or ""
+            if st not in CLOSED:
+                continue
+            league = fx.get("league") or {}
+            teams = fx.get("teams") or {}
+            goals = fx.get("goals") or {}
+            try:
+                rows.append((int(info["id"]), int(league.get("id") or 0), int(league.get("season") or 0),
+                             int((teams.get("home") or {}).get("id") or 0), int((teams.get("away") or {}).get("id") or 0),
+                             _kickoff_ts(fx), st, int(goals.get("home") or 0), int(goals.get("away") or 0)))
+            except Exception:
+                continue
+        if rows:
+            with self._lock:
+                self._db.executemany("INSERT OR REPLACE INTO finished_fixtures VALUES (?,?,?,?,?,?,?,?,?)", rows)
+                self._db.commit()
+        return len(rows)
+
+    def _sync_state(self, league_id: int, season: int) -> Tuple[str, float] | None:
+        with self._lock:
+            return self._db.execute("SELECT last_date, synced_at FROM league_sync WHERE league_id=? AND season=?",
+                                    (league_id, season)).fetchone()
+
+    def _mark_synced(self, league_id: int, season: int, day: str):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO league_sync VALUES (?,?,?,?)", (league_id, season, day, time.time()))
+            self._db.commit()
+
+    def sync_league(self, api, league_id: int, season: int) -> int:
+        """Allinea lega/stagione: stagione intera al primo giro, poi solo le chiuse dall'ultimo sync. → nuove righe."""
+        state = self._sync_state(league_id, season)
+        if state and time.time() - state[1] < self.resync_seconds:
+            return 0
+        today = datetime.now(timezone.utc).date()
+        params: Dict[str, Any] = {"league": league_id, "season": season, "status": CLOSED_PARAM}
+        if state:
+            # dal giorno dell'ultimo sync (incluso): prende anche le partite finite dopo quel giro
+            since = min(duparser.isoparse(state[0]).date(), today - timedelta(days=1))
+            params["from"] = since.isoformat()
+            params["to"] = today.isoformat()
+        fixtures = api._get_paged("/fixtures", params)
+        n = self.upsert(fixtures)
+        self._mark_synced(league_id, season, today.isoformat())
+        return n
+
+    # --- lettura ---
+    def team_last(self, team_id: int, league_id: int, season: int, last: int = 10) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute("""
+                SELECT fixture_id, kickoff_ts, status, home_id, away_id, goals_home, goals_away FROM (
+                  SELECT * FROM finished_fixtures WHERE home_id=? AND league_id=? AND season=?
+                  UNION ALL
+                  SELECT * FROM finished_fixtures WHERE away_id=? AND league_id=? AND season=?
+                ) ORDER BY kickoff_ts DESC, fixture_id DESC LIMIT ?""",
+                (team_id, league_id, season, team_id, league_id, season, int(last))).fetchall()
+        # le rinviate/annullate occupano posti nelle ultime N (come nell'API) ma non si restituiscono
+        return [to_fixture(r, league_id, season) for r in rows if r[2] in FINISHED]
+
+    def league_fixtures(self, league_id: int, season: int) -> List[Dict[str, Any]]:
+        """Tutta la stagione chiusa della lega (per il prefetch in memoria dello StatsEngine, che filtra)."""
+        with self._lock:
+            rows = self._db.execute("""
+                SELECT fixture_id, kickoff_ts, status, home_id, away_id, goals_home, goals_away
+                FROM finished_fixtures WHERE league_id=? AND season=?""", (league_id, season)).fetchall()
+        return [to_fixture(r, league_id, season) for r in rows]
+
+def to_fixture(row: Tuple, league_id: int, season: int) -> Dict[str, Any]:
+    """Riga → dict in formato /fixtures (solo i campi che usa lo StatsEngine)."""
+    fid, ts, st, home_id, away_id, gh, ga = row
+    return {
+        "fixture": {"id": fid, "timestamp": int(ts), "status": {"short": st}},
+        "league": {"id": league_id, "season": season},
+        "teams": {"home": {"id": home_id}, "away": {"id": away_id}},
+        "goals": {"home": gh, "away": ga},
+    }
+
+@lru_cache(maxsize=4)
+def store_for(path: str | None) -> FixtureStore | None:
+    """Uno store per file, condiviso da tutti gli StatsEngine del processo (vuoto/None = disattivato)."""
+    return FixtureStore(path) if path else None
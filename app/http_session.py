@@ -0,0 +1,30 @@
+# app/http_session.py — sessioni HTTP keep-alive condivise tra i thread del bot
+from __future__ import annotations
+from typing import Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_CONNECTIONS = 4   # host distinti tenuti in pool
+DEFAULT_POOL_MAXSIZE = 10      # connessioni keep-alive massime per host
+
+def build_session(pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                  pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                  headers: Optional[Dict[str, str]] = None) -> requests.Session:
+    """
+    Session con pool di connessioni riusabili (niente handshake TCP+TLS a ogni chiamata).
+    - pool_block=True: oltre pool_maxsize connessioni per host i thread ATTENDONO
+      una connessione libera invece di aprirne di nuove (limite per-host).
+    - gzip/deflate negoziati esplicitamente (le pagine /odds comprimono molto bene).
+    Il pool di urllib3 è thread-safe: una sola Session può essere condivisa
+    dai thread daemon di main.py finché nessuno ne modifica headers/cookie a runtime.
+    """
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max(1, int(pool_connections)),
+                          pool_maxsize=max(1, int(pool_maxsize)),
+                          pool_block=True)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    s.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+    if headers:
+        s.headers.update(headers)
+    return s
@@ -0,0 +1,30 @@
+# app/jobs.py — nome del job corrente (per-thread): priorità API e statistiche per job
+from __future__ import annotations
+import threading
+from contextlib import contextmanager
+from typing import Callable
+
+_local = threading.local()
+
+DEFAULT_JOB = "other"
+
+@contextmanager
+def job(name: str):
+    """Marca le chiamate API fatte nel blocco come appartenenti al job `name` (annidabile)."""
+    prev = getattr(_local, "name", None)
+    _local.name = name
+    try:
+        yield
+    finally:
+        _local.name = prev
+
+def current_job() -> str:
+    return getattr(_local, "name", None) or DEFAULT_JOB
+
+def bind_job(fn: Callable) -> Callable:
+    """Propaga il job del thread chiamante dentro un worker (ThreadPoolExecutor non lo eredita)."""
+    name = current_job()
+    def _run(*args, **kwargs):
+        with job(name):
+            return fn(*args, **kwargs)
+    return _run
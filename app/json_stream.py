@@ -0,0 +1,99 @@
+# app/json_stream.py — decode incrementale di un oggetto JSON con un array grande (es. "response")
+from __future__ import annotations
+import codecs
+import json
+from typing import Any, Dict, Iterable, Iterator
+
+_WS = " \t\n\r"
+_NUM = "0123456789+-.eE"  # caratteri che possono continuare un numero JSON
+
+class JSONObjectStream:
+    """
+    Legge un oggetto JSON top-level da chunk di bytes SENZA caricarlo tutto:
+    - gli elementi dell'array `array_key` vengono restituiti uno alla volta da items();
+    - tutte le altre chiavi top-level (paging, errors, results...) finiscono in `meta`.
+    Il buffer viene compattato dopo ogni elemento: la memoria resta ~ un elemento + un chunk.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], array_key: str = "response"):
+        self._chunks = iter(chunks)
+        self._dec = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self.array_key = array_key
+        self.meta: Dict[str, Any] = {}
+
+    # --- buffer ---
+    def _more(self) -> bool:
+        if self._eof:
+            return False
+        for chunk in self._chunks:
+            if not chunk:
+                continue
+            if self._pos:
+                self._buf = self._buf[self._pos:]; self._pos = 0
+            self._buf += self._dec.decode(chunk)
+            return True
+        self._buf += self._dec.decode(b"", final=True)
+        self._eof = True
+        return False
+
+    def _peek(self) -> str:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WS:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._more():
+                raise ValueError("JSON troncato")
+
+    def _expect(self, ch: str):
+        if self._peek() != ch:
+            raise ValueError(f"JSON: atteso '{ch}' a offset {self._pos}")
+        self._pos += 1
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                val, end = self._json.raw_decode(self._buf, self._pos)
+                # un numero tagliato dal chunk ("1." | "5", "12" | "e3") decodifica un prefisso valido:
+                # finché dopo il token non c'è un delimitatore si legge altro (o si arriva a EOF)
+                if (not self._eof and isinstance(val, (int, float)) and not isinstance(val, bool)
+                        and (end >= len(self._buf) or self._buf[end] in _NUM) and self._more()):
+                    continue
+                self._pos = end
+                return val
+            except json.JSONDecodeError:
+                if not self._more():
+                    raise
+
+    # --- API ---
+    def items(self) -> Iterator[Any]:
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1; return
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key == self.array_key and self._peek() == "[":
+                self._pos += 1
+                if self._peek() == "]":
+                    self._pos += 1
+                else:
+                    while True:
+                        yield self._value()
+                        ch = self._peek(); self._pos += 1
+                        if ch == "]":
+                            break
+                        if ch != ",":
+                            raise ValueError(f"JSON: atteso ',' o ']' a offset {self._pos}")
+            else:
+                self.meta[key] = self._value()
+            ch = self._peek(); self._pos += 1
+            if ch == "}":
+                return
+            if ch != ",":
+                raise ValueError(f"JSON: atteso ',' o '}}' a offset {self._pos}")
@@ -5,6 +5,8 @@ import time
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
+from .jobs import job
+
 PRE_FAV_MAX = 1.25
 EARLY_MINUTE_MAX = 20
 DOUBLECHECK_SECONDS = 60
@@ -85,7 +87,8 @@ class LiveAlerts:
         """
         today = self._now_local().strftime("%Y-%m-%d")
         try:
-            entries = self.api.entries_by_date_bet365(today)  # lista normalizzata con markets {"1","2",...}
+            with job("watchlist"):
+                entries = self.api.entries_by_date_bet365(today)  # lista normalizzata con markets {"1","2",...}
         except Exception:
             entries = []
 
@@ -207,12 +210,13 @@ class LiveAlerts:
             self.pending_check.pop(fid, None)
 
     def tick(self):
-        try:
-            lives = self.api.live_fixtures()
-        except Exception:
-            lives = []
-        for fx in (lives or []):
-            self._handle_live_fixture(fx)
+        with job("live"):
+            try:
+                lives = self.api.live_fixtures()
+            except Exception:
+                lives = []
+            for fx in (lives or []):
+                self._handle_live_fixture(fx)
 
     def run_forever(self):
         while True:
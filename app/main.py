@@ -3,7 +3,6 @@ import threading
 import time
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-import requests  # <--- per deleteWebhook
 
 from .config import Config
 from .telegram_client import TelegramClient
@@ -14,18 +13,32 @@ from .live_alerts import LiveAlerts
 from .morning_job import run_morning
 from .scheduler import ScheduledPublisher
 from .closer import Closer
+from .telemetry import start_metrics_server
 
 def main():
     cfg = Config()
-    tg  = TelegramClient(cfg.TELEGRAM_TOKEN)
-    api = APIFootball(cfg.APIFOOTBALL_KEY, tz=cfg.TZ)
+    tg  = TelegramClient(cfg.TELEGRAM_TOKEN,
+                         pool_connections=cfg.HTTP_POOL_CONNECTIONS, pool_maxsize=cfg.HTTP_POOL_MAXSIZE)
+    api = APIFootball(cfg.APIFOOTBALL_KEY, tz=cfg.TZ,
+                      pool_connections=cfg.HTTP_POOL_CONNECTIONS, pool_maxsize=cfg.HTTP_POOL_MAXSIZE,
+                      cache_path=cfg.API_CACHE_PATH, odds_ttl=cfg.API_CACHE_ODDS_TTL,
+                      rate_per_minute=cfg.API_RATE_PER_MINUTE, daily_reserve=cfg.API_DAILY_RESERVE,
+                      page_workers=cfg.API_PAGE_WORKERS, fallback_workers=cfg.API_FALLBACK_WORKERS,
+                      extra_markets=cfg.EXTRA_MARKETS,
+                      api_mode=cfg.API_MODE, cassette_path=cfg.API_CASSETTE)
 
     # disattiva webhook se mai fosse stato impostato
     try:
-        requests.get(f"https://api.telegram.org/bot{cfg.TELEGRAM_TOKEN}/deleteWebhook", timeout=5)
+        tg.delete_webhook()
     except Exception:
         pass
 
+    if cfg.METRICS_PORT:
+        try:
+            start_metrics_server(cfg.METRICS_PORT)
+        except Exception as e:
+            print(f"[telemetry] /metrics non avviato: {e}")
+
     print("[BOOT] Odds bot pronto. Comandi: /quote [today|tomorrow], /plan, live alerts ON")
 
     has_db = bool(getattr(cfg, "DATABASE_URL", None) or getattr(cfg, "MYSQL_URL", None))
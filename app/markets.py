@@ -0,0 +1,167 @@
+# app/markets.py — registro mercati: (nome scommessa, etichetta) → mercato canonico in un lookup
+from __future__ import annotations
+import re
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+REQUIRED_MARKETS = (
+    "1","X","2",
+    "1X","12","X2",
+    "Over 0.5","Over 1.5","Over 2.5",
+    "Under 2.5","Under 3.5",
+    "Gol","No Gol"
+)
+
+_EXCLUDE_PARTIAL = ("half", "period", "1st", "2nd", "first half", "second half")
+
+# nome scommessa API-Football (lower/strip) → gruppo; tutto ciò che non è qui si ignora
+_BASE_BET_GROUPS = {
+    "match winner": "1x2", "winner": "1x2",
+    "double chance": "dc",
+    "goals over/under": "ou", "total": "ou",
+    "both teams to score": "btts", "goal/no goal": "btts",
+}
+
+# --- regole "storiche" per etichetta (stesse condizioni del vecchio parser a catena) ---
+def _rule_1x2(raw: str) -> Optional[str]:
+    val = raw.lower()
+    if val.startswith("home") or val == "1": return "1"
+    if val.startswith("away") or val == "2": return "2"
+    if val.startswith("draw") or val == "x": return "X"
+    return None
+
+def _rule_dc(raw: str) -> Optional[str]:
+    lab = raw.lower()
+    if "home/draw" in lab or lab in ("1x","home or draw"): return "1X"
+    if "home/away" in lab or lab == "12" or "home or away" in lab: return "12"
+    if "draw/away" in lab or lab in ("x2","draw or away","away or draw"): return "X2"
+    return None
+
+_OU_BASE = {
+    "over0.5": "Over 0.5", "o0.5": "Over 0.5",
+    "over1.5": "Over 1.5", "o1.5": "Over 1.5",
+    "over2.5": "Over 2.5", "o2.5": "Over 2.5",
+    "under2.5": "Under 2.5", "u2.5": "Under 2.5",
+    "under3.5": "Under 3.5", "u3.5": "Under 3.5",
+}
+
+def _rule_ou(raw: str) -> Optional[str]:
+    return _OU_BASE.get(raw.lower().replace(" ", ""))
+
+def _rule_btts(raw: str) -> Optional[str]:
+    lab = raw.lower()
+    if "yes" in lab: return "Gol"
+    if "no" in lab: return "No Gol"
+    return None
+
+_RULES: Dict[str, Callable[[str], Optional[str]]] = {
+    "1x2": _rule_1x2, "dc": _rule_dc, "ou": _rule_ou, "btts": _rule_btts,
+    "ah": lambda raw: None,
+}
+
+# --- mercati extra attivabili da configurazione (EXTRA_MARKETS) ---
+_RE_TOTAL = re.compile(r"^(over|under)\s+(\d+(?:\.\d+)?)$", re.I)
+_RE_AH = re.compile(r"^ah([12])\s+([+-]?\d+(?:\.\d+)?)$", re.I)
+
+def _extra_labels(name: str) -> Optional[Tuple[str, Tuple[str, ...], str]]:
+    """'Over 3.5' / 'Under 1.5' / 'AH1 -0.5' / 'AH2 +0.25' → (gruppo, etichette normalizzate, canonico)."""
+    n = name.strip()
+    m = _RE_TOTAL.match(n)
+    if m:
+        side, line = m.group(1).lower(), m.group(2)
+        canon = f"{side.capitalize()} {line}"
+        return "ou", (f"{side}{line}", f"{side[0]}{line}"), canon
+    m = _RE_AH.match(n)
+    if m:
+        side = "home" if m.group(1) == "1" else "away"
+        line = m.group(2)
+        bare = line.lstrip("+")
+        labs = {f"{side}{line}", f"{side}{bare}"}
+        if not line.startswith(("-", "+")):
+            labs.add(f"{side}+{line}")
+        return "ah", tuple(sorted(labs)), f"AH{m.group(1)} {line}"
+    return None
+
+class _Registry:
+    def __init__(self):
+        self.active: Tuple[str, ...] = REQUIRED_MARKETS
+        self.bet_groups: Dict[str, str] = dict(_BASE_BET_GROUPS)
+        self.extra: Dict[Tuple[str, str], str] = {}
+        # tabelle compilate (memo): nome grezzo → gruppo/None, (gruppo, etichetta grezza) → mercato/None
+        self.by_name: Dict[str, Optional[str]] = {}
+        self.by_label: Dict[Tuple[str, str], Optional[str]] = {}
+
+_MEMO_MAX = 20000
+_reg = _Registry()
+
+def configure_markets(extra: Iterable[str] | str | None = None):
+    """
+    Attiva mercati oltre i REQUIRED_MARKETS (es. "Over 3.5,Under 1.5,AH1 -0.5").
+    Nomi non riconosciuti vengono segnalati e ignorati. Resetta le tabelle compilate.
+    """
+    if isinstance(extra, str):
+        extra = [x.strip() for x in extra.split(",") if x.strip()]
+    reg = _Registry()
+    active = list(REQUIRED_MARKETS)
+    for name in (extra or []):
+        spec = _extra_labels(name)
+        if not spec:
+            print(f"[markets] mercato extra non riconosciuto: {name!r}")
+            continue
+        group, labels, canon = spec
+        if canon in active:
+            continue
+        for lab in labels:
+            reg.extra[(group, lab)] = canon
+        if group == "ah":
+            reg.bet_groups["asian handicap"] = "ah"
+        active.append(canon)
+    reg.active = tuple(active)
+    global _reg
+    _reg = reg
+    _precompile()
+
+def active_markets() -> Tuple[str, ...]:
+    """Ordine canonico dei mercati restituiti dal parser (REQUIRED_MARKETS + extra)."""
+    return _reg.active
+
+def bet_group(raw_name: str) -> Optional[str]:
+    """Gruppo della scommessa o None se da ignorare (parziali, mercati non mappati)."""
+    reg = _reg
+    try:
+        return reg.by_name[raw_name]
+    except KeyError:
+        pass
+    name = raw_name.lower().strip()
+    group = None if any(tok in name for tok in _EXCLUDE_PARTIAL) else reg.bet_groups.get(name)
+    if len(reg.by_name) < _MEMO_MAX:
+        reg.by_name[raw_name] = group
+    return group
+
+def label_market(group: str, raw_value: str) -> Optional[str]:
+    """Etichetta quota → mercato canonico (o None) per il gruppo dato."""
+    reg = _reg
+    k = (group, raw_value)
+    try:
+        return reg.by_label[k]
+    except KeyError:
+        pass
+    m = _RULES[group](raw_value)
+    if m is None and reg.extra:
+        m = reg.extra.get((group, raw_value.lower().replace(" ", "")))
+    if len(reg.by_label) < _MEMO_MAX:
+        reg.by_label[k] = m
+    return m
+
+def _precompile():
+    """Etichette standard API-Football già risolte: a regime ogni quota è un solo lookup."""
+    for raw in ("Home", "Draw", "Away"):
+        label_market("1x2", raw)
+    for raw in ("Home/Draw", "Home/Away", "Draw/Away"):
+        label_market("dc", raw)
+    for side in ("Over", "Under"):
+        for line in ("0.5", "1.5", "2.5", "3.5", "4.5", "5.5"):
+            label_market("ou", f"{side} {line}")
+    for raw in ("Yes", "No"):
+        label_market("btts", raw)
+
+configure_markets(None)
@@ -8,6 +8,7 @@ from .value_builder import plan_day
 from .templates_schedine import render_value_single, render_multipla
 from .repo_sched import ensure_table, enqueue
 from .repo_bets import ensure_tables as ensure_bets, create_betslip, add_selection
+from .jobs import job
 
 import random
 
@@ -53,7 +54,8 @@ def run_morning(cfg, tg, api):
     tz = getattr(cfg, "TZ", "Europe/Rome")
     tzinfo = ZoneInfo(tz)
     today = datetime.now(tzinfo).strftime("%Y-%m-%d")
-    plan = plan_day(api, cfg, today, want_long_legs=10)
+    with job("morning"):
+        plan = plan_day(api, cfg, today, want_long_legs=10)
 
     link = getattr(cfg, "PUBLIC_LINK", "https://t.me/AIProTips")
     blocks = []  # [{kind, legs, payload, first_local}]
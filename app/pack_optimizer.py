@@ -0,0 +1,269 @@
+# app/pack_optimizer.py — pack migliore per branch-and-bound sulle forme dei piani greedy, entro un budget in ms
+from __future__ import annotations
+import time
+from typing import Any, Dict, List, Tuple
+
+from . import value_builder as vb
+from .candidate_index import pareto_front
+
+# come _diversify_league in _select_base
+MAX_PER_LEAGUE = 3
+
+# margine sui bound: probabilità e quota totale nello score sono arrotondate
+_EPS = 1e-4
+
+def _empty_plan() -> Dict[str, List[Dict[str, Any]]]:
+    return {"singole": [], "doppia": [], "tripla": [], "quintupla": [], "long": []}
+
+def pack_shapes(want_long_legs: int) -> List[Tuple[Tuple[str, str, int, int], ...]]:
+    """
+    Le forme dei piani A–I di _choose_best_pack: gruppi (chiave del pack, formato, leg per schedina, schedine).
+    Due doppie (piano D) finiscono concatenate in "doppia" e si valutano come UNA schedina; le singole restano separate.
+    """
+    out = [
+        (("quintupla", "quint", 5, 1), ("singole", "single", 1, 1)),
+        (("quintupla", "quint", 5, 1),),
+        (("tripla", "triple", 3, 1), ("doppia", "double", 2, 1), ("singole", "single", 1, 1)),
+        (("tripla", "triple", 3, 1), ("doppia", "double", 2, 1)),
+        (("doppia", "double", 2, 2), ("singole", "single", 1, 1)),
+        (("singole", "single", 1, 2), ("doppia", "double", 2, 1)),
+        (("tripla", "triple", 3, 1),),
+        (("doppia", "double", 2, 1),),
+        (("singole", "single", 1, 1),),
+    ]
+    out += [(("long", "long", n, 1),) for n in range(want_long_legs, 7, -1)]
+    return out
+
+class _Legs:
+    """Leg ammesse in una schedina (formato, n leg), per p_mod decrescente, con i vincoli del formato."""
+
+    def __init__(self, cands: List[Dict[str, Any]], fmt: str, n: int):
+        fmt_key = "single" if n == 1 else fmt
+        self.min_leg = vb.MIN_PMOD_PER_LEG[fmt_key]
+        self.min_avg = vb.MIN_AVG_PMOD[fmt_key]
+        prof = vb.DIVERSITY_PROFILE[fmt]
+        self.min_cats = prof["min_cats"]
+        self.max_per_cat = prof["max_per_cat"]
+        if fmt == "long" and self.max_per_cat is None:
+            self.max_per_cat = max(2, (n + 2)//3)
+        self.min_total = vb.MIN_TOTAL.get(fmt)
+        lo, hi = vb.RANGES[fmt]
+        # formati con MIN_TOTAL: ammesse anche le leg del secondo pass (_reselect_to_meet_total)
+        boost = (pow(float(self.min_total), 1.0 / n), vb.UPPER_CAP.get(fmt, 1.45)) if self.min_total else None
+        legs = []
+        for c in cands:
+            if c["p_mod"] < self.min_leg:
+                continue
+            ok = vb._fits_range(c["odd"], lo, hi)
+            if not ok and boost:
+                ok = boost[0] <= c["odd"] <= boost[1] and (c["value"] >= vb.VALUE_TH[fmt] or c["p_mod"] >= vb.SAFE_TH[fmt])
+            if ok:
+                legs.append(c)
+        # per p_mod decrescente, poi quota e value: il dominante precede il dominato e pareto_front lo scarta.
+        # Lo score di una schedina non scende mai sostituendo una leg con la sua dominante (stessa fixture,
+        # lega e categoria, p_mod e quota >=): l'ottimo resta lo stesso con molte meno leg da esplorare
+        legs.sort(key=lambda c: (c["p_mod"], float(c["odd"]), c["value"]), reverse=True)
+        legs = pareto_front(legs)
+        self.legs = legs
+        self.p = [float(c["p_mod"]) for c in legs]
+        self.odd = [float(c["odd"]) for c in legs]
+        self.fix = [c["fixture_id"] for c in legs]
+        self.cat = [c["cat"] for c in legs]
+        self.league = [c["league"] for c in legs]
+        # quota massima da i in poi: taglia i rami che non arrivano a MIN_TOTAL
+        self.suf_odd = [0.0] * (len(legs) + 1)
+        for i in range(len(legs) - 1, -1, -1):
+            self.suf_odd[i] = max(self.odd[i], self.suf_odd[i + 1])
+
+    def top_prob(self, k: int) -> float:
+        p = 1.0
+        for x in self.p[:k]:
+            p *= x
+        return p
+
+class _Timeout(Exception):
+    pass
+
+class _Search:
+    def __init__(self, cands: List[Dict[str, Any]], memo: "vb._TicketMemo"):
+        self.cands = cands
+        self.memo = memo
+        self._legs: Dict[Tuple[str, int], _Legs] = {}
+        self.best_score = -1.0
+        self.best_plan: Dict[str, List[Dict[str, Any]]] | None = None
+        self.nodes = 0
+        self.deadline = 0.0
+
+    def legs(self, fmt: str, n: int) -> _Legs:
+        L = self._legs.get((fmt, n))
+        if L is None:
+            L = self._legs[(fmt, n)] = _Legs(self.cands, fmt, n)
+        return L
+
+    def contrib(self, fmt: str, legs: List[Dict[str, Any]]) -> float:
+        # _pack_score = Σ score + 0.15 · Σ prob: ogni schedina pesa score + 0.15·prob
+        return self.memo.score(fmt, legs) + 0.15 * self.memo.prob(legs)
+
+    def shape_bound(self, shape) -> float:
+        """Score massimo della forma ignorando le fixture condivise (-1 = forma impossibile)."""
+        ub = 0.0
+        for key, fmt, n, k in shape:
+            L = self.legs(fmt, n)
+            if len(L.legs) < n * k:
+                return -1.0
+            if key == "singole":
+                ub += k * (0.85 * L.top_prob(n) + 0.3 + _EPS)
+            else:
+                ub += 0.85 * L.top_prob(n * k) + 0.3 + _EPS
+        return ub
+
+    def run(self, shape, deadline: float):
+        self.deadline = deadline
+        self.groups = [(key, fmt, n, k, self.legs(fmt, n)) for key, fmt, n, k in shape]
+        # bound per schedina/gruppo ancora da iniziare e somme in coda
+        self.tick_ub = [0.85 * L.top_prob(n) + 0.3 + _EPS for _, _, n, _, L in self.groups]
+        self.fut = [0.0] * (len(self.groups) + 1)
+        for gi in range(len(self.groups) - 1, -1, -1):
+            key, fmt, n, k, L = self.groups[gi]
+            g_ub = k * self.tick_ub[gi] if key == "singole" else 0.85 * L.top_prob(n * k) + 0.3 + _EPS
+            self.fut[gi] = self.fut[gi + 1] + g_ub
+        self.used: set = set()
+        self.chosen: List[List[List[Dict[str, Any]]]] = [[] for _ in self.groups]
+        self.first: List[List[int]] = [[] for _ in self.groups]
+        self._ticket(0, 0, 0.0, 1.0)
+
+    def _ticket(self, gi: int, si: int, done: float, pg: float):
+        if gi == len(self.groups):
+            plan = _empty_plan()
+            for (key, _, _, _, _), subs in zip(self.groups, self.chosen):
+                for legs in subs:
+                    plan[key] = plan[key] + legs
+            score = vb._pack_score(vb._plan_tickets(plan), self.memo)
+            if score > self.best_score:
+                self.best_score = score; self.best_plan = plan
+            return
+        # schedine uguali nello stesso gruppo: prima leg in ordine crescente (niente permutazioni)
+        start = self.first[gi][si - 1] + 1 if si else 0
+        self._leg(gi, si, [], start, 1.0, 0.0, 1.0, {}, {}, done, pg)
+
+    def _leg(self, gi: int, si: int, picked: List[int], j: int, pp: float, sp: float, po: float,
+             cats: Dict[str, int], leagues: Dict[str, int], done: float, pg: float):
+        key, fmt, n, k, L = self.groups[gi]
+        merged = key != "singole"
+        r = n - len(picked)
+        if r == 0:
+            self._complete(gi, si, picked, sp, cats, done, pg * pp)
+            return
+        fut = self.fut[gi + 1]
+        rest_legs = n * (k - si - 1)
+        top = L.p[0]
+        for i in range(j, len(L.legs) - r + 1):
+            self.nodes += 1
+            if not self.nodes & 1023 and time.perf_counter() > self.deadline:
+                raise _Timeout()
+            p = L.p[i]
+            # p_mod decrescente: se il bound non supera il migliore con questa leg, nemmeno con le successive
+            if merged:
+                ub = done + 0.85 * pg * pp * p ** r * top ** rest_legs + 0.3 + _EPS + fut
+            else:
+                ub = done + 0.85 * pp * p ** r + 0.3 + _EPS + (k - si - 1) * self.tick_ub[gi] + fut
+            if ub <= self.best_score:
+                break
+            if (sp + p * r) / n < L.min_avg - 1e-12:
+                break
+            f = L.fix[i]
+            if f in self.used:
+                continue
+            c = L.cat[i]
+            if L.max_per_cat and cats.get(c, 0) >= L.max_per_cat:
+                continue
+            lg = L.league[i]
+            if leagues.get(lg, 0) >= MAX_PER_LEAGUE:
+                continue
+            if len(cats) + (0 if c in cats else 1) + (r - 1) < L.min_cats:
+                continue
+            if L.min_total and po * L.odd[i] * L.suf_odd[i + 1] ** (r - 1) < L.min_total - 0.006:
+                continue
+            self.used.add(f); cats[c] = cats.get(c, 0) + 1; leagues[lg] = leagues.get(lg, 0) + 1; picked.append(i)
+            try:
+                self._leg(gi, si, picked, i + 1, pp * p, sp + p, po * L.odd[i], cats, leagues, done, pg)
+            finally:
+                picked.pop(); self.used.discard(f)
+                cats[c] -= 1
+                if not cats[c]: del cats[c]
+                leagues[lg] -= 1
+
+    def _complete(self, gi: int, si: int, picked: List[int], sp: float, cats: Dict[str, int], done: float, pg: float):
+        key, fmt, n, k, L = self.groups[gi]
+        # stessi controlli di _enforce_diversity / _select_with_min_total sulla schedina finita
+        if sp / n < L.min_avg or len(cats) < L.min_cats:
+            return
+        legs = [L.legs[i] for i in picked]
+        if L.min_total and vb._compute_total(legs) < L.min_total:
+            return
+        self.chosen[gi].append(legs); self.first[gi].append(picked[0])
+        try:
+            if key == "singole":
+                done += self.contrib(fmt, legs)
+                if si + 1 < k:
+                    self._ticket(gi, si + 1, done, 1.0)
+                else:
+                    self._ticket(gi + 1, 0, done, 1.0)
+            elif si + 1 < k:
+                self._ticket(gi, si + 1, done, pg)
+            else:
+                whole = [leg for sub in self.chosen[gi] for leg in sub]
+                self._ticket(gi + 1, 0, done + self.contrib(fmt, whole), 1.0)
+        finally:
+            self.chosen[gi].pop(); self.first[gi].pop()
+
+def search_pack(cands: List[Dict[str, Any]], want_long_legs: int, budget_ms: int) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Any]]:
+    """
+    Parte dal pack greedy (_choose_best_pack) e cerca, forma per forma, combinazioni di schedine su fixture
+    disgiunte con score più alto, potando sul bound di _pack_score. Ogni forma ha una quota del budget
+    rimasto; a tempo scaduto resta il migliore trovato. → (plan, info per bench/log).
+    """
+    t0 = time.perf_counter()
+    deadline = t0 + max(0, int(budget_ms)) / 1000.0
+    memo = vb._TicketMemo()
+    s = _Search(cands, memo)
+    greedy = vb._choose_best_pack(cands, want_long_legs)
+    greedy_score = vb._pack_score(vb._plan_tickets(greedy), memo) if any(greedy.values()) else -1.0
+    s.best_score = greedy_score; s.best_plan = greedy
+
+    shapes = [(s.shape_bound(sh), sh) for sh in pack_shapes(want_long_legs)]
+    shapes = [x for x in shapes if x[0] > 0]
+    shapes.sort(key=lambda x: -x[0])
+    # giri successivi: le forme interrotte ripartono col budget avanzato e un incumbent migliore
+    pending = shapes; timed_out = False
+    while pending:
+        interrupted = []
+        for left, (ub, shape) in zip(range(len(pending), 0, -1), pending):
+            now = time.perf_counter()
+            if now >= deadline:
+                interrupted.append((ub, shape))
+                continue
+            if ub <= s.best_score:
+                continue
+            try:
+                s.run(shape, now + (deadline - now) / left)
+            except _Timeout:
+                interrupted.append((ub, shape))
+        if time.perf_counter() >= deadline or len(interrupted) == len(pending):
+            timed_out = bool(interrupted)
+            break
+        pending = interrupted
+    info = {
+        "greedy_score": round(greedy_score, 6),
+        "score": round(s.best_score, 6),
+        "nodes": s.nodes,
+        "timed_out": timed_out,
+        "ms": round((time.perf_counter() - t0) * 1000, 1),
+    }
+    return s.best_plan or _empty_plan(), info
+
+def optimize_pack(cands: List[Dict[str, Any]], want_long_legs: int, budget_ms: int) -> Dict[str, List[Dict[str, Any]]]:
+    plan, info = search_pack(cands, want_long_legs, budget_ms)
+    print(f"[pack_optimizer] score {info['greedy_score']:.4f} → {info['score']:.4f} "
+          f"({info['nodes']} nodi, {info['ms']}ms{', budget esaurito' if info['timed_out'] else ''})")
+    return plan
@@ -0,0 +1,113 @@
+# app/rate_limiter.py — token bucket con priorità, guidato dagli header rate-limit di API-Football
+from __future__ import annotations
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Optional
+
+# classi di priorità (più basso = servito prima)
+PRIO_LIVE = 0        # LiveAlerts.tick, Closer.tick: non devono mai restare in coda
+PRIO_INTERACTIVE = 1 # comandi admin, watchlist
+PRIO_BULK = 2        # crawl del mattino (quote + stats)
+
+PRIORITY = {
+    "live": PRIO_LIVE,
+    "closer": PRIO_LIVE,
+    "commands": PRIO_INTERACTIVE,
+    "watchlist": PRIO_INTERACTIVE,
+    "morning": PRIO_BULK,
+}
+
+def priority_for(job_name: str) -> int:
+    return PRIORITY.get(job_name, PRIO_INTERACTIVE)
+
+class RateScheduler:
+    """
+    Tutte le chiamate API passano da acquire(prio):
+    - token bucket a `per_minute` richieste/min con burst piccolo → il fan-out dello
+      StatsEngine viene spalmato invece di sparare decine di richieste insieme;
+    - una sola coda ordinata per (priorità, arrivo): un token libero va sempre al
+      live/closer prima che al crawl bulk;
+    - quota giornaliera: sotto `daily_reserve` richieste rimaste il BULK viene rifiutato,
+      così il live ha sempre margine fino a fine giornata.
+    I limiti reali vengono letti dagli header di ogni risposta (update_from_headers).
+    `clock` (default time.monotonic) è l'orologio del bucket: i test ne passano uno finto.
+    """
+
+    def __init__(self, per_minute: int = 30, burst: Optional[int] = None, daily_reserve: int = 100,
+                 clock: Callable[[], float] = time.monotonic):
+        self.per_minute = max(1, int(per_minute))
+        self.capacity = float(burst if burst else max(1, self.per_minute // 10))
+        self.daily_reserve = int(daily_reserve)
+        self.daily_remaining: Optional[int] = None
+        self.minute_remaining: Optional[int] = None
+        self._clock = clock
+        self._tokens = self.capacity
+        self._last = clock()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self._waiters: list = []
+        self._seq = itertools.count()
+
+    def _refill(self, now: float):
+        rate = self.per_minute / 60.0
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * rate)
+        self._last = now
+
+    def _quota_exhausted(self, prio: int) -> bool:
+        return (prio >= PRIO_BULK and self.daily_remaining is not None
+                and self.daily_remaining <= self.daily_reserve)
+
+    def acquire(self, prio: int = PRIO_INTERACTIVE):
+        with self._cond:
+            entry = (prio, next(self._seq))
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    if self._quota_exhausted(prio):
+                        raise RuntimeError(f"API-Football quota: restano {self.daily_remaining} richieste (riserva {self.daily_reserve})")
+                    now = self._clock()
+                    self._refill(now)
+                    if self._waiters[0] == entry and self._tokens >= 1.0 and now >= self._paused_until:
+                        self._tokens -= 1.0
+                        return
+                    wait = max(self._paused_until - now, (1.0 - self._tokens) * 60.0 / self.per_minute, 0.01)
+                    self._cond.wait(timeout=wait)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def update_from_headers(self, headers):
+        """Header API-Football: limite/rimanenti al minuto e rimanenti giornaliere."""
+        def _int(name: str) -> Optional[int]:
+            try:
+                v = headers.get(name)
+                return int(v) if v is not None else None
+            except Exception:
+                return None
+        per_min = _int("X-RateLimit-Limit")
+        min_left = _int("X-RateLimit-Remaining")
+        day_left = _int("x-ratelimit-requests-remaining")
+        with self._cond:
+            if per_min:
+                self.per_minute = per_min
+                self.capacity = float(max(1, per_min // 10))
+            if min_left is not None:
+                self.minute_remaining = min_left
+                self._tokens = min(self._tokens, float(min_left))
+            if day_left is not None:
+                self.daily_remaining = day_left
+            self._cond.notify_all()
+
+    def on_rate_limited(self, retry_after=None):
+        """429 (o errors.rateLimit): svuota il bucket e sospende tutti per retry_after secondi."""
+        try:
+            pause = float(retry_after) if retry_after is not None else 10.0
+        except Exception:
+            pause = 10.0
+        with self._cond:
+            self._tokens = 0.0
+            self._paused_until = max(self._paused_until, self._clock() + pause)
+            self._cond.notify_all()
@@ -0,0 +1,157 @@
+# app/records.py — record compatti (__slots__) per entry quote e candidati del value builder
+from __future__ import annotations
+import sys
+from array import array
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Tuple
+
+from .markets import active_markets
+
+_NAN = float("nan")
+
+@lru_cache(maxsize=16)
+def _positions(names: Tuple[str, ...]) -> Dict[str, int]:
+    return {n: i for i, n in enumerate(names)}
+
+def intern_str(s: Any) -> Any:
+    return sys.intern(s) if isinstance(s, str) else s
+
+@lru_cache(maxsize=4096)
+def league_label(country: str, name: str) -> str:
+    """'Country — Name' costruita (e internata) una volta per lega, non per candidato."""
+    return sys.intern(f"{country} — {name}")
+
+class Markets(Mapping):
+    """
+    Quote per mercato in un array di double a indice fisso (ordine di active_markets()),
+    NaN = mercato assente. Si legge come il vecchio dict: mk["1"], mk.get("X2"), "Gol" in mk.
+    """
+    __slots__ = ("names", "pos", "vals")
+
+    def __init__(self, names: Tuple[str, ...], vals: array):
+        self.names = names
+        self.pos = _positions(names)  # dict condiviso da tutte le entry con lo stesso ordine
+        self.vals = vals
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, float], names: Tuple[str, ...] | None = None) -> "Markets":
+        names = names or active_markets()
+        pos = _positions(names)
+        vals = array("d", [_NAN]) * len(names)
+        for k, v in d.items():
+            i = pos.get(k)
+            if i is not None:
+                vals[i] = float(v)
+        return cls(names, vals)
+
+    def __getitem__(self, key: str) -> float:
+        i = self.pos.get(key)
+        if i is None:
+            raise KeyError(key)
+        v = self.vals[i]
+        if v != v:
+            raise KeyError(key)
+        return v
+
+    def get(self, key: str, default=None):
+        i = self.pos.get(key)
+        if i is None:
+            return default
+        v = self.vals[i]
+        return default if v != v else v
+
+    def __contains__(self, key) -> bool:
+        i = self.pos.get(key)
+        return i is not None and self.vals[i] == self.vals[i]
+
+    def __iter__(self) -> Iterator[str]:
+        vals = self.vals
+        return (n for i, n in enumerate(self.names) if vals[i] == vals[i])
+
+    def __len__(self) -> int:
+        return sum(1 for v in self.vals if v == v)
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+class _SlotRecord:
+    """Accesso in stile dict ai campi (rec["home"], rec.get("x", d)) per il codice esistente."""
+    __slots__ = ()
+    _FIELDS: Tuple[str, ...] = ()
+
+    def __getitem__(self, key: str):
+        if key not in self._FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, val):
+        if key not in self._FIELDS:
+            raise KeyError(key)
+        setattr(self, key, val)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self._FIELDS else default
+
+    def __contains__(self, key) -> bool:
+        return key in self._FIELDS
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._FIELDS
+
+    def items(self):
+        return [(k, getattr(self, k)) for k in self._FIELDS]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+class OddsEntry(_SlotRecord):
+    """
+    Fixture con quote Bet365 normalizzate (ex dict di parse_odds_entries).
+    league_id/season/home_id/away_id (0 = non noti) bastano allo StatsEngine: niente /fixtures?id= per entry.
+    """
+    _FIELDS = ("fixture_id", "kickoff_iso", "league_country", "league_name",
+               "home", "away", "markets", "last_update",
+               "league_id", "season", "home_id", "away_id")
+    __slots__ = _FIELDS
+
+    def __init__(self, fixture_id: int, kickoff_iso: str, league_country: str, league_name: str,
+                 home: str, away: str, markets: Markets | Dict[str, float], last_update: str,
+                 league_id: int = 0, season: int = 0, home_id: int = 0, away_id: int = 0):
+        self.fixture_id = fixture_id
+        self.kickoff_iso = kickoff_iso
+        self.league_country = intern_str(league_country)
+        self.league_name = intern_str(league_name)
+        self.home = intern_str(home)
+        self.away = intern_str(away)
+        self.markets = markets if isinstance(markets, Markets) else Markets.from_dict(markets)
+        self.last_update = last_update
+        self.league_id = league_id
+        self.season = season
+        self.home_id = home_id
+        self.away_id = away_id
+
+class Candidate(_SlotRecord):
+    """Una giocata (fixture × mercato) con probabilità implicita/modello e value."""
+    _FIELDS = ("fixture_id", "league", "home", "away", "kickoff_iso", "market", "odd",
+               "p_imp", "p_mod", "value", "cat", "markets_all")
+    __slots__ = _FIELDS
+
+    def __init__(self, fixture_id: int, league: str, home: str, away: str, kickoff_iso: str,
+                 market: str, odd: float, p_imp: float, p_mod: float, value: float,
+                 cat: str, markets_all: Markets):
+        self.fixture_id = fixture_id
+        self.league = league
+        self.home = home
+        self.away = away
+        self.kickoff_iso = kickoff_iso
+        self.market = market
+        self.odd = odd
+        self.p_imp = p_imp
+        self.p_mod = p_mod
+        self.value = value
+        self.cat = cat
+        self.markets_all = markets_all
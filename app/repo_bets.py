@@ -1,7 +1,10 @@
 # app/repo_bets.py — unquote credenziali + fallback league_* + ENUM safe
 from __future__ import annotations
 import os
-import pymysql
+try:
+    import pymysql
+except ImportError:  # solo per il bench/test senza DB; in produzione è in requirements
+    pymysql = None
 from urllib.parse import urlparse, unquote
 from contextlib import contextmanager
 from typing import Dict, Any, List, Tuple
@@ -23,6 +26,8 @@ def _conn():
     url = os.getenv("MYSQL_URL") or os.getenv("DATABASE_URL")
     if not url:
         raise RuntimeError("MYSQL_URL non configurato")
+    if pymysql is None:
+        raise RuntimeError("PyMySQL non installato")
     return pymysql.connect(**_parse_mysql_url(url))
 
 @contextmanager
@@ -0,0 +1,46 @@
+# app/singleflight.py — coalescenza di richieste identiche concorrenti (stile "singleflight")
+from __future__ import annotations
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+class _Call:
+    __slots__ = ("done", "result", "err")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.err: BaseException | None = None
+
+class SingleFlight:
+    """
+    do(key, fn): se un altro thread sta già eseguendo la stessa chiave, si attende
+    il SUO risultato invece di rifare il lavoro; tutti ricevono lo stesso oggetto
+    (o la stessa eccezione). Finita la chiamata la chiave si libera: nessuna cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+        if not leader:
+            call.done.wait()
+            if call.err is not None:
+                raise call.err
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.err = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
@@ -1,8 +1,20 @@
 # app/stats_engine.py
 from __future__ import annotations
-from typing import Dict, Any, List, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Iterable, Iterator, List, Tuple
 from functools import lru_cache
 from statistics import mean
+from dateutil import parser as duparser
+
+from .fixture_store import FINISHED, CLOSED, CLOSED_PARAM
+from .jobs import bind_job
+from .singleflight import SingleFlight
+
+try:  # NumPy opzionale: senza, features_many() calcola i tassi squadra per squadra
+    from .team_rates import rates_batch
+except ImportError:
+    rates_batch = None
 
 # Questo modulo usa SOLO api._get(...) del tuo APIFootball
 # per non toccare la logica consolidata.
@@ -39,6 +51,47 @@ def _team_goals_in_fx(fx: Dict[str, Any], team_id: int) -> Tuple[int, int]:
     except Exception:
         return 0, 0
 
+def _fixture_ts(fx: Dict[str, Any]) -> float:
+    info = fx.get("fixture") or {}
+    if info.get("timestamp"):
+        return float(info["timestamp"])
+    try:
+        return duparser.isoparse(info.get("date") or "").timestamp()
+    except Exception:
+        return 0.0
+
+def _status(fx: Dict[str, Any]) -> str:
+    return ((fx.get("fixture") or {}).get("status") or {}).get("short") or ""
+
+def _index_by_team(fixtures: List[Dict[str, Any]]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    team_id → partite chiuse (CLOSED: concluse + rinviate/annullate) in cui ha giocato, dalla più recente.
+    Le non giocate restano nell'indice perché occupano posti nelle ultime N come in /fixtures?team=&last=.
+    """
+    done = [fx for fx in fixtures if _status(fx) in CLOSED]
+    done.sort(key=lambda fx: (_fixture_ts(fx), int((fx.get("fixture") or {}).get("id") or 0)), reverse=True)
+    out: Dict[int, List[Dict[str, Any]]] = {}
+    for fx in done:
+        teams = fx.get("teams") or {}
+        for side in ("home", "away"):
+            tid = int((teams.get(side) or {}).get("id") or 0)
+            if tid:
+                out.setdefault(tid, []).append(fx)
+    return out
+
+def _entry_ids(e: Any) -> Tuple[int, int, int, int] | None:
+    """(league_id, season, home_id, away_id) di una OddsEntry, None se manca anche uno solo."""
+    ids = tuple(int(e.get(k) or 0) for k in ("league_id", "season", "home_id", "away_id"))
+    return ids if all(ids) else None
+
+def _fixture_stub(fixture_id: int, league_id: int, season: int, home_id: int, away_id: int) -> Dict[str, Any]:
+    """Fixture minima in formato /fixtures: i soli campi che legge features_for_fixture."""
+    return {
+        "fixture": {"id": fixture_id},
+        "league": {"id": league_id, "season": season},
+        "teams": {"home": {"id": home_id}, "away": {"id": away_id}},
+    }
+
 class StatsEngine:
     """
     Recupera e compatta statistiche 'essenziali' per un match:
@@ -48,26 +101,56 @@ class StatsEngine:
     Tutto in RAM (cache), senza toccare il tuo api_football.
     """
 
-    def __init__(self, api, league_scope_same_league: bool = True):
+    def __init__(self, api, league_scope_same_league: bool = True, store=None):
         self.api = api
         self.same_league = league_scope_same_league
+        # FixtureStore opzionale: storico concluso su disco, una sync per lega invece di una chiamata per squadra
+        self.store = store
+        self._synced: set = set()
+        # prefetch per lega/stagione: (league_id, season) → team_id → concluse, più recenti prima
+        self._league_index: Dict[Tuple[int, int], Dict[int, List[Dict[str, Any]]]] = {}
         self._fx_cache: Dict[int, Dict[str, Any]] = {}
         self._team_last_cache: Dict[Tuple[int, int, int, int], List[Dict[str, Any]]] = {}
         # chiave: (team_id, league_id, season, last)
+        # cache condivise tra i worker di iter_features: una sola richiesta per chiave anche in parallelo
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
 
     def _get_fixture(self, fixture_id: int) -> Dict[str, Any]:
-        if fixture_id in self._fx_cache:
-            return self._fx_cache[fixture_id]
+        fx = self._fx_cache.get(fixture_id)
+        if fx is not None:
+            return fx
+        return self._flight.do(("fx", fixture_id), lambda: self._load_fixture(fixture_id))
+
+    def _load_fixture(self, fixture_id: int) -> Dict[str, Any]:
         js = self.api._get("/fixtures", {"id": fixture_id})
         arr = js.get("response", []) or []
         fx = arr[0] if arr else {}
-        self._fx_cache[fixture_id] = fx
+        with self._lock:
+            self._fx_cache[fixture_id] = fx
         return fx
 
     def _get_team_last(self, team_id: int, league_id: int, season: int, last: int = 10) -> List[Dict[str, Any]]:
         key = (team_id, league_id if self.same_league else -1, season if self.same_league else -1, last)
-        if key in self._team_last_cache:
-            return self._team_last_cache[key]
+        out = self._team_last_cache.get(key)
+        if out is not None:
+            return out
+        out = self._flight.do(("last", key), lambda: self._load_team_last(team_id, league_id, season, last))
+        with self._lock:
+            self._team_last_cache[key] = out
+        return out
+
+    def _load_team_last(self, team_id: int, league_id: int, season: int, last: int) -> List[Dict[str, Any]]:
+        idx = self._league_index.get((league_id, season)) if self.same_league else None
+        if idx is not None:
+            # stessa finestra di /fixtures?team=&last=: prima le ultime N chiuse, poi solo le concluse
+            return [fx for fx in idx.get(team_id, [])[:last] if _status(fx) in FINISHED]
+        if self.store is not None and self.same_league and league_id and season:
+            try:
+                self._sync_league(league_id, season)
+                return self.store.team_last(team_id, league_id, season, last)
+            except Exception as e:
+                print(f"[stats] store lega {league_id}/{season} non disponibile, fallback API: {e}")
         params = {"team": team_id, "last": last}
         if self.same_league:
             params["league"] = league_id
@@ -80,9 +163,122 @@ class StatsEngine:
             st = ((fx.get("fixture", {}) or {}).get("status", {}) or {}).get("short") or ""
             if st in ("FT", "AET", "PEN"):
                 out.append(fx)
-        self._team_last_cache[key] = out
         return out
 
+    # --- prefetch bulk: O(leghe) richieste invece di O(fixture) ---
+    def prefetch_date(self, date: str, fixture_ids: Iterable[int]) -> int:
+        """
+        Una lettura di /fixtures?date= dà lega, stagione e squadre di tutte le partite del giorno:
+        riempie _fx_cache (niente /fixtures?id= per fixture) e poi prefetch_leagues() sulle leghe
+        in gioco. → numero di leghe caricate.
+        """
+        wanted = {int(f) for f in fixture_ids}
+        pairs = set()
+        for fx in self.api.fixtures_by_date(date):
+            fid = int(((fx.get("fixture") or {}).get("id")) or 0)
+            if fid not in wanted:
+                continue
+            self._fx_cache[fid] = fx
+            league = fx.get("league") or {}
+            lid = int(league.get("id") or 0); season = int(league.get("season") or 0)
+            if lid and season:
+                pairs.add((lid, season))
+        return self.prefetch_leagues(pairs)
+
+    def prefetch_entries(self, entries: Iterable[Any], date: str | None = None) -> int:
+        """
+        Come prefetch_date(), ma con gli id già portati dalle OddsEntry (league_id/season/home_id/away_id):
+        nessuna chiamata per sapere lega e squadre. Solo le entry senza id passano da /fixtures?date=.
+        """
+        pairs, missing = set(), []
+        for e in entries:
+            fid = int(e["fixture_id"])
+            ids = _entry_ids(e)
+            if ids is None:
+                missing.append(fid)
+                continue
+            self._fx_cache[fid] = _fixture_stub(fid, *ids)
+            pairs.add(ids[:2])
+        n = self.prefetch_leagues(pairs)
+        if missing and date:
+            n += self.prefetch_date(date, missing)
+        return n
+
+    def prefetch_leagues(self, pairs: Iterable[Tuple[int, int]]) -> int:
+        """Storico chiuso di ogni lega/stagione (store o /fixtures?league=&season=&status=), indicizzato per squadra."""
+        n = 0
+        for lid, season in sorted(set(pairs)):
+            if (lid, season) in self._league_index:
+                continue
+            try:
+                if self.store is not None:
+                    self._sync_league(lid, season)
+                    fixtures = self.store.league_fixtures(lid, season)
+                else:
+                    fixtures = self.api._get_paged("/fixtures", {"league": lid, "season": season, "status": CLOSED_PARAM})
+            except Exception as e:
+                print(f"[stats] prefetch lega {lid}/{season} fallito, resto per-squadra: {e}")
+                continue
+            self._league_index[(lid, season)] = _index_by_team(fixtures)
+            n += 1
+        return n
+
+    def _sync_league(self, league_id: int, season: int):
+        if (league_id, season) in self._synced:
+            return
+        self._flight.do(("sync", league_id, season), lambda: self.store.sync_league(self.api, league_id, season))
+        with self._lock:
+            self._synced.add((league_id, season))
+
+    def iter_features(self, fixture_ids: List[int], workers: int = 1) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        (posizione, features) man mano che le fixture completano, su `workers` thread.
+        Una fixture in errore viene saltata (come nel ciclo seriale).
+        """
+        return self._iter_parallel(self.features_for_fixture, fixture_ids, workers)
+
+    def features_many(self, fixture_ids: List[int], workers: int = 1) -> Dict[int, Dict[str, Any]]:
+        """
+        posizione → features, come dict(iter_features(...)), ma con i tassi di tutte le squadre
+        calcolati in un solo passaggio vettoriale (team_rates.rates_batch) invece che squadra per squadra.
+        """
+        ctx = dict(self._iter_parallel(self._fixture_context, fixture_ids, workers))
+        order = sorted(ctx)
+        items = []
+        for pos in order:
+            c = ctx[pos]
+            items.append((c["home_id"], c["last_home"]))
+            items.append((c["away_id"], c["last_away"]))
+        if rates_batch is not None:
+            rates = rates_batch(items)
+        else:
+            rates = [self._rates_from_last(t, last) for t, last in items]
+        out: Dict[int, Dict[str, Any]] = {}
+        for i, pos in enumerate(order):
+            out[pos] = self._features(ctx[pos], rates[2 * i], rates[2 * i + 1])
+        return out
+
+    def _iter_parallel(self, fn, fixture_ids: List[int], workers: int) -> Iterator[Tuple[int, Any]]:
+        if workers <= 1 or len(fixture_ids) <= 1:
+            for pos, fid in enumerate(fixture_ids):
+                try:
+                    yield pos, fn(fid)
+                except Exception:
+                    continue
+            return
+        work = bind_job(fn)
+        ex = ThreadPoolExecutor(max_workers=min(int(workers), len(fixture_ids)))
+        try:
+            futs = {ex.submit(work, fid): pos for pos, fid in enumerate(fixture_ids)}
+            for f in as_completed(futs):
+                try:
+                    res = f.result()
+                except Exception:
+                    continue
+                yield futs[f], res
+        finally:
+            ex.shutdown(wait=False, cancel_futures=True)
+
     def _rates_from_last(self, team_id: int, last_fx: List[Dict[str, Any]]) -> Dict[str, float]:
         if not last_fx:
             return {
@@ -125,8 +321,10 @@ class StatsEngine:
             d[k] = clamp(d[k], 0.0, 1.0)
         return d
 
-    def features_for_fixture(self, fixture_id: int) -> Dict[str, Any]:
+    def features_for_fixture(self, fixture_id: int, league_id: int = 0, season: int = 0,
+                             home_id: int = 0, away_id: int = 0) -> Dict[str, Any]:
         """
+        Con lega, stagione e squadre già note (es. da OddsEntry) salta /fixtures?id=.
         Ritorna:
         {
           "league_id": int, "season": int,
@@ -134,22 +332,37 @@ class StatsEngine:
           "home": {...rates...}, "away": {...rates...}
         }
         """
-        fx = self._get_fixture(fixture_id)
+        c = self._fixture_context(fixture_id, league_id, season, home_id, away_id)
+        return self._features(c, self._rates_from_last(c["home_id"], c["last_home"]),
+                              self._rates_from_last(c["away_id"], c["last_away"]))
+
+    def _fixture_context(self, fixture_id: int, league_id: int = 0, season: int = 0,
+                         home_id: int = 0, away_id: int = 0) -> Dict[str, Any]:
+        """Lega, stagione, squadre e ultime concluse di casa/trasferta: tutto l'I/O di una fixture."""
+        if league_id and season and home_id and away_id:
+            fx = _fixture_stub(fixture_id, league_id, season, home_id, away_id)
+        else:
+            fx = self._get_fixture(fixture_id)
         league = (fx.get("league") or {})
         league_id = int(league.get("id") or 0)
         season = int(league.get("season") or 0)
         teams = (fx.get("teams") or {})
         home_id = int((teams.get("home") or {}).get("id") or 0)
         away_id = int((teams.get("away") or {}).get("id") or 0)
+        return {
+            "league_id": league_id, "season": season,
+            "home_id": home_id, "away_id": away_id,
+            "last_home": self._get_team_last(home_id, league_id, season, last=10),
+            "last_away": self._get_team_last(away_id, league_id, season, last=10),
+        }
 
-        last_home = self._get_team_last(home_id, league_id, season, last=10)
-        last_away = self._get_team_last(away_id, league_id, season, last=10)
-
+    @staticmethod
+    def _features(c: Dict[str, Any], home: Dict[str, float], away: Dict[str, float]) -> Dict[str, Any]:
         return {
-            "league_id": league_id,
-            "season": season,
-            "home_id": home_id,
-            "away_id": away_id,
-            "home": self._rates_from_last(home_id, last_home),
-            "away": self._rates_from_last(away_id, last_away),
+            "league_id": c["league_id"],
+            "season": c["season"],
+            "home_id": c["home_id"],
+            "away_id": c["away_id"],
+            "home": home,
+            "away": away,
         }
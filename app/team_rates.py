@@ -0,0 +1,98 @@
+# app/team_rates.py — tassi squadra (forma, medie gol, over/under, btts, clean sheet) in un passaggio NumPy
+from __future__ import annotations
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+# default e clamp IDENTICI a StatsEngine._rates_from_last
+DEFAULT_RATES = {
+    "form_pts_rate": 0.5, "gf_avg": 1.2, "ga_avg": 1.1,
+    "tot_avg": 2.3, "over15": 0.65, "over25": 0.50,
+    "under35": 0.70, "btts": 0.50, "cs": 0.30,
+}
+_CLAMP_HI = {"gf_avg": 3.5, "ga_avg": 3.5, "tot_avg": 4.5}
+FORM_GAMES = 5
+
+def _goals_row(fx: Dict[str, Any], team_id: int) -> Tuple[int, int, bool]:
+    """(gol fatti, gol subiti, ok); ok=False → dati rotti: 0-0 per le medie ma 0 punti (come il loop originale)."""
+    try:
+        t_home = fx["teams"]["home"]["id"]
+        gh = int(fx["goals"]["home"] or 0)
+        ga = int(fx["goals"]["away"] or 0)
+    except Exception:
+        return 0, 0, False
+    return (gh, ga, True) if team_id == t_home else (ga, gh, True)
+
+def goal_arrays(items: List[Tuple[int, List[Dict[str, Any]]]]):
+    """
+    [(team_id, ultime partite)] → matrici (T × L) gol fatti/subiti, maschera partite presenti
+    e validità; L = storico più lungo, le righe corte sono riempite e mascherate.
+    """
+    T = len(items)
+    L = max((len(last) for _, last in items), default=0)
+    gf = np.zeros((T, L), dtype=np.int64)
+    ga = np.zeros((T, L), dtype=np.int64)
+    ok = np.zeros((T, L), dtype=bool)
+    n = np.zeros(T, dtype=np.int64)
+    for i, (team_id, last) in enumerate(items):
+        n[i] = len(last)
+        for j, fx in enumerate(last):
+            gf[i, j], ga[i, j], ok[i, j] = _goals_row(fx, team_id)
+    mask = np.arange(L)[None, :] < n[:, None]
+    return gf, ga, mask, ok
+
+def rates_from_goal_arrays(gf, ga, mask, ok) -> List[Dict[str, float]]:
+    """
+    Tutti i tassi per tutte le squadre in un passaggio vettoriale.
+    Le somme restano intere e si divide una volta sola: stesso risultato (al bit) di statistics.mean.
+    """
+    T = gf.shape[0]
+    games = mask.sum(axis=1)
+    tot = gf + ga
+    m = mask
+    sums = {
+        "gf": np.where(m, gf, 0).sum(axis=1),
+        "ga": np.where(m, ga, 0).sum(axis=1),
+        "tot": np.where(m, tot, 0).sum(axis=1),
+        "over15": (m & (tot >= 2)).sum(axis=1),
+        "over25": (m & (tot >= 3)).sum(axis=1),
+        "under35": (m & (tot <= 3)).sum(axis=1),
+        "btts": (m & (gf >= 1) & (ga >= 1)).sum(axis=1),
+        "cs": (m & (ga == 0)).sum(axis=1),
+    }
+    k = min(FORM_GAMES, gf.shape[1])
+    f_gf, f_ga, f_ok, f_m = gf[:, :k], ga[:, :k], ok[:, :k], m[:, :k]
+    pts = np.where(f_ok & f_m, np.where(f_gf > f_ga, 3, np.where(f_gf == f_ga, 1, 0)), 0).sum(axis=1)
+    n5 = f_m.sum(axis=1)
+
+    # liste Python una volta sola: la divisione int/int per riga è esatta come nel loop originale
+    g = games.tolist(); p = pts.tolist(); q = n5.tolist()
+    cols = {key: v.tolist() for key, v in sums.items()}
+    out: List[Dict[str, float]] = []
+    for i in range(T):
+        n = g[i]
+        if not n:
+            out.append(dict(DEFAULT_RATES))
+            continue
+        d = {
+            "form_pts_rate": p[i] / (3 * q[i]),
+            "gf_avg": cols["gf"][i] / n,
+            "ga_avg": cols["ga"][i] / n,
+            "tot_avg": cols["tot"][i] / n,
+            "over15": cols["over15"][i] / n,
+            "over25": cols["over25"][i] / n,
+            "under35": cols["under35"][i] / n,
+            "btts": cols["btts"][i] / n,
+            "cs": cols["cs"][i] / n,
+        }
+        for key, v in d.items():
+            hi = _CLAMP_HI.get(key, 1.0)
+            d[key] = 0.0 if v < 0.0 else (hi if v > hi else v)
+        out.append(d)
+    return out
+
+def rates_batch(items: List[Tuple[int, List[Dict[str, Any]]]]) -> List[Dict[str, float]]:
+    """Equivalente vettoriale di [StatsEngine._rates_from_last(t, last) for t, last in items]."""
+    if not items:
+        return []
+    return rates_from_goal_arrays(*goal_arrays(items))
@@ -1,11 +1,27 @@
-import requests
+import time
+
+from .http_session import build_session, DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE
+from .telemetry import metrics, SRC_NET, SRC_ERROR
 
 class TelegramClient:
-    def __init__(self, token: str):
+    def __init__(self, token: str, pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE):
         self.base = f"https://api.telegram.org/bot{token}"
+        # keep-alive: getUpdates (long polling) e sendMessage riusano le stesse connessioni
+        self.session = build_session(pool_connections, pool_maxsize)
+
+    def _call(self, http_method: str, method: str, **kw):
+        t0 = time.perf_counter()
+        try:
+            r = self.session.request(http_method, f"{self.base}/{method}", **kw)
+        except Exception:
+            metrics.observe("telegram", method, t0, SRC_ERROR)
+            raise
+        metrics.observe("telegram", method, t0, SRC_NET if r.ok else SRC_ERROR, len(r.content))
+        return r
 
     def send_message(self, chat_id: int, text: str, disable_web_page_preview: bool = True, parse_mode: str = "HTML"):
-        r = requests.post(f"{self.base}/sendMessage", json={
+        r = self._call("POST", "sendMessage", json={
             "chat_id": chat_id,
             "text": text,
             "disable_web_page_preview": disable_web_page_preview,
@@ -18,9 +34,13 @@ class TelegramClient:
         params = {"timeout": timeout}
         if offset is not None:
             params["offset"] = offset
-        r = requests.get(f"{self.base}/getUpdates", params=params, timeout=timeout+5)
+        r = self._call("GET", "getUpdates", params=params, timeout=timeout+5)
         r.raise_for_status()
         js = r.json()
         if not js.get("ok"):
             return []
         return js.get("result", [])
+
+    def delete_webhook(self):
+        r = self._call("GET", "deleteWebhook", timeout=5)
+        return r.ok
@@ -0,0 +1,197 @@
+# app/telemetry.py — contatori per endpoint × job: chiamate, latenze, bytes, cache hit, quota API
+from __future__ import annotations
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Tuple
+
+from .jobs import current_job
+
+# limiti superiori (secondi) dei bucket dell'istogramma latenze; l'ultimo è +Inf
+BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# origine della risposta: rete, cache su disco, cassetta, errore
+SRC_NET = "net"
+SRC_HIT = "hit"
+SRC_REPLAY = "replay"
+SRC_ERROR = "error"
+
+def endpoint_label(path: str, params: Dict[str, Any]) -> str:
+    """'/fixtures?team', '/odds?date', '/fixtures?live'...: path + parametro che decide il costo."""
+    for p in ("live", "ids", "id", "team", "fixture", "league", "date"):
+        if p in params:
+            return f"{path}?{p}"
+    return path
+
+class _Series:
+    __slots__ = ("by_src", "buckets", "sum_s", "bytes")
+
+    def __init__(self):
+        self.by_src: Dict[str, int] = {}
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.sum_s = 0.0
+        self.bytes = 0
+
+    @property
+    def count(self) -> int:
+        return sum(self.buckets)
+
+    def quantile(self, q: float) -> float:
+        """Stima dal bucket (limite superiore): basta per capire dove vanno i secondi."""
+        n = self.count
+        if not n:
+            return 0.0
+        rank = q * n; acc = 0
+        for i, c in enumerate(self.buckets):
+            acc += c
+            if acc >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+        return float("inf")
+
+class Telemetry:
+    """
+    Registro in memoria, thread-safe. Ogni chiamata esterna fa observe(service, endpoint, t0, src, nbytes);
+    il job (morning, live, closer, commands, watchlist) arriva da jobs.current_job().
+    La quota API si legge dal RateScheduler registrato con watch_limiter().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str, str], _Series] = {}
+        self._limiters: Dict[str, Any] = {}
+        self.started = time.time()
+
+    def observe(self, service: str, endpoint: str, t0: float, src: str = SRC_NET, nbytes: int = 0):
+        dt = time.perf_counter() - t0
+        key = (service, endpoint, current_job())
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = _Series()
+            s.by_src[src] = s.by_src.get(src, 0) + 1
+            s.buckets[bisect.bisect_left(BUCKETS, dt)] += 1
+            s.sum_s += dt
+            s.bytes += int(nbytes or 0)
+
+    def watch_limiter(self, service: str, limiter):
+        self._limiters[service] = limiter
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self.started = time.time()
+
+    def _copy(self) -> List[Tuple[Tuple[str, str, str], _Series]]:
+        with self._lock:
+            out = []
+            for k, s in sorted(self._series.items()):
+                c = _Series(); c.by_src = dict(s.by_src); c.buckets = list(s.buckets); c.sum_s = s.sum_s; c.bytes = s.bytes
+                out.append((k, c))
+            return out
+
+    def quota(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for service, lim in self._limiters.items():
+            out[service] = {
+                "daily_remaining": getattr(lim, "daily_remaining", None),
+                "minute_remaining": getattr(lim, "minute_remaining", None),
+                "per_minute": getattr(lim, "per_minute", None),
+            }
+        return out
+
+    # --- /stats ---
+    def render_text(self) -> str:
+        mins = max(1, int((time.time() - self.started) / 60))
+        lines = [f"<b>📈 Stats</b> (ultimi {mins} min)"]
+        for service, q in self.quota().items():
+            dr = q["daily_remaining"]; mr = q["minute_remaining"]
+            lines.append(f"Quota {service}: giorno <b>{dr if dr is not None else 'n/d'}</b>, "
+                         f"minuto {mr if mr is not None else 'n/d'}/{q['per_minute']}")
+        rows = self._copy()
+        if not rows:
+            lines.append("Nessuna chiamata registrata.")
+            return "\n".join(lines)
+        # totali per job: dove va la quota
+        per_job: Dict[Tuple[str, str], int] = {}
+        for (service, _, jb), s in rows:
+            per_job[(service, jb)] = per_job.get((service, jb), 0) + s.by_src.get(SRC_NET, 0)
+        lines.append("")
+        lines.append("<b>Richieste di rete per job</b>")
+        for (service, jb), n in sorted(per_job.items(), key=lambda kv: -kv[1]):
+            lines.append(f"• {service}/{jb}: {n}")
+        lines.append("")
+        lines.append("<pre>endpoint          job        net  hit%  p50   p95   KB</pre>")
+        body = []
+        for (service, ep, jb), s in rows:
+            net = s.by_src.get(SRC_NET, 0); hit = s.by_src.get(SRC_HIT, 0)
+            hit_pct = f"{100 * hit / (net + hit):.0f}" if (net + hit) and service == "api" else "-"
+            err = s.by_src.get(SRC_ERROR, 0)
+            body.append(f"{ep[:17]:<17} {jb[:9]:<9} {net:>4} {hit_pct:>4} {_fmt_s(s.quantile(0.5)):>5} "
+                        f"{_fmt_s(s.quantile(0.95)):>5} {s.bytes // 1024:>5}" + (f" err {err}" if err else ""))
+        lines.append("<pre>" + "\n".join(body) + "</pre>")
+        return "\n".join(lines)
+
+    # --- Prometheus (text exposition 0.0.4) ---
+    def render_prometheus(self) -> str:
+        out = [
+            "# HELP oddsbot_requests_total Chiamate esterne per servizio, endpoint, job e origine.",
+            "# TYPE oddsbot_requests_total counter",
+        ]
+        rows = self._copy()
+        for (service, ep, jb), s in rows:
+            for src, n in sorted(s.by_src.items()):
+                out.append(f'oddsbot_requests_total{{{_labels(service, ep, jb)},source="{src}"}} {n}')
+        out += ["# HELP oddsbot_request_seconds Latenza delle chiamate esterne.",
+                "# TYPE oddsbot_request_seconds histogram"]
+        for (service, ep, jb), s in rows:
+            lab = _labels(service, ep, jb); acc = 0
+            for i, c in enumerate(s.buckets):
+                acc += c
+                le = "+Inf" if i == len(BUCKETS) else repr(BUCKETS[i])
+                out.append(f'oddsbot_request_seconds_bucket{{{lab},le="{le}"}} {acc}')
+            out.append(f"oddsbot_request_seconds_sum{{{lab}}} {s.sum_s:.6f}")
+            out.append(f"oddsbot_request_seconds_count{{{lab}}} {acc}")
+        out += ["# HELP oddsbot_response_bytes_total Bytes ricevuti dalla rete.",
+                "# TYPE oddsbot_response_bytes_total counter"]
+        for (service, ep, jb), s in rows:
+            out.append(f"oddsbot_response_bytes_total{{{_labels(service, ep, jb)}}} {s.bytes}")
+        out += ["# HELP oddsbot_quota_remaining Richieste rimaste secondo gli header rate-limit.",
+                "# TYPE oddsbot_quota_remaining gauge"]
+        for service, q in self.quota().items():
+            for window, key in (("day", "daily_remaining"), ("minute", "minute_remaining")):
+                if q[key] is not None:
+                    out.append(f'oddsbot_quota_remaining{{service="{service}",window="{window}"}} {q[key]}')
+        return "\n".join(out) + "\n"
+
+def _labels(service: str, endpoint: str, jb: str) -> str:
+    return f'service="{service}",endpoint="{endpoint}",job="{jb}"'
+
+def _fmt_s(x: float) -> str:
+    if x == float("inf"):
+        return ">30s"
+    return f"{x * 1000:.0f}ms" if x < 1 else f"{x:g}s"
+
+metrics = Telemetry()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404); self.end_headers(); return
+        body = metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """GET /metrics in formato Prometheus su un thread daemon."""
+    srv = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    print(f"[telemetry] /metrics su {host}:{port}")
+    return srv
@@ -4,6 +4,14 @@ from typing import Dict, Any, List, Tuple
 from math import pow
 from collections import Counter
 from .stats_engine import StatsEngine, clamp
+from .records import Candidate, league_label
+from .candidate_index import CandidateIndex
+from .fixture_store import store_for
+
+try:  # NumPy opzionale: senza, i candidati si costruiscono cella per cella come prima
+    from . import candidate_engine
+except ImportError:
+    candidate_engine = None
 
 # -------------------------
 # Range quota per formato (prima passata "soft")
@@ -119,24 +127,25 @@ def _adj_market(market: str, markets: Dict[str, float], feats: Dict[str, Any]) -
         adj = 0.07*(form_a - 0.50) + 0.04*(gap - 0.12) - 0.03*(form_h - 0.50)
     return clamp(adj, -0.12, 0.12)
 
-def _mk_candidate(entry: Dict[str, Any], market: str, feats: Dict[str, Any]) -> Dict[str, Any]:
+def _mk_candidate(entry, market: str, feats: Dict[str, Any]) -> Candidate | None:
     mk = entry["markets"]
-    if market not in mk: return {}
+    if market not in mk: return None
     odd = float(mk[market]); p_imp = _p_imp(odd)
-    if p_imp <= 0.0: return {}
+    if p_imp <= 0.0: return None
     adj = _adj_market(market, mk, feats)
     p_mod = clamp(p_imp + adj, 0.01, 0.99)
     value = p_mod - p_imp
-    return {
-        "fixture_id": entry["fixture_id"],
-        "league": f"{entry['league_country']} — {entry['league_name']}",
-        "home": entry["home"], "away": entry["away"],
-        "kickoff_iso": entry["kickoff_iso"],
-        "market": market, "odd": odd,
-        "p_imp": round(p_imp, 4), "p_mod": round(p_mod, 4), "value": round(value, 4),
-        "cat": market_category(market),
-        "markets_all": mk,
-    }
+    # markets_all è lo STESSO oggetto Markets dell'entry (niente copie per mercato)
+    return Candidate(
+        fixture_id=entry["fixture_id"],
+        league=league_label(entry["league_country"], entry["league_name"]),
+        home=entry["home"], away=entry["away"],
+        kickoff_iso=entry["kickoff_iso"],
+        market=market, odd=odd,
+        p_imp=round(p_imp, 4), p_mod=round(p_mod, 4), value=round(value, 4),
+        cat=market_category(market),
+        markets_all=mk,
+    )
 
 def _fits_range(odd: float, lo: float, hi: float) -> bool:
     try:
@@ -165,24 +174,86 @@ def _risk_veto(c: Dict[str, Any]) -> bool:
 # -------------------------
 # COSTRUZIONE CANDIDATI
 # -------------------------
-def build_daily_candidates(api, cfg, date_str: str) -> List[Dict[str, Any]]:
-    entries = api.entries_by_date_bet365(date_str)
+# i 13 mercati con un aggiustamento nel modello (_adj_market/_risk_veto): gli EXTRA_MARKETS si leggono e si
+# mostrano in /quote ma non diventano candidati
+CANDIDATE_MARKETS = ("1","X","2","1X","12","X2","Over 0.5","Over 1.5","Over 2.5","Under 2.5","Under 3.5","Gol","No Gol")
+
+def _entries_and_changes(api, date_str: str):
+    # client senza snapshot incrementale (o senza dove tenere i candidati): changed=None → niente riuso
+    fn = getattr(api, "entries_with_changes_bet365", None)
+    if fn is None or not hasattr(api, "day_candidates"):
+        return api.entries_by_date_bet365(date_str), None
+    return fn(date_str)
+
+def build_daily_candidates(api, cfg, date_str: str, stats: Dict[str, int] | None = None) -> List[Candidate]:
+    """
+    Candidati del giorno. Le fixture con quote invariate riusano i candidati del giro precedente, tenuti
+    sul client (api.day_candidates) con l'entry da cui vengono: l'identità dell'entry copre i refresh fatti
+    nel frattempo da altri (watchlist, /quote), perché lo snapshot ridà lo stesso oggetto solo se il blocco
+    Bet365 non è cambiato. `stats`, se passato, riceve {"recomputed": n, "reused": m}.
+    """
+    entries, changed = _entries_and_changes(api, date_str)
     try:
         from .leagues import allowed_league
         entries = [e for e in entries if allowed_league(e["league_country"], e["league_name"])]
     except Exception:
         pass
-    se = StatsEngine(api)
-    out: List[Dict[str, Any]] = []
+    if changed is None:
+        if stats is not None:
+            stats.update(recomputed=len(entries), reused=0)
+        return _candidates_for(api, cfg, date_str, entries)
+
+    # solo le fixture con quote cambiate (o mai calcolate) passano da stats e candidati
+    prev = api.day_candidates(date_str)
+
+    def reusable(e) -> bool:
+        hit = prev.get(e["fixture_id"])
+        return hit is not None and hit[0] is e and e["fixture_id"] not in changed
+
+    todo = [e for e in entries if not reusable(e)]
+    fresh: Dict[int, List[Candidate]] = {}
+    for c in _candidates_for(api, cfg, date_str, todo) if todo else []:
+        fresh.setdefault(c["fixture_id"], []).append(c)
+    by_fix: Dict[int, Tuple[Any, List[Candidate]]] = {}
+    out: List[Candidate] = []
     for e in entries:
-        fid = int(e["fixture_id"])
-        try:
-            feats = se.features_for_fixture(fid)
-        except Exception:
+        fid = e["fixture_id"]
+        if fid in by_fix:
+            continue
+        if reusable(e):
+            by_fix[fid] = prev[fid]
+        elif fid in fresh:
+            by_fix[fid] = (e, fresh[fid])
+        else:
+            continue  # senza features o tutti scartati: si riprova al prossimo giro
+        out.extend(by_fix[fid][1])
+    api.store_day_candidates(date_str, by_fix)
+    if stats is not None:
+        stats.update(recomputed=len(todo), reused=len(entries) - len(todo))
+    return out
+
+def _candidates_for(api, cfg, date_str: str, entries) -> List[Candidate]:
+    se = StatsEngine(api, store=store_for(getattr(cfg, "FIXTURE_STORE_PATH", None)))
+    # una crawl per lega in gioco oggi invece di due /fixtures?team= per fixture;
+    # lega/stagione/squadre arrivano dalle entry, /fixtures?date= solo per quelle che non le hanno
+    try:
+        se.prefetch_entries(entries, date_str)
+    except Exception as ex:
+        print(f"[value_builder] prefetch stats fallito, resto per-fixture: {ex}")
+    # storico in parallelo (FEATURE_WORKERS), tassi squadra in un passaggio NumPy, candidati nell'ordine delle entry
+    fids = [int(e["fixture_id"]) for e in entries]
+    feats_at: Dict[int, Dict[str, Any]] = se.features_many(fids, workers=int(getattr(cfg, "FEATURE_WORKERS", 1) or 1))
+    if candidate_engine is not None:
+        # matrice entry × mercati: stesse formule di _mk_candidate/_risk_veto, in blocco
+        return candidate_engine.build_candidates(entries, feats_at, CANDIDATE_MARKETS, market_category)
+    out: List[Candidate] = []
+    for pos, e in enumerate(entries):
+        feats = feats_at.get(pos)
+        if feats is None:
             continue
-        for m in ("1","X","2","1X","12","X2","Over 0.5","Over 1.5","Over 2.5","Under 2.5","Under 3.5","Gol","No Gol"):
+        for m in CANDIDATE_MARKETS:
             cand = _mk_candidate(e, m, feats)
-            if not cand: 
+            if cand is None:
                 continue
             if _risk_veto(cand):
                 continue
@@ -238,61 +309,97 @@ def _format_block(label: str, legs: List[Dict[str, Any]], tz_str: str) -> str:
 # -------------------------
 def _enforce_diversity(sorted_pool: List[Dict[str, Any]], n_legs: int, fmt: str,
                        day_cat_bias: Counter | None = None) -> List[Dict[str, Any]]:
+    return _pick_diverse(lambda closed: sorted_pool, lambda: sorted_pool, n_legs, fmt, day_cat_bias)
+
+def _pick_diverse(stream, pool_of, n_legs: int, fmt: str,
+                  day_cat_bias: Counter | None = None) -> List[Dict[str, Any]]:
+    """
+    Corpo di _enforce_diversity. `stream(closed)` dà i candidati in ordine di ranking e può smettere
+    di produrre le categorie in `closed`; `pool_of()` è lo stesso ranking completo, per i miglioramenti.
+    """
     profile = DIVERSITY_PROFILE[fmt]
     max_per_cat = profile["max_per_cat"]
     min_cats = profile["min_cats"]
     if fmt == "long" and (max_per_cat is None):
         max_per_cat = max(2, (n_legs + 2)//3)
+    fmt_key = "single" if n_legs == 1 else fmt
+    min_leg = MIN_PMOD_PER_LEG[fmt_key]
+    min_avg = MIN_AVG_PMOD[fmt_key]
 
     picks: List[Dict[str, Any]] = []
     seen_fix = set()
     cat_count = Counter()
+    closed: set = set()
+    bias_cap = max(0, day_cat_bias.total()//3) if day_cat_bias else 0
 
-    for c in sorted_pool:
+    for c in stream(closed):
         if len(picks) >= n_legs: break
         if c["fixture_id"] in seen_fix: continue
         cat = c["cat"]
-        if day_cat_bias and day_cat_bias.get(cat, 0) > max(0, day_cat_bias.total()//3):
+        if day_cat_bias and day_cat_bias.get(cat, 0) > bias_cap:
+            closed.add(cat)
             continue
         if max_per_cat and cat_count[cat] >= max_per_cat:
             continue
-        fmt_key = "single" if n_legs == 1 else fmt
-        if c["p_mod"] < MIN_PMOD_PER_LEG[fmt_key]:
+        if c["p_mod"] < min_leg:
             continue
         picks.append(c); seen_fix.add(c["fixture_id"]); cat_count[cat] += 1
+        if max_per_cat and cat_count[cat] >= max_per_cat:
+            closed.add(cat)
 
-    def cats_ok(ps: List[Dict[str, Any]]) -> bool:
-        return len({p["cat"] for p in ps}) >= min_cats
-
-    if len(picks) == n_legs and cats_ok(picks):
-        fmt_key = "single" if n_legs == 1 else fmt
-        if sum(p["p_mod"] for p in picks)/n_legs >= MIN_AVG_PMOD[fmt_key]:
+    if len(picks) == n_legs and len(cat_count) >= min_cats:
+        if sum(p["p_mod"] for p in picks)/n_legs >= min_avg:
             return picks
 
-    # miglioramenti varianza/media p_mod
+    # miglioramenti varianza/media p_mod: ogni prova sostituisce una leg, i vincoli si
+    # aggiornano in O(1) (fixture in uso, conteggi per categoria, leg sotto soglia)
     improved = picks[:]
-    pool = [c for c in sorted_pool if c not in improved]
+    taken = {id(p) for p in picks}
+    # un candidato sotto soglia per-leg non passa mai: fuori subito
+    pool = [c for c in pool_of() if id(c) not in taken and c["p_mod"] >= min_leg]
+    fixes = set(seen_fix)
+    cat_n = Counter(cat_count)
+    low = sum(1 for p in improved if p["p_mod"] < min_leg)
     for i in range(len(improved)):
         for cand in pool:
-            if cand["fixture_id"] in {p["fixture_id"] for p in improved}: continue
-            trial = improved[:]; trial[i] = cand
-            if max_per_cat and Counter([t["cat"] for t in trial])[cand["cat"]] > max_per_cat:
+            if cand["fixture_id"] in fixes: continue
+            old = improved[i]
+            ccat, ocat = cand["cat"], old["cat"]
+            same = ccat == ocat
+            if max_per_cat and cat_n[ccat] + (0 if same else 1) > max_per_cat:
                 continue
-            if not cats_ok(trial): continue
-            fmt_key = "single" if n_legs == 1 else fmt
-            if any(t["p_mod"] < MIN_PMOD_PER_LEG[fmt_key] for t in trial): continue
-            if (sum(t["p_mod"] for t in trial)/n_legs) < MIN_AVG_PMOD[fmt_key]: continue
+            n_cats = len(cat_n) - (0 if same or cat_n[ocat] > 1 else 1) + (0 if same or ccat in cat_n else 1)
+            if n_cats < min_cats: continue
+            if low - (1 if old["p_mod"] < min_leg else 0): continue
+            trial = improved[:]; trial[i] = cand
+            if (sum(t["p_mod"] for t in trial)/n_legs) < min_avg: continue
             improved = trial
+            fixes.discard(old["fixture_id"]); fixes.add(cand["fixture_id"])
+            cat_n[ocat] -= 1
+            if not cat_n[ocat]: del cat_n[ocat]
+            cat_n[ccat] += 1
+            if old["p_mod"] < min_leg: low -= 1
     if len(improved) == n_legs:
         return improved
     return picks[:n_legs]
 
-def _select_base(cands: List[Dict[str, Any]], fmt: str, n_legs: int,
-                 day_cat_bias: Counter | None = None) -> List[Dict[str, Any]]:
+def _as_index(cands) -> CandidateIndex:
+    return cands if isinstance(cands, CandidateIndex) else CandidateIndex(cands)
+
+def _base_rank_key(x: Dict[str, Any]):
+    return (x["value"], x["p_mod"], -(SAFE_MARKETS_ORDER.index(x["market"]) if x["market"] in SAFE_MARKETS_ORDER else -99))
+
+def _boost_rank_key(x: Dict[str, Any]):
+    return (x["value"], x["p_mod"], x["odd"])
+
+def _select_base(cands, fmt: str, n_legs: int,
+                 day_cat_bias: Counter | None = None, used: int = 0) -> List[Dict[str, Any]]:
+    """`cands`: lista o CandidateIndex; `used`: bitset (CandidateIndex.fixture_mask) delle fixture da escludere."""
+    idx = _as_index(cands)
     lo, hi = RANGES[fmt]
-    pool = [c for c in cands if _fits_range(c["odd"], lo, hi)]
-    pool.sort(key=lambda x: (x["value"], x["p_mod"], -(SAFE_MARKETS_ORDER.index(x["market"]) if x["market"] in SAFE_MARKETS_ORDER else -99)), reverse=True)
-    picks = _enforce_diversity(pool, n_legs, fmt, day_cat_bias=day_cat_bias)
+    ck = idx.ranked("base", lo, hi, _base_rank_key)
+    picks = _pick_diverse(lambda closed: idx.stream(ck, used, closed), lambda: idx.pool(ck, used),
+                          n_legs, fmt, day_cat_bias=day_cat_bias)
     picks = _dedup_by_fixture(picks)
     picks = _diversify_league(picks, max_per_league=3)
     fmt_key = "single" if n_legs == 1 else fmt
@@ -300,33 +407,37 @@ def _select_base(cands: List[Dict[str, Any]], fmt: str, n_legs: int,
         return []
     return picks[:n_legs]
 
-def _reselect_to_meet_total(cands: List[Dict[str, Any]], fmt: str, n_legs: int, min_total: float,
-                            day_cat_bias: Counter | None = None) -> List[Dict[str, Any]]:
+def _reselect_to_meet_total(cands, fmt: str, n_legs: int, min_total: float,
+                            day_cat_bias: Counter | None = None, used: int = 0) -> List[Dict[str, Any]]:
+    idx = _as_index(cands)
     gm_needed = pow(float(min_total), 1.0 / n_legs)
     cap_hi = UPPER_CAP.get(fmt, 1.45)
-    hi_pool = [c for c in cands if (c["odd"] >= gm_needed and c["odd"] <= cap_hi and (c["value"] >= VALUE_TH[fmt] or c["p_mod"] >= SAFE_TH[fmt]))]
-    hi_pool.sort(key=lambda x: (x["value"], x["p_mod"], x["odd"]), reverse=True)
-    picks = _enforce_diversity(hi_pool, n_legs, fmt, day_cat_bias=day_cat_bias)
+    ck = idx.ranked(("boost", fmt), gm_needed, cap_hi, _boost_rank_key,
+                    pred=lambda c: c["value"] >= VALUE_TH[fmt] or c["p_mod"] >= SAFE_TH[fmt])
+    picks = _pick_diverse(lambda closed: idx.stream(ck, used, closed), lambda: idx.pool(ck, used),
+                          n_legs, fmt, day_cat_bias=day_cat_bias)
     fmt_key = "single" if n_legs == 1 else fmt
     if not picks or (sum(p["p_mod"] for p in picks)/len(picks) < MIN_AVG_PMOD[fmt_key]):
         return []
     return picks if _compute_total(picks) >= min_total else []
 
-def _select_with_min_total(cands: List[Dict[str, Any]], fmt: str, n_legs: int,
-                           day_cat_bias: Counter | None = None) -> List[Dict[str, Any]]:
-    picks = _select_base(cands, fmt, n_legs, day_cat_bias=day_cat_bias)
+def _select_with_min_total(cands, fmt: str, n_legs: int,
+                           day_cat_bias: Counter | None = None, used: int = 0) -> List[Dict[str, Any]]:
+    idx = _as_index(cands)
+    picks = _select_base(idx, fmt, n_legs, day_cat_bias=day_cat_bias, used=used)
     if not picks: return []
     need_min = MIN_TOTAL.get(fmt)
     if not need_min: return picks
     if _compute_total(picks) >= need_min: return picks
-    boosted = _reselect_to_meet_total(cands, fmt, n_legs, need_min, day_cat_bias=day_cat_bias)
+    boosted = _reselect_to_meet_total(idx, fmt, n_legs, need_min, day_cat_bias=day_cat_bias, used=used)
     return boosted if boosted else []
 
-def _select_long_with_min_total(cands: List[Dict[str, Any]], max_legs: int,
-                                day_cat_bias: Counter | None = None) -> List[Dict[str, Any]]:
+def _select_long_with_min_total(cands, max_legs: int,
+                                day_cat_bias: Counter | None = None, used: int = 0) -> List[Dict[str, Any]]:
+    idx = _as_index(cands)
     min_total = MIN_TOTAL["long"]
     for n in range(max_legs, 7, -1):
-        picks = _select_with_min_total(cands, "long", n, day_cat_bias=day_cat_bias)
+        picks = _select_with_min_total(idx, "long", n, day_cat_bias=day_cat_bias, used=used)
         if picks and _compute_total(picks) >= min_total:
             return picks
     return []
@@ -351,10 +462,35 @@ def _ticket_score(fmt: str, legs: List[Dict[str, Any]]) -> float:
     var_score = _ticket_var_score(legs)
     return ALPHA * p + BETA * quota_norm + GAMMA * var_score
 
-def _pack_score(tickets: List[Tuple[str, List[Dict[str, Any]]]]) -> float:
+class _TicketMemo:
+    """_ticket_prob/_ticket_score per (formato, leg) già valutati in questo giro: i piani condividono schedine."""
+
+    def __init__(self):
+        self._prob: Dict[Tuple[int, ...], float] = {}
+        self._score: Dict[Tuple[str, Tuple[int, ...]], float] = {}
+
+    def prob(self, legs: List[Dict[str, Any]]) -> float:
+        k = tuple(map(id, legs))
+        p = self._prob.get(k)
+        if p is None:
+            p = self._prob[k] = _ticket_prob(legs)
+        return p
+
+    def score(self, fmt: str, legs: List[Dict[str, Any]]) -> float:
+        k = (fmt, tuple(map(id, legs)))
+        sc = self._score.get(k)
+        if sc is None:
+            sc = self._score[k] = _ticket_score(fmt, legs)
+        return sc
+
+def _pack_score(tickets: List[Tuple[str, List[Dict[str, Any]]]], memo: _TicketMemo | None = None) -> float:
     # somma degli score + bonus “più schedine con alta P = più chance di fare almeno una cassa”
-    base = sum(_ticket_score(fmt, legs) for fmt, legs in tickets)
-    bonus = sum(_ticket_prob(legs) for _, legs in tickets) * 0.15
+    if memo is None:
+        base = sum(_ticket_score(fmt, legs) for fmt, legs in tickets)
+        bonus = sum(_ticket_prob(legs) for _, legs in tickets) * 0.15
+    else:
+        base = sum(memo.score(fmt, legs) for fmt, legs in tickets)
+        bonus = sum(memo.prob(legs) for _, legs in tickets) * 0.15
     return base + bonus
 
 # -------------------------
@@ -363,34 +499,49 @@ def _pack_score(tickets: List[Tuple[str, List[Dict[str, Any]]]]) -> float:
 def _make_ticket(fmt: str, legs: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
     return (fmt, legs)
 
-def _choose_best_pack(cands: List[Dict[str, Any]], want_long_legs: int) -> Dict[str, List[Dict[str, Any]]]:
-    """Genera più combinazioni sensate, le valuta, sceglie il pack con score più alto."""
+def _choose_best_pack(cands: List[Dict[str, Any]], want_long_legs: int,
+                      prune: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+    """Genera più combinazioni sensate, le valuta, sceglie il pack con score più alto. `prune`: vedi CandidateIndex.pool."""
     day_cat_bias = Counter()
     plans: List[Dict[str, List[Dict[str, Any]]]] = []
-
-    # Helper per clonare cands e accumulare used fixtures
-    def take_fmt(current_used: set, fmt: str, n: int, need_total: bool = False):
-        pool = [c for c in cands if c["fixture_id"] not in current_used]
+    # un indice per tutti i piani: range/ranking calcolati una volta, fixture usate come bitset
+    idx = CandidateIndex(cands, prune=prune)
+
+    # stesse sotto-selezioni in più piani (tripla da zero in B/C/G, doppia da zero in D/H...):
+    # risolte una volta per (formato, leg, fixture usate, bias)
+    bias_key = tuple(sorted(day_cat_bias.items()))
+    taken: Dict[Tuple[str, int, bool, int, Tuple], Tuple[List[Dict[str, Any]], int]] = {}
+
+    # Helper per accumulare used fixtures (bitset dell'indice)
+    def take_fmt(current_used: int, fmt: str, n: int, need_total: bool = False):
+        key = (fmt, want_long_legs if fmt == "long" else n, need_total or fmt == "long", current_used, bias_key)
+        hit = taken.get(key)
+        if hit is None:
+            hit = taken[key] = _take_fmt(current_used, fmt, n, need_total)
+        pick, now_used = hit
+        return list(pick), now_used
+
+    def _take_fmt(current_used: int, fmt: str, n: int, need_total: bool):
         if fmt == "long":
-            pick = _select_long_with_min_total(pool, want_long_legs, day_cat_bias=day_cat_bias)
+            pick = _select_long_with_min_total(idx, want_long_legs, day_cat_bias=day_cat_bias, used=current_used)
         elif need_total:
-            pick = _select_with_min_total(pool, fmt, n, day_cat_bias=day_cat_bias)
+            pick = _select_with_min_total(idx, fmt, n, day_cat_bias=day_cat_bias, used=current_used)
         else:
-            pick = _select_base(pool, fmt, n, day_cat_bias=day_cat_bias)
+            pick = _select_base(idx, fmt, n, day_cat_bias=day_cat_bias, used=current_used)
         if pick:
-            current_used |= set(p["fixture_id"] for p in pick)
+            current_used |= idx.fixture_mask(pick)
         return pick, current_used
 
     # opzioni candidate (costruiamo in ordine diverso, senza forzare)
     # A) quintupla (min 4x) + singola
-    usedA = set()
+    usedA = 0
     q5A, usedA = take_fmt(usedA, "quint", 5, need_total=True)
     if q5A:
         s1A, usedA = take_fmt(usedA, "single", 1, need_total=False)
         plans.append({"quintupla": q5A, "tripla": [], "doppia": [], "singole": s1A or [], "long": []})
 
     # B) tripla + doppia + singola
-    usedB = set()
+    usedB = 0
     t3B, usedB = take_fmt(usedB, "triple", 3)
     d2B, usedB = take_fmt(usedB, "double", 2)
     s1B, usedB = take_fmt(usedB, "single", 1)
@@ -398,14 +549,14 @@ def _choose_best_pack(cands: List[Dict[str, Any]], want_long_legs: int) -> Dict[
         plans.append({"quintupla": [], "tripla": t3B, "doppia": d2B, "singole": s1B, "long": []})
 
     # C) tripla + doppia
-    usedC = set()
+    usedC = 0
     t3C, usedC = take_fmt(usedC, "triple", 3)
     d2C, usedC = take_fmt(usedC, "double", 2)
     if t3C and d2C:
         plans.append({"quintupla": [], "tripla": t3C, "doppia": d2C, "singole": [], "long": []})
 
     # D) doppia + doppia + singola
-    usedD = set()
+    usedD = 0
     d2D1, usedD = take_fmt(usedD, "double", 2)
     d2D2, usedD = take_fmt(usedD, "double", 2)
     s1D, usedD = take_fmt(usedD, "single", 1)
@@ -413,7 +564,7 @@ def _choose_best_pack(cands: List[Dict[str, Any]], want_long_legs: int) -> Dict[
         plans.append({"quintupla": [], "tripla": [], "doppia": d2D1 + d2D2, "singole": s1D, "long": []})
 
     # E) due singole + doppia
-    usedE = set()
+    usedE = 0
     s1E1, usedE = take_fmt(usedE, "single", 1)
     s1E2, usedE = take_fmt(usedE, "single", 1)
     d2E,  usedE = take_fmt(usedE, "double", 2)
@@ -421,21 +572,21 @@ def _choose_best_pack(cands: List[Dict[str, Any]], want_long_legs: int) -> Dict[
         plans.append({"quintupla": [], "tripla": [], "doppia": d2E, "singole": s1E1 + s1E2, "long": []})
 
     # F) super combo (8..N, min 6x) da sola
-    usedF = set()
+    usedF = 0
     longF, usedF = take_fmt(usedF, "long", want_long_legs, need_total=True)
     if longF:
         plans.append({"quintupla": [], "tripla": [], "doppia": [], "singole": [], "long": longF})
 
     # G) fallback minimi (tripla oppure doppia oppure singole)
-    usedG = set()
+    usedG = 0
     t3G, usedG = take_fmt(usedG, "triple", 3)
     if t3G:
         plans.append({"quintupla": [], "tripla": t3G, "doppia": [], "singole": [], "long": []})
-    usedH = set()
+    usedH = 0
     d2H, usedH = take_fmt(usedH, "double", 2)
     if d2H:
         plans.append({"quintupla": [], "tripla": [], "doppia": d2H, "singole": [], "long": []})
-    usedI = set()
+    usedI = 0
     s1I, usedI = take_fmt(usedI, "single", 1)
     if s1I:
         plans.append({"quintupla": [], "tripla": [], "doppia": [], "singole": s1I, "long": []})
@@ -443,29 +594,39 @@ def _choose_best_pack(cands: List[Dict[str, Any]], want_long_legs: int) -> Dict[
     if not plans:
         return {"singole": [], "doppia": [], "tripla": [], "quintupla": [], "long": []}
 
-    # valuta ogni plan
+    # valuta ogni plan (le schedine ripetute tra piani si valutano una volta)
+    memo = _TicketMemo()
     best = None; best_score = -1.0
     for pl in plans:
-        tickets: List[Tuple[str, List[Dict[str, Any]]]] = []
-        if pl["quintupla"]: tickets.append(("quint", pl["quintupla"]))
-        if pl["tripla"]:    tickets.append(("triple", pl["tripla"]))
-        if pl["doppia"]:    tickets.append(("double", pl["doppia"]))
-        if pl["singole"]:
-            # ogni singola è un ticket
-            for s in pl["singole"]:
-                tickets.append(("single", [s]))
-        if pl["long"]:      tickets.append(("long", pl["long"]))
-        score = _pack_score(tickets)
+        score = _pack_score(_plan_tickets(pl), memo)
         if score > best_score:
             best_score = score; best = pl
     return best or {"singole": [], "doppia": [], "tripla": [], "quintupla": [], "long": []}
 
+def _plan_tickets(pl: Dict[str, List[Dict[str, Any]]]) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """Plan → schedine (formato, leg) come le valuta _pack_score."""
+    tickets: List[Tuple[str, List[Dict[str, Any]]]] = []
+    if pl["quintupla"]: tickets.append(("quint", pl["quintupla"]))
+    if pl["tripla"]:    tickets.append(("triple", pl["tripla"]))
+    if pl["doppia"]:    tickets.append(("double", pl["doppia"]))
+    if pl["singole"]:
+        # ogni singola è un ticket
+        for s in pl["singole"]:
+            tickets.append(("single", [s]))
+    if pl["long"]:      tickets.append(("long", pl["long"]))
+    return tickets
+
 # -------------------------
 # Planner (usa la scelta migliore)
 # -------------------------
 def plan_day(api, cfg, date_str: str, want_long_legs: int = 10) -> Dict[str, List[Dict[str, Any]]]:
     cands = build_daily_candidates(api, cfg, date_str)
-    best = _choose_best_pack(cands, want_long_legs)
+    budget_ms = int(getattr(cfg, "PACK_OPTIMIZER_MS", 0) or 0)
+    if budget_ms > 0:
+        # branch-and-bound sulle stesse forme di pack, partendo dal greedy: mai peggio di _choose_best_pack
+        from .pack_optimizer import optimize_pack
+        return optimize_pack(cands, want_long_legs, budget_ms)
+    best = _choose_best_pack(cands, want_long_legs, prune=bool(getattr(cfg, "PARETO_PRUNE", False)))
     return best
 
 # -------------------------
@@ -0,0 +1 @@
+# bench — benchmark dei percorsi caldi (python -m bench)
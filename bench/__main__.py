@@ -0,0 +1,87 @@
+# bench/__main__.py — python -m bench [--quick] [--only a,b] [--cassette file] [--save-baseline]
+from __future__ import annotations
+import argparse
+import os
+import sys
+
+from .cases import CASES, BenchContext
+from .harness import (measure, Reference, with_rel, load_baseline, save_baseline, compare, changed,
+                      print_table, DEFAULT_TOLERANCE)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m bench", description="Benchmark dei percorsi caldi (parsing, candidati, selezione, closer)")
+    ap.add_argument("--only", default="", help=f"casi separati da virgola ({', '.join(CASES)})")
+    ap.add_argument("--quick", action="store_true", help="taglie ridotte (CI / smoke)")
+    ap.add_argument("--cassette", default=None, help="giornata registrata con API_MODE=record al posto di quella sintetica")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="round-trip simulato per ogni richiesta API finta")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--budget", type=float, default=5.0, help="secondi massimi per caso (minimo 3 run)")
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE)
+    ap.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    ap.add_argument("--save-baseline", action="store_true",
+                    help="aggiorna in baseline i casi nuovi o cambiati oltre la tolleranza (gli altri restano)")
+    ap.add_argument("--force", action="store_true", help="con --save-baseline: riscrive tutti i casi eseguiti")
+    args = ap.parse_args(argv)
+
+    names = [x.strip() for x in args.only.split(",") if x.strip()] or list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        print(f"[bench] casi sconosciuti: {', '.join(unknown)}")
+        return 2
+
+    ctx = BenchContext(quick=args.quick, cassette=args.cassette, latency_ms=args.latency_ms)
+    baseline = load_baseline(args.baseline)
+    ref = Reference()
+    measured = []  # (risultato, fn, setup) per l'eventuale conferma
+    for name in names:
+        try:
+            cases = CASES[name](ctx)
+        except ImportError as e:
+            print(f"[bench] {name}: saltato ({e})")
+            continue
+        for case_name, fn, items, setup in cases:
+            ref.sample()
+            r = measure(case_name, fn, items, setup=setup, repeat=args.repeat, budget_s=args.budget)
+            measured.append((r, fn, setup))
+            print(f"[bench] {case_name}: p50 {r['p50_ms']:.2f}ms", file=sys.stderr)
+    ref.sample()
+    print(f"[bench] riferimento: p50 {ref.p50_ms:.2f}ms (mediana di {len(ref.samples)} campioni)", file=sys.stderr)
+
+    results, rows, regressions = [], [], []
+    for r, fn, setup in measured:
+        with_rel(r, ref)
+        base = baseline.get(r["name"])
+        delta, regs = compare(r, base, args.tolerance)
+        if regs and not args.save_baseline:
+            # regressione solo se confermata: seconda misura col riferimento ricampionato, vale la migliore
+            ref.sample()
+            r2 = measure(r["name"], fn, r["items"], setup=setup, repeat=args.repeat, budget_s=args.budget)
+            ref.sample()
+            fast = r2 if r2["p50_ms"] < r["p50_ms"] else r
+            small = r2 if r2["peak_kb"] < r["peak_kb"] else r
+            r = with_rel(dict(fast, peak_kb=small["peak_kb"], peak_spread=small["peak_spread"]), ref)
+            delta, regs = compare(r, base, args.tolerance)
+            print(f"[bench] {r['name']}: rimisurato, p50 {r['p50_ms']:.2f}ms", file=sys.stderr)
+        results.append(r); rows.append((r, delta)); regressions += regs
+    print_table(rows)
+
+    if args.save_baseline:
+        # solo i casi eseguiti E cambiati davvero: il rumore non riscrive la baseline dei casi non toccati
+        upd = [r for r in results if args.force or changed(r, baseline.get(r["name"]), args.tolerance)]
+        merged = dict(baseline)
+        merged.update({r["name"]: r for r in upd})
+        save_baseline(args.baseline, sorted(merged.values(), key=lambda r: r["name"]))
+        print(f"[bench] baseline salvata in {args.baseline}: {len(upd)} casi aggiornati"
+              + (f" ({', '.join(r['name'] for r in upd)})" if upd else ""))
+        return 0
+    if regressions:
+        print("\nREGRESSIONI (tolleranza {:.0%}):".format(args.tolerance))
+        for r in regressions:
+            print(f"  - {r}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
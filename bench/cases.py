@@ -0,0 +1,218 @@
+# bench/cases.py — i percorsi caldi misurati: parsing quote, statistiche, candidati, selezione, closer
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.api_football import APIFootball
+from app.stats_engine import StatsEngine
+from app import value_builder as vb
+
+from .generators import SyntheticWorld, RecordedWorld, WorldAPI, BetStore, FakeTelegram, candidate_pool, synthetic_feats
+
+# (nome, fn, items, setup)
+Case = Tuple[str, Callable[[], Any], int, Callable[[], Any] | None]
+
+class BenchContext:
+    """Dati condivisi tra i casi; generati una volta sola (e solo se servono)."""
+
+    def __init__(self, quick: bool = False, cassette: str | None = None, latency_ms: float = 0.0):
+        self.quick = quick
+        self.cassette = cassette
+        self.latency_ms = latency_ms
+        self._world = None
+        self._pools: Dict[int, List] = {}
+
+    @property
+    def world(self):
+        if self._world is None:
+            self._world = RecordedWorld(self.cassette) if self.cassette else SyntheticWorld(n_fixtures=1000 if self.quick else 5000)
+        return self._world
+
+    def api(self) -> WorldAPI:
+        return WorldAPI(self.world, latency_ms=self.latency_ms)
+
+    def pool(self, n: int) -> List:
+        if n not in self._pools:
+            self._pools[n] = candidate_pool(n)
+        return self._pools[n]
+
+    @property
+    def pool_sizes(self) -> Tuple[int, ...]:
+        return (100, 1000) if self.quick else (100, 1000, 5000, 20000)
+
+def case_parse_market_block(ctx: BenchContext) -> List[Case]:
+    blocks = [((it.get("bookmakers") or [{}])[0].get("bets") or []) for it in ctx.world.odds_items]
+    parse = APIFootball._parse_market_block
+
+    def run():
+        for bets in blocks:
+            parse(bets)
+    return [(f"parse_market_block[{len(blocks)}]", run, len(blocks), None)]
+
+def case_parse_odds_entries(ctx: BenchContext) -> List[Case]:
+    w = ctx.world
+    holder = {}
+
+    def setup():
+        holder["api"] = ctx.api()  # API nuova: niente singleflight/indice riusato tra run
+
+    def run():
+        holder["api"].parse_odds_entries(w.odds_items, date=w.date)
+    return [(f"parse_odds_entries[{len(w.odds_items)}]", run, len(w.odds_items), setup)]
+
+def case_rates_from_last(ctx: BenchContext) -> List[Case]:
+    w = ctx.world
+    hist = [(t, [fx for fx in w.history(t) if ((fx.get("fixture") or {}).get("status") or {}).get("short") in ("FT", "AET", "PEN")])
+            for t in w.team_ids()]
+    se = StatsEngine(None)
+    rounds = max(1, 5000 // max(1, len(hist)))
+
+    def run():
+        for _ in range(rounds):
+            for team_id, last in hist:
+                se._rates_from_last(team_id, last)
+    return [(f"stats_rates_from_last[{len(hist) * rounds}]", run, len(hist) * rounds, None)]
+
+def case_rates_batch(ctx: BenchContext) -> List[Case]:
+    from app.team_rates import rates_batch  # NumPy
+    w = ctx.world
+    hist = [(t, [fx for fx in w.history(t) if ((fx.get("fixture") or {}).get("status") or {}).get("short") in ("FT", "AET", "PEN")])
+            for t in w.team_ids()]
+    items = hist * max(1, 5000 // max(1, len(hist)))
+
+    def run():
+        rates_batch(items)
+    return [(f"stats_rates_batch[{len(items)}]", run, len(items), None)]
+
+class _Cfg:
+    TZ = "Europe/Rome"
+    QUIET_HOURS = (0, 0)
+    CHANNEL_ID = -100
+    PUBLIC_LINK = "https://example.org"
+
+def case_build_daily_candidates(ctx: BenchContext) -> List[Case]:
+    w = ctx.world
+    holder = {}
+
+    def setup():
+        holder["api"] = ctx.api()
+
+    def run():
+        holder["cands"] = vb.build_daily_candidates(holder["api"], _Cfg(), w.date)
+    return [(f"build_daily_candidates[{len(w.odds_items)}]", run, len(w.odds_items), setup)]
+
+def case_candidates_from_feats(ctx: BenchContext) -> List[Case]:
+    """Solo entry × mercati → candidati (features già pronte): ciclo per cella contro matrice NumPy."""
+    import random
+    from app import candidate_engine  # NumPy
+    w = ctx.world
+    entries = APIFootball.parse_with_index(w.odds_items, {fid: {"home": fx["teams"]["home"]["name"], "away": fx["teams"]["away"]["name"]}
+                                                          for fid, fx in w.fixtures.items()})
+    rnd = random.Random(3)
+    feats_at = {pos: synthetic_feats(rnd) for pos in range(len(entries))}
+
+    def run_loop():
+        out = []
+        for pos, e in enumerate(entries):
+            for m in vb.CANDIDATE_MARKETS:
+                c = vb._mk_candidate(e, m, feats_at[pos])
+                if c is not None and not vb._risk_veto(c):
+                    out.append(c)
+
+    def run_matrix():
+        candidate_engine.build_candidates(entries, feats_at, vb.CANDIDATE_MARKETS, vb.market_category)
+    n = len(entries)
+    return [(f"candidates_loop[{n}]", run_loop, n, None), (f"candidates_matrix[{n}]", run_matrix, n, None)]
+
+def case_enforce_diversity(ctx: BenchContext) -> List[Case]:
+    out: List[Case] = []
+    for n in ctx.pool_sizes:
+        pool = sorted(ctx.pool(n), key=lambda x: (x["value"], x["p_mod"]), reverse=True)
+
+        def run(pool=pool):
+            for fmt, legs in (("single", 1), ("double", 2), ("triple", 3), ("quint", 5), ("long", 10)):
+                vb._enforce_diversity(pool, legs, fmt)
+        out.append((f"enforce_diversity[{n}]", run, n, None))
+    return out
+
+def case_choose_best_pack(ctx: BenchContext) -> List[Case]:
+    out: List[Case] = []
+    for n in ctx.pool_sizes:
+        pool = ctx.pool(n)
+
+        def run(pool=pool):
+            vb._choose_best_pack(pool, 10)
+        out.append((f"choose_best_pack[{n}]", run, n, None))
+    return out
+
+def case_pack_optimizer(ctx: BenchContext) -> List[Case]:
+    """Branch-and-bound contro greedy: tempo misurato dal bench, score guadagnato per ms stampato qui."""
+    import sys
+    import time
+    from app.pack_optimizer import search_pack
+    out: List[Case] = []
+    for n in ctx.pool_sizes:
+        pool = ctx.pool(n)
+        t0 = time.perf_counter()
+        greedy = vb._choose_best_pack(pool, 10)
+        g_ms = (time.perf_counter() - t0) * 1000
+        g_score = vb._pack_score(vb._plan_tickets(greedy))
+        for budget in (50, 250):
+            _, info = search_pack(pool, 10, budget)
+            extra = max(1e-9, info["ms"] - g_ms)
+            print(f"[bench] pack n={n} budget {budget}ms: greedy {g_score:.4f} ({g_ms:.0f}ms) → bnb {info['score']:.4f} "
+                  f"({info['ms']:.0f}ms, {info['nodes']} nodi{', interrotto' if info['timed_out'] else ', ottimo'}): "
+                  f"+{(info['score'] - g_score) / extra:.5f} score/ms", file=sys.stderr)
+
+            def run(pool=pool, budget=budget):
+                search_pack(pool, 10, budget)
+            out.append((f"pack_bnb[{n}]@{budget}ms", run, n, None))
+    return out
+
+def case_pareto_front(ctx: BenchContext) -> List[Case]:
+    """Frontiera di Pareto per range di formato; quanti candidati restano è stampato qui."""
+    import sys
+    from app.candidate_index import pareto_front
+    out: List[Case] = []
+    for n in ctx.pool_sizes:
+        pool = ctx.pool(n)
+        by_fmt = [[c for c in pool if vb._fits_range(c["odd"], lo, hi)] for lo, hi in vb.RANGES.values()]
+        total = sum(len(r) for r in by_fmt)
+        kept = sum(len(pareto_front(r)) for r in by_fmt)
+        print(f"[bench] pareto n={n}: {kept}/{total} candidati nei range restano ({total - kept} dominati)", file=sys.stderr)
+
+        def run(by_fmt=by_fmt):
+            for r in by_fmt:
+                pareto_front(r)
+        out.append((f"pareto_front[{n}]", run, n, None))
+    return out
+
+def case_closer_tick(ctx: BenchContext) -> List[Case]:
+    from app import closer as closer_mod  # importa repo_bets (PyMySQL), sostituito qui da BetStore
+    out: List[Case] = []
+    for n in ((100,) if ctx.quick else (100, 500)):
+        holder = {}
+
+        def setup(n=n, holder=holder):
+            store = BetStore(ctx.world, n_betslips=n)
+            for fn in ("get_open_betslips", "get_selections", "update_selection_result", "recalc_betslip_status"):
+                setattr(closer_mod, fn, getattr(store, fn))
+            holder["closer"] = closer_mod.Closer(_Cfg(), FakeTelegram(), ctx.api())
+
+        def run(holder=holder):
+            holder["closer"].tick()
+        out.append((f"closer_tick[{n}]", run, n, setup))
+    return out
+
+CASES: Dict[str, Callable[[BenchContext], List[Case]]] = {
+    "parse_market_block": case_parse_market_block,
+    "parse_odds_entries": case_parse_odds_entries,
+    "rates_from_last": case_rates_from_last,
+    "rates_batch": case_rates_batch,
+    "build_daily_candidates": case_build_daily_candidates,
+    "candidates_from_feats": case_candidates_from_feats,
+    "enforce_diversity": case_enforce_diversity,
+    "choose_best_pack": case_choose_best_pack,
+    "pack_optimizer": case_pack_optimizer,
+    "pareto_front": case_pareto_front,
+    "closer_tick": case_closer_tick,
+}
@@ -0,0 +1,295 @@
+# bench/generators.py — dati per i benchmark: giornata sintetica o registrata (cassetta), API finta, schedine
+from __future__ import annotations
+import random
+import time
+from typing import Dict, Any, List, Tuple
+
+from app.api_football import APIFootball, BET365_ID
+from app.api_cache import cache_key
+from app.cassette import Cassette, MODE_REPLAY
+from app.records import OddsEntry
+from app.value_builder import _mk_candidate, _risk_veto
+
+BENCH_DATE = "2025-03-15"
+ODDS_PAGE_SIZE = 10   # come API-Football: 10 fixture per pagina di /odds
+FINISHED = ("FT", "AET", "PEN")
+
+LEAGUES = [
+    (135, "Italy", "Serie A"), (136, "Italy", "Serie B"), (39, "England", "Premier League"),
+    (40, "England", "Championship"), (140, "Spain", "La Liga"), (141, "Spain", "La Liga 2"),
+    (78, "Germany", "Bundesliga"), (79, "Germany", "2. Bundesliga"), (61, "France", "Ligue 1"),
+    (62, "France", "Ligue 2"), (88, "Netherlands", "Eredivisie"), (2, "World", "UEFA Champions League"),
+]
+TEAMS_PER_LEAGUE = 20
+
+# scommesse NON mappate presenti in una risposta /odds reale (il parser deve scartarle)
+_NOISE_BETS = (
+    ("Second Half Winner", ("Home", "Draw", "Away")),
+    ("Goals Over/Under First Half", ("Over 0.5", "Under 0.5", "Over 1.5", "Under 1.5")),
+    ("Home/Away", ("Home", "Away")),
+    ("Exact Score", tuple(f"{h}:{a}" for h in range(5) for a in range(5))),
+    ("Corners Over Under", ("Over 8.5", "Under 8.5", "Over 9.5", "Under 9.5", "Over 10.5", "Under 10.5")),
+    ("Asian Handicap", ("Home -1", "Away -1", "Home +0.5", "Away +0.5", "Home -0.5", "Away -0.5")),
+)
+
+def _o(x: float) -> str:
+    return f"{max(1.01, x):.2f}"
+
+def _bets_for(rnd: random.Random) -> List[Dict[str, Any]]:
+    """Quote Bet365 coerenti (margine ~5%) per i mercati mappati + rumore."""
+    ph = rnd.uniform(0.18, 0.70); pd = rnd.uniform(0.20, 0.30); pa = max(0.05, 1.0 - ph - pd)
+    m = 1.05
+    lam = rnd.uniform(1.6, 3.4)  # gol attesi
+    p_over = {0.5: 0.93, 1.5: 0.78, 2.5: 0.55, 3.5: 0.33, 4.5: 0.17, 5.5: 0.08}
+    shift = (lam - 2.5) * 0.12
+    ou = []
+    for line, p in p_over.items():
+        po = min(0.97, max(0.03, p + shift))
+        ou += [{"value": f"Over {line}", "odd": _o(1 / (po * m))}, {"value": f"Under {line}", "odd": _o(1 / ((1 - po) * m))}]
+    pb = min(0.8, max(0.25, 0.52 + shift))
+    bets = [
+        {"id": 1, "name": "Match Winner", "values": [
+            {"value": "Home", "odd": _o(1 / (ph * m))}, {"value": "Draw", "odd": _o(1 / (pd * m))},
+            {"value": "Away", "odd": _o(1 / (pa * m))}]},
+        {"id": 12, "name": "Double Chance", "values": [
+            {"value": "Home/Draw", "odd": _o(1 / ((ph + pd) * m))}, {"value": "Home/Away", "odd": _o(1 / ((ph + pa) * m))},
+            {"value": "Draw/Away", "odd": _o(1 / ((pd + pa) * m))}]},
+        {"id": 5, "name": "Goals Over/Under", "values": ou},
+        {"id": 8, "name": "Both Teams To Score", "values": [
+            {"value": "Yes", "odd": _o(1 / (pb * m))}, {"value": "No", "odd": _o(1 / ((1 - pb) * m))}]},
+    ]
+    for i, (name, labels) in enumerate(_NOISE_BETS):
+        bets.append({"id": 100 + i, "name": name, "values": [{"value": lab, "odd": _o(rnd.uniform(1.2, 30))} for lab in labels]})
+    rnd.shuffle(bets)
+    return bets
+
+class SyntheticWorld:
+    """
+    Giornata sintetica deterministica (seed): n_fixtures partite su LEAGUES, risposte /odds
+    come quelle reali (senza nomi squadra → serve l'indice /fixtures?ids=), storico
+    ultime 10 per squadra, stato fixture (NS / live / FT) per il Closer.
+    """
+
+    def __init__(self, n_fixtures: int = 5000, seed: int = 7, history: int = 10):
+        rnd = random.Random(seed)
+        self.date = BENCH_DATE
+        self.fixtures: Dict[int, Dict[str, Any]] = {}
+        self.odds_items: List[Dict[str, Any]] = []
+        self._history: Dict[int, List[Dict[str, Any]]] = {}
+        next_hist_id = 10_000_000
+        for i in range(n_fixtures):
+            lid, country, lname = LEAGUES[i % len(LEAGUES)]
+            home_id, away_id = rnd.sample(range(lid * 1000, lid * 1000 + TEAMS_PER_LEAGUE), 2)
+            fid = 1_000_000 + i
+            hh, mm = rnd.randint(12, 21), rnd.choice((0, 15, 30, 45))
+            kickoff = f"{self.date}T{hh:02d}:{mm:02d}:00+00:00"
+            league = {"id": lid, "name": lname, "country": country, "season": 2024}
+            st = rnd.choices(("NS", "1H", "2H", "FT"), weights=(5, 2, 2, 4))[0]
+            goals = {"home": None, "away": None} if st == "NS" else {"home": rnd.randint(0, 3), "away": rnd.randint(0, 3)}
+            self.fixtures[fid] = {
+                "fixture": {"id": fid, "date": kickoff, "status": {"short": st, "elapsed": None if st == "NS" else rnd.randint(1, 90)}},
+                "league": league,
+                "teams": {"home": {"id": home_id, "name": f"Team {home_id}"}, "away": {"id": away_id, "name": f"Team {away_id}"}},
+                "goals": goals,
+            }
+            self.odds_items.append({
+                "league": league,
+                "fixture": {"id": fid, "date": kickoff, "timestamp": 0},
+                "update": f"{self.date}T08:00:00+00:00",
+                "bookmakers": [{"id": BET365_ID, "name": "Bet365", "bets": _bets_for(rnd)}],
+            })
+        for lid, _, _ in LEAGUES:
+            for team_id in range(lid * 1000, lid * 1000 + TEAMS_PER_LEAGUE):
+                out = []
+                for k in range(history):
+                    opp = lid * 1000 + rnd.randrange(TEAMS_PER_LEAGUE)
+                    home = rnd.random() < 0.5
+                    st = "FT" if rnd.random() < 0.95 else "PST"
+                    out.append({
+                        "fixture": {"id": next_hist_id, "date": f"2025-02-{28 - k:02d}T15:00:00+00:00",
+                                    "timestamp": 1740754800 - k * 86400, "status": {"short": st}},
+                        "league": {"id": lid, "season": 2024},
+                        "teams": {"home": {"id": team_id if home else opp}, "away": {"id": opp if home else team_id}},
+                        "goals": {"home": rnd.randint(0, 4), "away": rnd.randint(0, 3)},
+                    })
+                    next_hist_id += 1
+                self._history[team_id] = out
+
+    def team_ids(self) -> List[int]:
+        return list(self._history)
+
+    def history(self, team_id: int) -> List[Dict[str, Any]]:
+        return self._history.get(team_id, [])
+
+    def league_fixtures(self, league_id: int, status: str = "", since: str | None = None, until: str | None = None) -> List[Dict[str, Any]]:
+        """Storico della lega (deduplicato): ciò che restituisce /fixtures?league=&season=."""
+        seen, out = set(), []
+        for team_id in range(league_id * 1000, league_id * 1000 + TEAMS_PER_LEAGUE):
+            for fx in self.history(team_id):
+                info = fx["fixture"]
+                if info["id"] in seen or (status and info["status"]["short"] not in status.split("-")):
+                    continue
+                day = info["date"][:10]
+                if (since and day < since) or (until and day > until):
+                    continue
+                seen.add(info["id"]); out.append(fx)
+        return out
+
+    def respond(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        if path == "/odds":
+            if "fixture" in params:
+                fid = int(params["fixture"])
+                return {"response": [x for x in self.odds_items if x["fixture"]["id"] == fid]}
+            page = int(params.get("page") or 1)
+            total = max(1, -(-len(self.odds_items) // ODDS_PAGE_SIZE))
+            chunk = self.odds_items[(page - 1) * ODDS_PAGE_SIZE: page * ODDS_PAGE_SIZE]
+            return {"paging": {"current": page, "total": total}, "response": chunk}
+        if path == "/fixtures":
+            if "id" in params:
+                fx = self.fixtures.get(int(params["id"]))
+                return {"response": [fx] if fx else []}
+            if "ids" in params:
+                ids = [int(x) for x in str(params["ids"]).split("-")]
+                return {"response": [self.fixtures[i] for i in ids if i in self.fixtures]}
+            if "team" in params:
+                return {"response": self.history(int(params["team"]))[:int(params.get("last") or 10)]}
+            if "league" in params:
+                return {"response": self.league_fixtures(int(params["league"]), str(params.get("status") or ""),
+                                                         params.get("from"), params.get("to"))}
+            if "date" in params:
+                return {"paging": {"current": 1, "total": 1}, "response": list(self.fixtures.values())}
+        return {"response": []}
+
+class RecordedWorld:
+    """Stessa interfaccia di SyntheticWorld ma sopra una cassetta registrata (API_MODE=record)."""
+
+    def __init__(self, cassette_path: str):
+        self.cassette = Cassette(cassette_path, MODE_REPLAY)
+        self.date = BENCH_DATE
+        self.fixtures: Dict[int, Dict[str, Any]] = {}
+        self.odds_items: List[Dict[str, Any]] = []
+        self._history: Dict[int, List[Dict[str, Any]]] = {}
+        for key in sorted(self.cassette.keys()):
+            path, _, qs = key.partition("?")
+            params = dict(kv.split("=", 1) for kv in qs.split("&") if "=" in kv)
+            js = self.cassette.play(key)
+            resp = js.get("response") or []
+            if path == "/odds" and "date" in params:
+                self.date = params["date"]
+                self.odds_items.extend(resp)
+            elif path == "/fixtures" and "team" in params:
+                self._history[int(params["team"])] = [fx for fx in resp if ((fx.get("fixture") or {}).get("status") or {}).get("short") in FINISHED]
+            elif path == "/fixtures" and "live" not in params:
+                for fx in resp:
+                    fid = int(((fx.get("fixture") or {}).get("id")) or 0)
+                    if fid:
+                        self.fixtures[fid] = fx
+        self.cassette.rewind()
+
+    def team_ids(self) -> List[int]:
+        return list(self._history)
+
+    def history(self, team_id: int) -> List[Dict[str, Any]]:
+        return self._history.get(team_id, [])
+
+    def respond(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self.cassette.play(cache_key(path, params))
+
+class WorldAPI(APIFootball):
+    """
+    APIFootball vero (parsing, paging, indice nomi, singleflight) con la rete sostituita
+    dal mondo: solo _fetch/_fetch_streamed cambiano. latency_ms simula il round-trip.
+    """
+
+    def __init__(self, world, latency_ms: float = 0.0, **kw):
+        super().__init__("bench", **kw)
+        self.world = world
+        self.latency = latency_ms / 1000.0
+        self.calls = 0
+
+    def _fetch(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.world.respond(path, params)
+
+    def _fetch_streamed(self, path: str, params: Dict[str, Any], keep) -> Dict[str, Any]:
+        js = dict(self._fetch(path, params))
+        js["response"] = [x for x in (keep(e) for e in (js.get("response") or [])) if x]
+        return js
+
+def synthetic_feats(rnd: random.Random) -> Dict[str, Any]:
+    def side():
+        return {"form_pts_rate": rnd.uniform(0.1, 0.9), "gf_avg": rnd.uniform(0.5, 2.5), "ga_avg": rnd.uniform(0.5, 2.0),
+                "tot_avg": rnd.uniform(1.5, 3.8), "over15": rnd.uniform(0.4, 0.95), "over25": rnd.uniform(0.2, 0.8),
+                "under35": rnd.uniform(0.4, 0.95), "btts": rnd.uniform(0.2, 0.8), "cs": rnd.uniform(0.05, 0.5)}
+    return {"home": side(), "away": side()}
+
+def candidate_pool(n: int, seed: int = 11, world=None) -> List:
+    """n candidati costruiti col VERO _mk_candidate/_risk_veto da entry e feature sintetiche."""
+    rnd = random.Random(seed)
+    world = world or SyntheticWorld(n_fixtures=max(50, n // 6), seed=seed, history=1)
+    entries = APIFootball.parse_with_index(world.odds_items, {fid: {"home": fx["teams"]["home"]["name"], "away": fx["teams"]["away"]["name"]}
+                                                            for fid, fx in world.fixtures.items()})
+    out = []
+    fid_base = 5_000_000
+    while len(out) < n:
+        for e in entries:
+            if len(out) >= n:
+                break
+            # le fixture si riusano con id nuovi finché il pool non è della taglia richiesta
+            e2 = OddsEntry(fid_base + e.fixture_id, e.kickoff_iso, e.league_country, e.league_name, e.home, e.away, e.markets, e.last_update)
+            feats = synthetic_feats(rnd)
+            for m in e.markets:
+                c = _mk_candidate(e2, m, feats)
+                if c is not None and not _risk_veto(c):
+                    out.append(c)
+        fid_base += 1_000_000
+    return out[:n]
+
+class BetStore:
+    """Schedine/selezioni in memoria con la stessa semantica di repo_bets (per Closer.tick)."""
+
+    def __init__(self, world, n_betslips: int = 300, seed: int = 5):
+        rnd = random.Random(seed)
+        fids = list(world.fixtures)
+        markets = ("1", "2", "1X", "X2", "12", "Over 0.5", "Over 1.5", "Over 2.5", "Under 2.5", "Under 3.5", "Gol", "No Gol")
+        self.betslips: List[Dict[str, Any]] = []
+        self.selections: Dict[int, List[Dict[str, Any]]] = {}
+        sid = 1
+        for bid in range(1, n_betslips + 1):
+            legs = rnd.choice((1, 1, 2, 3, 5, 8))
+            self.betslips.append({"id": bid, "status": "SENT", "legs_count": legs, "total_odds": round(1.3 ** legs, 2)})
+            sels = []
+            for fid in rnd.sample(fids, min(legs, len(fids))):
+                fx = world.fixtures[fid]
+                sels.append({"id": sid, "betslip_id": bid, "fixture_id": fid, "market": rnd.choice(markets), "odd": 1.3,
+                             "home": ((fx.get("teams") or {}).get("home") or {}).get("name") or "Home",
+                             "away": ((fx.get("teams") or {}).get("away") or {}).get("name") or "Away",
+                             "result": "PENDING"})
+                sid += 1
+            self.selections[bid] = sels
+        self._by_sel = {s["id"]: s for ss in self.selections.values() for s in ss}
+
+    def get_open_betslips(self) -> List[Dict[str, Any]]:
+        return [dict(b) for b in reversed(self.betslips) if b["status"] in ("OPEN", "SENT")]
+
+    def get_selections(self, betslip_id: int) -> List[Dict[str, Any]]:
+        return [dict(s) for s in self.selections.get(int(betslip_id), [])]
+
+    def update_selection_result(self, selection_id: int, result: str, score_home=None, score_away=None):
+        self._by_sel[int(selection_id)]["result"] = result
+
+    def recalc_betslip_status(self, betslip_id: int) -> str:
+        res = [s["result"] for s in self.selections[int(betslip_id)]]
+        status = "LOST" if "LOST" in res else ("WON" if "PENDING" not in res else "OPEN")
+        self.betslips[int(betslip_id) - 1]["status"] = status
+        return status
+
+class FakeTelegram:
+    def __init__(self):
+        self.sent: List[Tuple[int, str]] = []
+
+    def send_message(self, chat_id, text, **kw):
+        self.sent.append((chat_id, text))
+        return {"ok": True}
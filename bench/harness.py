@@ -0,0 +1,154 @@
+# bench/harness.py — misura (p50/p99, throughput, picco memoria) e confronto con la baseline
+from __future__ import annotations
+import gc
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+DEFAULT_TOLERANCE = 0.25   # +25% su p50 (relativo al riferimento) o picco memoria = regressione
+NOISE_FLOOR_MS = 0.5       # sotto questa differenza assoluta di p50 è rumore (casi da pochi decimi di ms)
+REFERENCE_CASE = "reference"
+
+def _pct(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    i = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[i]
+
+def measure(name: str, fn: Callable[[], Any], items: int, setup: Callable[[], Any] | None = None,
+            repeat: int = 20, budget_s: float = 5.0) -> Dict[str, Any]:
+    """
+    fn() ripetuta fino a `repeat` volte (o finché il budget di tempo non finisce, minimo 3),
+    setup() prima di ognuna e fuori dal tempo. Il picco di memoria viene da due run separate
+    sotto tracemalloc (che rallenta e falserebbe i tempi); la loro differenza è `peak_spread`.
+    """
+    times: List[float] = []
+    started = time.perf_counter()
+    gc.collect()
+    for i in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+        if i >= 2 and time.perf_counter() - started > budget_s:
+            break
+    peaks = []
+    for _ in range(2):  # due run: i casi a budget di tempo (pack_bnb) non esplorano sempre gli stessi nodi
+        if setup:
+            setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    peak = max(peaks)
+    times.sort()
+    p50 = _pct(times, 0.50)
+    return {
+        "name": name,
+        "items": items,
+        "runs": len(times),
+        "p50_ms": round(p50 * 1000, 3),
+        "p99_ms": round(_pct(times, 0.99) * 1000, 3),
+        "spread": round((_pct(times, 0.90) - _pct(times, 0.10)) / p50, 3) if p50 > 0 else 0.0,
+        "throughput": round(items / p50, 1) if p50 > 0 else 0.0,
+        "peak_kb": round(peak / 1024, 1),
+        "peak_spread": round(peak / min(peaks) - 1.0, 3) if min(peaks) > 0 else 0.0,
+    }
+
+def _reference_work():
+    # carico fisso in Python puro (sort, dict, float): misura la velocità della macchina, non del codice
+    x, vals = 12345, []
+    for _ in range(60000):
+        x = (x * 1103515245 + 12345) & 0x7FFFFFFF
+        vals.append(x / 0x7FFFFFFF)
+    vals.sort()
+    d = {i: v for i, v in enumerate(vals)}
+    return sum(d[i] * 1.0001 for i in range(0, len(vals), 3))
+
+class Reference:
+    """
+    Caso di riferimento per i rapporti `rel`: campionato prima di ogni caso e a fine run (interleaved),
+    e il p50 usato è la MEDIANA di tutti i campioni. Una misura storta (altro processo, turbo, GC)
+    non si propaga a tutti i casi come farebbe un'unica misura iniziale.
+    """
+
+    def __init__(self, repeat: int = 5):
+        self.repeat = repeat
+        self.samples: List[float] = []
+
+    def sample(self):
+        self.samples.append(measure(REFERENCE_CASE, _reference_work, 60000, repeat=self.repeat, budget_s=1.0)["p50_ms"])
+
+    @property
+    def p50_ms(self) -> float:
+        return statistics.median(self.samples) if self.samples else 0.0
+
+def with_rel(result: Dict[str, Any], ref: Reference) -> Dict[str, Any]:
+    p = ref.p50_ms
+    result["rel"] = round(result["p50_ms"] / p, 4) if p else 0.0
+    return result
+
+def load_baseline(path: str) -> Dict[str, Dict[str, Any]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as fh:
+        js = json.load(fh)
+    return {r["name"]: r for r in js.get("results", [])}
+
+def save_baseline(path: str, results: List[Dict[str, Any]]):
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    js = {"python": platform.python_version(), "machine": platform.machine(), "results": results}
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(js, fh, indent=1, sort_keys=True)
+        fh.write("\n")
+
+def _delta_t(result: Dict[str, Any], base: Dict[str, Any]) -> float:
+    # rapporto col caso di riferimento se entrambi lo hanno (baseline portabile tra macchine), altrimenti ms
+    if base.get("rel") and result.get("rel"):
+        return result["rel"] / base["rel"] - 1.0
+    return result["p50_ms"] / base["p50_ms"] - 1.0 if base.get("p50_ms") else 0.0
+
+def _slow(result: Dict[str, Any], base: Dict[str, Any], tolerance: float) -> bool:
+    """
+    Regressione di tempo con soglia consapevole del rumore: la tolleranza si allarga della dispersione
+    (p90-p10)/p50 del caso, la peggiore tra run e baseline, e differenze sotto NOISE_FLOOR_MS non contano.
+    """
+    if abs(result["p50_ms"] - base.get("p50_ms", 0.0)) < NOISE_FLOOR_MS:
+        return False
+    return _delta_t(result, base) > tolerance + max(result.get("spread", 0.0), base.get("spread", 0.0))
+
+def compare(result: Dict[str, Any], base: Dict[str, Any] | None, tolerance: float) -> Tuple[str, List[str]]:
+    """→ (colonna delta da stampare, lista regressioni)."""
+    if not base:
+        return "   (nuovo)", []
+    regs = []
+    d_t = _delta_t(result, base)
+    d_m = result["peak_kb"] / base["peak_kb"] - 1.0 if base.get("peak_kb") else 0.0
+    if _slow(result, base, tolerance):
+        regs.append(f"{result['name']}: p50 {base['p50_ms']}ms → {result['p50_ms']}ms (+{d_t:.0%} a parità di macchina)")
+    if d_m > tolerance + max(result.get("peak_spread", 0.0), base.get("peak_spread", 0.0)):
+        regs.append(f"{result['name']}: picco {base['peak_kb']}KB → {result['peak_kb']}KB (+{d_m:.0%})")
+    return f"{d_t:+7.0%} {d_m:+7.0%}", regs
+
+def changed(result: Dict[str, Any], base: Dict[str, Any] | None, tolerance: float) -> bool:
+    """Da riscrivere in baseline: caso nuovo, o tempo/memoria fuori dalla tolleranza (in meglio o in peggio)."""
+    if not base or not base.get("rel"):
+        return True
+    d_m = result["peak_kb"] / base["peak_kb"] - 1.0 if base.get("peak_kb") else 0.0
+    return abs(_delta_t(result, base)) > tolerance or abs(d_m) > tolerance
+
+def print_table(rows: List[Tuple[Dict[str, Any], str]]):
+    print(f"{'benchmark':<34} {'items':>7} {'runs':>4} {'p50 ms':>10} {'p99 ms':>10} {'items/s':>11} {'peak KB':>10}   Δp50    Δmem")
+    for r, delta in rows:
+        print(f"{r['name']:<34} {r['items']:>7} {r['runs']:>4} {r['p50_ms']:>10.2f} {r['p99_ms']:>10.2f} "
+              f"{r['throughput']:>11.1f} {r['peak_kb']:>10.1f} {delta}")
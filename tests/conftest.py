@@ -0,0 +1,5 @@
+# tests/conftest.py — la root del repo nel path: `pytest` da qualunque cartella importa `app` e `bench`
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
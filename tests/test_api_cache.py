@@ -0,0 +1,39 @@
+# tests/test_api_cache.py — ResponseCache: chiavi, TTL per endpoint, scadenza
+import time
+
+from app.api_cache import (ResponseCache, cache_key, pruned_key, request_cacheable,
+                           NO_CACHE, FOREVER, DEFAULT_TEAM_LAST_TTL, DEFAULT_NS_BY_ID_TTL, DEFAULT_FIXTURES_DATE_TTL)
+
+def _fixtures(*statuses):
+    return {"response": [{"fixture": {"status": {"short": s}}} for s in statuses]}
+
+def test_keys():
+    assert cache_key("/odds", {"page": 2, "date": "2025-01-01"}) == cache_key("/odds", {"date": "2025-01-01", "page": "2"})
+    assert pruned_key("/odds", {"date": "d"}) != cache_key("/odds", {"date": "d"})
+    assert not request_cacheable("/fixtures", {"live": "all"})
+    assert not request_cacheable("/fixtures/events", {"fixture": 1})
+
+def test_ttl_rules(tmp_path):
+    c = ResponseCache(str(tmp_path / "c.sqlite3"), odds_ttl=77)
+    assert c.ttl_for("/odds", {"date": "d"}, {"response": []}) == 77
+    assert c.ttl_for("/odds", {"date": "d"}, {"errors": {"rateLimit": "x"}}) == NO_CACHE
+    assert c.ttl_for("/fixtures", {"ids": "1-2"}, _fixtures("FT", "PEN")) == FOREVER
+    assert c.ttl_for("/fixtures", {"id": 1}, _fixtures("NS")) == DEFAULT_NS_BY_ID_TTL
+    assert c.ttl_for("/fixtures", {"id": 1}, _fixtures("2H")) == NO_CACHE
+    assert c.ttl_for("/fixtures", {"team": 5, "last": 10}, _fixtures("FT")) == DEFAULT_TEAM_LAST_TTL
+    assert c.ttl_for("/fixtures", {"date": "d"}, _fixtures("FT", "NS")) == DEFAULT_FIXTURES_DATE_TTL
+    assert c.ttl_for("/fixtures", {"live": "all"}, _fixtures("1H")) == NO_CACHE
+
+def test_put_get_and_expiry(tmp_path):
+    path = str(tmp_path / "c.sqlite3")
+    c = ResponseCache(path)
+    js = {"response": [{"a": 1, "b": "è"}], "paging": {"total": 1}}
+    c.put("k", js, FOREVER)
+    c.put("short", js, 1)
+    c.put("never", js, NO_CACHE)
+    assert c.get("k") == js and c.get("short") == js
+    assert c.get("never") is None and c.get("missing") is None
+    time.sleep(1.1)
+    assert c.get("short") is None
+    # riaperta: le righe senza scadenza restano, le scadute vengono pulite
+    assert ResponseCache(path).get("k") == js
@@ -0,0 +1,84 @@
+# tests/test_api_football_retry.py — un solo livello di retry, solo su 429/5xx/timeout; un 4xx costa una richiesta
+import json
+
+import pytest
+import requests
+
+from app import api_football
+from app.api_football import APIFootball, RETRIES
+from app.rate_limiter import RateScheduler
+
+class _Resp:
+    def __init__(self, status=200, body=None, headers=None):
+        self.status_code = status
+        self.ok = status < 400
+        self.headers = headers or {}
+        self.content = json.dumps(body if body is not None else {"response": [], "paging": {"total": 1}}).encode()
+        self.text = self.content.decode()
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, size):
+        for i in range(0, len(self.content), size):
+            yield self.content[i:i + size]
+
+    def close(self):
+        pass
+
+class _Session:
+    """Risposte (o eccezioni) in sequenza; conta le richieste."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None, stream=False):
+        self.calls += 1
+        r = self.script.pop(0) if len(self.script) > 1 else self.script[0]
+        if isinstance(r, Exception):
+            raise r
+        return r
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setattr(api_football.time, "sleep", lambda s: None)
+    a = APIFootball("k")
+    a.limiter = RateScheduler(per_minute=6000, burst=100)
+    return a
+
+OK = _Resp(200, {"response": [{"x": 1}], "paging": {"total": 1}})
+
+def test_5xx_and_timeouts_are_retried(api):
+    api.session = _Session(_Resp(502), requests.Timeout("lento"), OK)
+    assert api.fixtures_by_date("2025-01-01") == [{"x": 1}]
+    assert api.session.calls == 3
+
+def test_429_and_body_rate_limit_are_retried(api):
+    api.session = _Session(_Resp(429, headers={"Retry-After": "0"}),
+                           _Resp(200, {"errors": {"rateLimit": "troppe"}}, {"Retry-After": "0"}), OK)
+    assert api.fixture_by_id(1) == {"x": 1}
+    assert api.session.calls == 3
+
+def test_4xx_is_not_retried(api):
+    api.session = _Session(_Resp(403, {"message": "chiave non valida"}))
+    with pytest.raises(RuntimeError):
+        api.fixtures_by_date("2025-01-01")
+    assert api.session.calls == 1
+
+def test_bad_page_costs_at_most_retries_requests(api):
+    api.session = _Session(_Resp(500))
+    with pytest.raises(RuntimeError):
+        api.fixtures_by_date("2025-01-01")
+    assert api.session.calls == RETRIES
+    api.session = _Session(_Resp(503))
+    with pytest.raises(RuntimeError):
+        api.odds_by_date_bet365("2025-01-01")
+    assert api.session.calls == RETRIES
+
+def test_streamed_odds_page_retried_on_5xx(api):
+    bets = [{"id": 1, "name": "Match Winner", "values": [{"value": "Home", "odd": "1.50"}]}]
+    body = {"response": [{"fixture": {"id": 7}, "bookmakers": [{"id": 8, "bets": bets}]}], "paging": {"total": 1}}
+    api.session = _Session(_Resp(503), _Resp(200, body))
+    assert [e["fixture"]["id"] for e in api.odds_by_date_bet365("2025-01-01")] == [7]
+    assert api.session.calls == 2
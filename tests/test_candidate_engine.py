@@ -0,0 +1,44 @@
+# tests/test_candidate_engine.py — build_candidates (matrice NumPy) contro il ciclo _mk_candidate/_risk_veto
+import random
+
+from app import candidate_engine
+from app import value_builder as vb
+from app.api_football import APIFootball
+from bench.generators import SyntheticWorld, synthetic_feats
+
+def _row(c):
+    d = c.to_dict()
+    d["markets_all"] = dict(d["markets_all"])
+    return d
+
+def _loop(entries, feats_at):
+    out = []
+    for pos, e in enumerate(entries):
+        feats = feats_at.get(pos)
+        if feats is None:
+            continue
+        for m in vb.CANDIDATE_MARKETS:
+            c = vb._mk_candidate(e, m, feats)
+            if c is not None and not vb._risk_veto(c):
+                out.append(c)
+    return out
+
+def _entries(n: int, seed: int):
+    w = SyntheticWorld(n_fixtures=n, seed=seed, history=1)
+    names = {fid: {"home": fx["teams"]["home"]["name"], "away": fx["teams"]["away"]["name"]} for fid, fx in w.fixtures.items()}
+    return APIFootball.parse_with_index(w.odds_items, names)
+
+def test_matrix_matches_loop():
+    for seed in (1, 2, 3):
+        entries = _entries(300, seed)
+        rnd = random.Random(seed)
+        # alcune entry senza features: saltate da entrambi
+        feats_at = {pos: synthetic_feats(rnd) for pos in range(len(entries)) if rnd.random() > 0.1}
+        got = candidate_engine.build_candidates(entries, feats_at, vb.CANDIDATE_MARKETS, vb.market_category)
+        want = _loop(entries, feats_at)
+        assert want and len(got) == len(want)
+        assert [_row(c) for c in got] == [_row(c) for c in want]
+
+def test_no_features():
+    entries = _entries(20, 4)
+    assert candidate_engine.build_candidates(entries, {}, vb.CANDIDATE_MARKETS, vb.market_category) == []
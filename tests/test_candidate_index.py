@@ -0,0 +1,190 @@
+# tests/test_candidate_index.py — selezione via CandidateIndex contro la copia congelata della versione a liste; Pareto
+import random
+from collections import Counter
+from math import pow
+from typing import Any, Dict, List
+
+import pytest
+
+from app import value_builder as vb
+from app.candidate_index import CandidateIndex, pareto_mask
+from bench.generators import candidate_pool
+
+FORMATS = (("single", 1), ("double", 2), ("triple", 3), ("quint", 5), ("long", 10), ("long", 8))
+BIASES = (None, Counter({"outright": 5, "btts": 1, "totals_over": 1}), Counter({"double_chance": 3}))
+
+def _key(picks):
+    return [(p["fixture_id"], p["market"]) for p in picks]
+
+# --- copia congelata della selezione a liste del baseline (prima di CandidateIndex), costanti da vb ---
+RANGES, VALUE_TH, SAFE_TH, UPPER_CAP = vb.RANGES, vb.VALUE_TH, vb.SAFE_TH, vb.UPPER_CAP
+MIN_PMOD_PER_LEG, MIN_AVG_PMOD, SAFE_MARKETS_ORDER = vb.MIN_PMOD_PER_LEG, vb.MIN_AVG_PMOD, vb.SAFE_MARKETS_ORDER
+DIVERSITY_PROFILE = vb.DIVERSITY_PROFILE
+
+def _old_fits_range(odd: float, lo: float, hi: float) -> bool:
+    try:
+        x = float(odd); return lo <= x <= hi
+    except Exception: return False
+
+def _old_dedup_by_fixture(picks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    seen = set(); out = []
+    for p in picks:
+        fid = int(p["fixture_id"])
+        if fid in seen: continue
+        seen.add(fid); out.append(p)
+    return out
+
+def _old_diversify_league(picks: List[Dict[str, Any]], max_per_league: int = 3) -> List[Dict[str, Any]]:
+    cnt: Dict[str, int] = {}; out: List[Dict[str, Any]] = []
+    for p in picks:
+        lg = p["league"]
+        if cnt.get(lg, 0) >= max_per_league: continue
+        cnt[lg] = cnt.get(lg, 0) + 1; out.append(p)
+    return out
+
+def _old_compute_total(legs: List[Dict[str, Any]]) -> float:
+    tot = 1.0
+    for p in legs:
+        try: tot *= float(p["odd"])
+        except Exception: pass
+    return round(tot, 2)
+
+def _old_enforce_diversity(sorted_pool: List[Dict[str, Any]], n_legs: int, fmt: str,
+                       day_cat_bias: Counter | None = None) -> List[Dict[str, Any]]:
+    profile = DIVERSITY_PROFILE[fmt]
+    max_per_cat = profile["max_per_cat"]
+    min_cats = profile["min_cats"]
+    if fmt == "long" and (max_per_cat is None):
+        max_per_cat = max(2, (n_legs + 2)//3)
+
+    picks: List[Dict[str, Any]] = []
+    seen_fix = set()
+    cat_count = Counter()
+
+    for c in sorted_pool:
+        if len(picks) >= n_legs: break
+        if c["fixture_id"] in seen_fix: continue
+        cat = c["cat"]
+        if day_cat_bias and day_cat_bias.get(cat, 0) > max(0, day_cat_bias.total()//3):
+            continue
+        if max_per_cat and cat_count[cat] >= max_per_cat:
+            continue
+        fmt_key = "single" if n_legs == 1 else fmt
+        if c["p_mod"] < MIN_PMOD_PER_LEG[fmt_key]:
+            continue
+        picks.append(c); seen_fix.add(c["fixture_id"]); cat_count[cat] += 1
+
+    def cats_ok(ps: List[Dict[str, Any]]) -> bool:
+        return len({p["cat"] for p in ps}) >= min_cats
+
+    if len(picks) == n_legs and cats_ok(picks):
+        fmt_key = "single" if n_legs == 1 else fmt
+        if sum(p["p_mod"] for p in picks)/n_legs >= MIN_AVG_PMOD[fmt_key]:
+            return picks
+
+    # miglioramenti varianza/media p_mod
+    improved = picks[:]
+    pool = [c for c in sorted_pool if c not in improved]
+    for i in range(len(improved)):
+        for cand in pool:
+            if cand["fixture_id"] in {p["fixture_id"] for p in improved}: continue
+            trial = improved[:]; trial[i] = cand
+            if max_per_cat and Counter([t["cat"] for t in trial])[cand["cat"]] > max_per_cat:
+                continue
+            if not cats_ok(trial): continue
+            fmt_key = "single" if n_legs == 1 else fmt
+            if any(t["p_mod"] < MIN_PMOD_PER_LEG[fmt_key] for t in trial): continue
+            if (sum(t["p_mod"] for t in trial)/n_legs) < MIN_AVG_PMOD[fmt_key]: continue
+            improved = trial
+    if len(improved) == n_legs:
+        return improved
+    return picks[:n_legs]
+
+def _old_select_base(cands: List[Dict[str, Any]], fmt: str, n_legs: int,
+                 day_cat_bias: Counter | None = None) -> List[Dict[str, Any]]:
+    lo, hi = RANGES[fmt]
+    pool = [c for c in cands if _old_fits_range(c["odd"], lo, hi)]
+    pool.sort(key=lambda x: (x["value"], x["p_mod"], -(SAFE_MARKETS_ORDER.index(x["market"]) if x["market"] in SAFE_MARKETS_ORDER else -99)), reverse=True)
+    picks = _old_enforce_diversity(pool, n_legs, fmt, day_cat_bias=day_cat_bias)
+    picks = _old_dedup_by_fixture(picks)
+    picks = _old_diversify_league(picks, max_per_league=3)
+    fmt_key = "single" if n_legs == 1 else fmt
+    if picks and (sum(p["p_mod"] for p in picks)/len(picks) < MIN_AVG_PMOD[fmt_key]):
+        return []
+    return picks[:n_legs]
+
+def _old_reselect_to_meet_total(cands: List[Dict[str, Any]], fmt: str, n_legs: int, min_total: float,
+                            day_cat_bias: Counter | None = None) -> List[Dict[str, Any]]:
+    gm_needed = pow(float(min_total), 1.0 / n_legs)
+    cap_hi = UPPER_CAP.get(fmt, 1.45)
+    hi_pool = [c for c in cands if (c["odd"] >= gm_needed and c["odd"] <= cap_hi and (c["value"] >= VALUE_TH[fmt] or c["p_mod"] >= SAFE_TH[fmt]))]
+    hi_pool.sort(key=lambda x: (x["value"], x["p_mod"], x["odd"]), reverse=True)
+    picks = _old_enforce_diversity(hi_pool, n_legs, fmt, day_cat_bias=day_cat_bias)
+    fmt_key = "single" if n_legs == 1 else fmt
+    if not picks or (sum(p["p_mod"] for p in picks)/len(picks) < MIN_AVG_PMOD[fmt_key]):
+        return []
+    return picks if _old_compute_total(picks) >= min_total else []
+
+@pytest.fixture(scope="module", params=[(150, 1), (600, 2), (2000, 3)], ids=lambda p: f"n{p[0]}")
+def pool(request):
+    n, seed = request.param
+    return candidate_pool(n, seed=seed)
+
+def test_enforce_diversity_matches_baseline(pool):
+    for key in (vb._base_rank_key, vb._boost_rank_key):
+        ranked = sorted(pool, key=key, reverse=True)
+        for bias in BIASES:
+            for fmt, legs in FORMATS:
+                got = vb._enforce_diversity(ranked, legs, fmt, day_cat_bias=bias)
+                assert _key(got) == _key(_old_enforce_diversity(ranked, legs, fmt, day_cat_bias=bias))
+
+def test_select_base_matches_lists(pool):
+    idx = CandidateIndex(pool)
+    for bias in BIASES:
+        for fmt, legs in FORMATS:
+            assert _key(vb._select_base(idx, fmt, legs, day_cat_bias=bias)) == _key(_old_select_base(pool, fmt, legs, bias))
+
+def test_reselect_matches_lists(pool):
+    idx = CandidateIndex(pool)
+    for bias in BIASES:
+        for fmt, legs in FORMATS:
+            need = vb.MIN_TOTAL.get(fmt, 2.0)
+            got = vb._reselect_to_meet_total(idx, fmt, legs, need, day_cat_bias=bias)
+            assert _key(got) == _key(_old_reselect_to_meet_total(pool, fmt, legs, need, bias))
+
+def test_used_mask_matches_removed_fixtures(pool):
+    rnd = random.Random(4)
+    idx = CandidateIndex(pool)
+    fids = sorted({c["fixture_id"] for c in pool})
+    for _ in range(10):
+        gone = set(rnd.sample(fids, len(fids) // 3))
+        used = idx.fixture_mask([c for c in pool if c["fixture_id"] in gone])
+        rest = [c for c in pool if c["fixture_id"] not in gone]
+        for fmt, legs in FORMATS:
+            assert _key(vb._select_base(idx, fmt, legs, used=used)) == _key(_old_select_base(rest, fmt, legs))
+
+def test_pool_and_stream_in_rank_order(pool):
+    idx = CandidateIndex(pool)
+    lo, hi = vb.RANGES["triple"]
+    ck = idx.ranked("base", lo, hi, vb._base_rank_key)
+    want = sorted((c for c in pool if _old_fits_range(c["odd"], lo, hi)), key=vb._base_rank_key, reverse=True)
+    assert idx.pool(ck) == want
+    assert list(idx.stream(ck, 0, set())) == want
+
+def test_pruned_pool_is_pareto_front(pool):
+    idx = CandidateIndex(pool, prune=True)
+    lo, hi = vb.RANGES["triple"]
+    ck = idx.ranked("base", lo, hi, vb._base_rank_key)
+    ranked = sorted((c for c in pool if _old_fits_range(c["odd"], lo, hi)), key=vb._base_rank_key, reverse=True)
+    assert idx.pool(ck) == [c for c, k in zip(ranked, pareto_mask(ranked)) if k]
+
+def test_pareto_mask_matches_brute_force():
+    rnd = random.Random(7)
+    cands = [{"fixture_id": rnd.randrange(5), "cat": rnd.choice("ab"), "odd": rnd.choice([1.2, 1.3, 1.4]),
+              "p_mod": rnd.choice([0.6, 0.7, 0.8]), "value": rnd.choice([0.0, 0.02, 0.04])} for _ in range(400)]
+
+    def dominated(i):
+        c = cands[i]
+        return any(d["fixture_id"] == c["fixture_id"] and d["cat"] == c["cat"] and d["odd"] >= c["odd"]
+                   and d["p_mod"] >= c["p_mod"] and d["value"] >= c["value"] for d in cands[:i])
+    assert pareto_mask(cands) == [not dominated(i) for i in range(len(cands))]
@@ -0,0 +1,121 @@
+# tests/test_fixture_store.py — FixtureStore su SQLite temporaneo: sync intera poi delta from/to, resync 15', ultime N
+from datetime import datetime, timezone
+
+import pytest
+
+from app import fixture_store as fs
+from bench.generators import SyntheticWorld, WorldAPI
+
+LID, SEASON = 135, 2024
+
+class _CountingAPI(WorldAPI):
+    def __init__(self, world):
+        super().__init__(world)
+        self.log = []
+
+    def _fetch(self, path, params):
+        self.log.append((path, dict(params)))
+        return super()._fetch(path, params)
+
+class _Clock:
+    """Orologio finto per fixture_store: time.time() e datetime.now() dallo stesso istante."""
+
+    def __init__(self, iso):
+        self.t = datetime.fromisoformat(iso).timestamp()
+
+    def advance(self, seconds):
+        self.t += seconds
+
+    def time(self):
+        return self.t
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock("2025-03-01T12:00:00+00:00")
+
+    class _DT(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.fromtimestamp(c.t, tz or timezone.utc)
+    monkeypatch.setattr(fs, "time", c)
+    monkeypatch.setattr(fs, "datetime", _DT)
+    return c
+
+def _world(**kw):
+    # il mondo del bench a volte fa giocare una squadra contro se stessa: qui servono partite reali
+    w = SyntheticWorld(**kw)
+    for hist in w._history.values():
+        hist[:] = [fx for fx in hist if fx["teams"]["home"]["id"] != fx["teams"]["away"]["id"]]
+    return w
+
+def _closed(w, team_id=None):
+    out = w.league_fixtures(LID, fs.CLOSED_PARAM)
+    if team_id is not None:
+        out = [fx for fx in out if team_id in (fx["teams"]["home"]["id"], fx["teams"]["away"]["id"])]
+    return out
+
+def _new_fixture(fid, team_id, day, st="FT"):
+    return {
+        "fixture": {"id": fid, "date": f"{day}T15:00:00+00:00",
+                    "timestamp": int(datetime.fromisoformat(f"{day}T15:00:00+00:00").timestamp()), "status": {"short": st}},
+        "league": {"id": LID, "season": SEASON},
+        "teams": {"home": {"id": team_id}, "away": {"id": team_id + 1}},
+        "goals": {"home": 2, "away": 1},
+    }
+
+def test_full_season_then_incremental_from_to(tmp_path, clock):
+    w = _world(n_fixtures=20, seed=5, history=10)
+    api = _CountingAPI(w)
+    store = fs.FixtureStore(str(tmp_path / "fx.sqlite"))
+
+    assert store.sync_league(api, LID, SEASON) == len(_closed(w))
+    (path, params), = api.log
+    assert path == "/fixtures" and params["league"] == LID and params["season"] == SEASON
+    assert params["status"] == fs.CLOSED_PARAM and "from" not in params and "to" not in params
+
+    # il giorno dopo arrivano una partita conclusa, una rinviata e una da giocare: il delta parte dal giorno dell'ultimo sync
+    team = LID * 1000
+    w._history[team][:0] = [_new_fixture(99_000_001, team, "2025-03-02"), _new_fixture(99_000_002, team, "2025-03-02", "PST"),
+                          _new_fixture(99_000_003, team, "2025-03-03", "NS")]
+    clock.advance(86400)
+    api.log.clear()
+    assert store.sync_league(api, LID, SEASON) == 2
+    (_, params), = api.log
+    assert params["from"] == "2025-03-01" and params["to"] == "2025-03-02"
+    assert len(store.league_fixtures(LID, SEASON)) == len(_closed(w))
+
+def test_resync_only_after_window(tmp_path, clock):
+    w = _world(n_fixtures=20, seed=5, history=3)
+    api = _CountingAPI(w)
+    store = fs.FixtureStore(str(tmp_path / "fx.sqlite"))
+    store.sync_league(api, LID, SEASON)
+    api.log.clear()
+
+    clock.advance(14 * 60)
+    assert store.sync_league(api, LID, SEASON) == 0
+    assert api.log == []  # dentro i 15 minuti: nessuna richiesta
+
+    clock.advance(2 * 60)
+    store.sync_league(api, LID, SEASON)
+    assert len(api.log) == 1
+    # lo stato sopravvive alla riapertura del file
+    again = fs.FixtureStore(str(tmp_path / "fx.sqlite"))
+    api.log.clear()
+    assert again.sync_league(api, LID, SEASON) == 0 and api.log == []
+
+def test_team_last_is_latest_closed_filtered_to_finished(tmp_path, clock):
+    w = _world(n_fixtures=20, seed=6, history=10)
+    store = fs.FixtureStore(str(tmp_path / "fx.sqlite"))
+    store.sync_league(WorldAPI(w), LID, SEASON)
+
+    for team in range(LID * 1000, LID * 1000 + 20):
+        closed = sorted(_closed(w, team), key=lambda fx: (fx["fixture"]["timestamp"], fx["fixture"]["id"]), reverse=True)
+        for n in (1, 5, 10, 40):
+            # come /fixtures?team=&last=n: le rinviate contano nella finestra, poi restano le concluse
+            want = [fx for fx in closed[:n] if fx["fixture"]["status"]["short"] in fs.FINISHED]
+            got = store.team_last(team, LID, SEASON, last=n)
+            assert [fx["fixture"]["id"] for fx in got] == [fx["fixture"]["id"] for fx in want]
+            assert [(fx["goals"]["home"], fx["goals"]["away"]) for fx in got] == \
+                   [(fx["goals"]["home"], fx["goals"]["away"]) for fx in want]
+    assert store.team_last(LID * 1000, LID, SEASON + 1) == []
+    assert store.team_last(LID * 1000, 136, SEASON) == []
@@ -0,0 +1,66 @@
+# tests/test_fixtures_ids.py — /fixtures?ids= a blocchi da IDS_BATCH: numero di richieste, risultato unito, cache
+import random
+
+from app.api_football import APIFootball, IDS_BATCH
+from bench.generators import SyntheticWorld
+
+class _WorldNet(APIFootball):
+    """APIFootball intero (cache, singleflight, _fetch) con solo la rete sostituita dal mondo sintetico."""
+
+    def __init__(self, world, **kw):
+        super().__init__("test", **kw)
+        self.world = world
+        self.log = []
+
+    def _request(self, path, params, read, stream=False):
+        self.log.append((path, dict(params)))
+        return self.world.respond(path, params)
+
+def _ids_calls(api):
+    return [p["ids"].split("-") for path, p in api.log if path == "/fixtures" and "ids" in p]
+
+def _by_status(w, *statuses):
+    return [fid for fid, fx in w.fixtures.items() if fx["fixture"]["status"]["short"] in statuses]
+
+def test_batches_of_ids_and_merged_result():
+    w = SyntheticWorld(n_fixtures=120, seed=8, history=1)
+    api = _WorldNet(w)
+    ids = random.Random(1).sample(list(w.fixtures), 57) + [42]  # 42: id sconosciuto, semplicemente assente
+    got = api.fixtures_by_ids(ids)
+
+    calls = _ids_calls(api)
+    assert len(calls) == -(-len(ids) // IDS_BATCH)
+    assert all(len(c) <= IDS_BATCH for c in calls)
+    assert [int(x) for c in calls for x in c] == ids  # ogni id richiesto una volta, nell'ordine dato
+    assert got == [w.fixtures[i] for i in ids if i in w.fixtures]
+
+    api.log.clear()
+    index = api.fixture_index(ids)
+    assert len(_ids_calls(api)) == -(-len(ids) // IDS_BATCH) and len(api.log) == len(_ids_calls(api))
+    assert set(index) == set(ids) - {42}
+    for fid, row in index.items():
+        fx = w.fixtures[fid]
+        assert (row["home"], row["away"]) == (fx["teams"]["home"]["name"], fx["teams"]["away"]["name"])
+        assert (row["home_id"], row["away_id"]) == (fx["teams"]["home"]["id"], fx["teams"]["away"]["id"])
+        assert row["league"] == fx["league"]
+
+def test_ids_blocks_are_cached_by_status(tmp_path):
+    w = SyntheticWorld(n_fixtures=300, seed=9, history=1)
+    done = _by_status(w, "FT")[:IDS_BATCH]
+    upcoming = _by_status(w, "NS")[:IDS_BATCH]
+    live = _by_status(w, "1H", "2H")[:IDS_BATCH]
+    ids = done + upcoming + live
+
+    api = _WorldNet(w, cache_path=str(tmp_path / "cache.sqlite3"))
+    first = api.fixtures_by_ids(ids)
+    assert len(_ids_calls(api)) == 3
+
+    # blocco tutto concluso: per sempre; tutto da iniziare: TTL breve ma ancora valido; con partite live: mai
+    api.log.clear()
+    assert api.fixtures_by_ids(ids) == first
+    assert _ids_calls(api) == [[str(x) for x in live]]
+
+    # la cache è su disco: una nuova istanza rilegge i blocchi conclusi senza rete
+    again = _WorldNet(w, cache_path=str(tmp_path / "cache.sqlite3"))
+    assert again.fixtures_by_ids(done) == [w.fixtures[i] for i in done]
+    assert again.log == []
@@ -0,0 +1,42 @@
+# tests/test_index_resolver.py — nomi squadra delle pagine /odds in streaming: ids= a blocchi pieni, niente date=
+from app.api_football import IDS_BATCH
+from bench.generators import SyntheticWorld, WorldAPI
+
+class _CountingAPI(WorldAPI):
+    def __init__(self, world):
+        super().__init__(world)
+        self.log = []
+
+    def _fetch(self, path, params):
+        self.log.append((path, dict(params)))
+        return super()._fetch(path, params)
+
+def _rows(entries):
+    return [(e["fixture_id"], e["home"], e["away"], e["home_id"], e["away_id"]) for e in entries]
+
+def _fixture_calls(api):
+    return [p for path, p in api.log if path == "/fixtures"]
+
+def test_streamed_pages_share_ids_calls():
+    w = SyntheticWorld(n_fixtures=95, seed=3, history=1)
+    api = _CountingAPI(w)
+    got = list(api.iter_odds_entries_bet365(w.date))
+    calls = _fixture_calls(api)
+    assert all("ids" in p for p in calls)  # nessuna /fixtures?date=
+    assert len(calls) == -(-len(w.odds_items) // IDS_BATCH)
+    assert all(len(p["ids"].split("-")) <= IDS_BATCH for p in calls)
+    # stesso risultato del parsing non in streaming
+    assert _rows(got) == _rows(WorldAPI(w).parse_odds_entries(w.odds_items, date=w.date))
+    assert all(e["home"] and e["home"].lower() != "home" for e in got)
+
+def test_snapshot_refresh_resolves_only_stale():
+    w = SyntheticWorld(n_fixtures=60, seed=4, history=1)
+    api = _CountingAPI(w)
+    entries, changed = api.refresh_odds_snapshot(w.date)
+    assert len(changed) == len(entries) == len(w.odds_items)
+    assert len(_fixture_calls(api)) == -(-len(w.odds_items) // IDS_BATCH)
+
+    api.log.clear()
+    again, changed = api.refresh_odds_snapshot(w.date)
+    assert not changed and not _fixture_calls(api)
+    assert _rows(again) == _rows(entries)
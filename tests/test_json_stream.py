@@ -0,0 +1,56 @@
+# tests/test_json_stream.py — JSONObjectStream contro json.loads con chunk di taglia casuale
+import json
+import random
+
+import pytest
+
+from app.json_stream import JSONObjectStream
+
+def _value(rnd: random.Random, depth: int = 0):
+    t = rnd.random()
+    if depth > 2 or t < 0.4:
+        return rnd.choice([
+            rnd.randint(-10**6, 10**6),
+            round(rnd.uniform(-1e4, 1e4), rnd.randint(0, 6)),
+            rnd.uniform(-1, 1) * 10 ** rnd.randint(-8, 12),
+            12345500.0, 1.5, True, False, None, f"sè {rnd.randint(0, 99)} ✓",
+        ])
+    if t < 0.7:
+        return [_value(rnd, depth + 1) for _ in range(rnd.randint(0, 4))]
+    return {f"k{i}": _value(rnd, depth + 1) for i in range(rnd.randint(0, 4))}
+
+def _chunks(raw: bytes, rnd: random.Random, max_size: int):
+    i = 0
+    while i < len(raw):
+        k = rnd.randint(1, max_size)
+        yield raw[i:i + k]
+        i += k
+
+def _decode(chunks):
+    st = JSONObjectStream(chunks, array_key="response")
+    items = list(st.items())
+    out = dict(st.meta)
+    out["response"] = items
+    return out
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_chunk_sizes_match_json_loads(seed):
+    rnd = random.Random(seed)
+    for _ in range(50):
+        doc = {"get": "odds", "paging": {"current": 1, "total": rnd.randint(1, 9)},
+               "response": [_value(rnd) for _ in range(rnd.randint(0, 6))], "results": rnd.randint(0, 100)}
+        raw = json.dumps(doc, ensure_ascii=False, indent=rnd.choice([None, 1])).encode()
+        assert _decode(_chunks(raw, rnd, rnd.choice([1, 3, 8, 64]))) == json.loads(raw)
+
+@pytest.mark.parametrize("parts", [
+    [b'{"a":1.', b'5,"response":[]}'],
+    [b'{"response":[12345500.', b'0]}'],
+    [b'{"response":[-1e', b'3, 12', b'34]}'],
+    [b'{"response":[tr', b'ue, nu', b'll]}'],
+])
+def test_number_split_across_chunks(parts):
+    assert _decode(parts) == json.loads(b"".join(parts))
+
+def test_truncated_document_raises():
+    with pytest.raises(ValueError):
+        _decode([b'{"response":[1, 2'])
@@ -0,0 +1,85 @@
+# tests/test_league_prefetch.py — storico da /fixtures?league= (API o FixtureStore) uguale al per-squadra last=10
+import random
+
+import pytest
+
+from app.fixture_store import FINISHED, FixtureStore
+from app.stats_engine import StatsEngine
+from bench.generators import WorldAPI
+
+LID, SEASON = 135, 2024
+TEAMS = list(range(LID * 1000, LID * 1000 + 12))
+
+class _League:
+    """
+    Una stagione coerente: le stesse partite rispondono a /fixtures?team=&last= (ultime chiuse, poi
+    l'API le restituisce tutte e il chiamante filtra) e a /fixtures?league=&status=.
+    """
+
+    def __init__(self, seed=1, rounds=16, void_rate=0.15):
+        rnd = random.Random(seed)
+        self.fixtures = []
+        fid = 5_000_000
+        for r in range(rounds):
+            teams = TEAMS[:]
+            rnd.shuffle(teams)
+            for home, away in zip(teams[::2], teams[1::2]):
+                ts = 1_730_000_000 + r * 7 * 86400 + rnd.randrange(0, 3) * 3600
+                if r >= rounds - 2:
+                    st = "NS"
+                else:
+                    st = rnd.choice(("PST", "CANC")) if rnd.random() < void_rate else rnd.choice(("FT", "FT", "FT", "AET", "PEN"))
+                played = st in FINISHED
+                self.fixtures.append({
+                    "fixture": {"id": fid, "timestamp": ts, "status": {"short": st}},
+                    "league": {"id": LID, "season": SEASON},
+                    "teams": {"home": {"id": home}, "away": {"id": away}},
+                    "goals": {"home": rnd.randint(0, 4) if played else None, "away": rnd.randint(0, 3) if played else None},
+                })
+                fid += 1
+
+    def respond(self, path, params):
+        if path != "/fixtures":
+            return {"response": []}
+        if "team" in params:
+            t = int(params["team"])
+            past = [fx for fx in self.fixtures if fx["fixture"]["status"]["short"] != "NS"
+                    and t in (fx["teams"]["home"]["id"], fx["teams"]["away"]["id"])]
+            past.sort(key=lambda fx: (fx["fixture"]["timestamp"], fx["fixture"]["id"]), reverse=True)
+            return {"response": past[:int(params.get("last") or 10)]}
+        if "league" in params:
+            sts = str(params.get("status") or "").split("-")
+            return {"paging": {"current": 1, "total": 1},
+                    "response": [fx for fx in self.fixtures if fx["fixture"]["status"]["short"] in sts]}
+        return {"response": []}
+
+def _ids(fixtures):
+    return [fx["fixture"]["id"] for fx in fixtures]
+
+def _per_team(league):
+    se = StatsEngine(WorldAPI(league))
+    return {t: _ids(se._get_team_last(t, LID, SEASON, 10)) for t in TEAMS}
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_league_prefetch_equals_per_team_last10(seed):
+    league = _League(seed=seed)
+    want = _per_team(league)
+    assert any(len(v) < 10 for v in want.values())  # rinviate tra le ultime 10: restano meno di 10 concluse
+
+    api = WorldAPI(league)
+    se = StatsEngine(api)
+    assert se.prefetch_leagues([(LID, SEASON)]) == 1
+    assert {t: _ids(se._get_team_last(t, LID, SEASON, 10)) for t in TEAMS} == want
+    assert api.calls == 1  # una pagina di lega al posto di una richiesta per squadra
+
+def test_store_prefetch_and_team_last_equal_per_team_last10(tmp_path):
+    league = _League(seed=4, void_rate=0.25)
+    want = _per_team(league)
+    assert any(len(v) < 10 for v in want.values())
+
+    store = FixtureStore(str(tmp_path / "fx.sqlite"))
+    se = StatsEngine(WorldAPI(league), store=store)
+    se.prefetch_leagues([(LID, SEASON)])
+    assert {t: _ids(se._get_team_last(t, LID, SEASON, 10)) for t in TEAMS} == want
+    # senza prefetch: team_last del FixtureStore
+    assert {t: _ids(store.team_last(t, LID, SEASON, 10)) for t in TEAMS} == want
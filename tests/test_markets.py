@@ -0,0 +1,100 @@
+# tests/test_markets.py — parser a registro contro il parser if/elif originale su blocchi casuali
+import random
+
+import pytest
+
+from app.api_football import APIFootball
+from app.markets import REQUIRED_MARKETS, configure_markets
+
+# --- parser originale (prima del registro), congelato ---
+_EXCLUDE_PARTIAL = ("half", "period", "1st", "2nd", "first half", "second half")
+
+def _put(out, key, val):
+    if val is None:
+        return
+    try:
+        x = float(val)
+    except Exception:
+        return
+    if x <= 1.06:
+        return
+    if key not in out or x < out[key]:
+        out[key] = x
+
+def _old_parse_market_block(bets):
+    out = {}
+    for bet in bets:
+        name = (bet.get("name", "") or "").lower().strip()
+        vals = bet.get("values", []) or []
+        if any(tok in name for tok in _EXCLUDE_PARTIAL):
+            continue
+        if name == "match winner" or name == "winner":
+            for v in vals:
+                val = (v.get("value", "") or "").lower(); odd = v.get("odd")
+                if val.startswith("home") or val == "1": _put(out, "1", odd)
+                elif val.startswith("away") or val == "2": _put(out, "2", odd)
+                elif val.startswith("draw") or val == "x": _put(out, "X", odd)
+        elif name == "double chance":
+            for v in vals:
+                lab = (v.get("value", "") or "").lower(); odd = v.get("odd")
+                if "home/draw" in lab or lab in ("1x", "home or draw"): _put(out, "1X", odd)
+                elif "home/away" in lab or lab == "12" or "home or away" in lab: _put(out, "12", odd)
+                elif "draw/away" in lab or lab in ("x2", "draw or away", "away or draw"): _put(out, "X2", odd)
+        elif name in ("goals over/under", "total"):
+            for v in vals:
+                lab = (v.get("value", "") or "").lower().replace(" ", ""); odd = v.get("odd")
+                if lab in ("over0.5", "o0.5"): _put(out, "Over 0.5", odd)
+                elif lab in ("over1.5", "o1.5"): _put(out, "Over 1.5", odd)
+                elif lab in ("over2.5", "o2.5"): _put(out, "Over 2.5", odd)
+                elif lab in ("under2.5", "u2.5"): _put(out, "Under 2.5", odd)
+                elif lab in ("under3.5", "u3.5"): _put(out, "Under 3.5", odd)
+        elif name in ("both teams to score", "goal/no goal"):
+            for v in vals:
+                lab = (v.get("value", "") or "").lower(); odd = v.get("odd")
+                if "yes" in lab: _put(out, "Gol", odd)
+                elif "no" in lab: _put(out, "No Gol", odd)
+    return {k: out[k] for k in REQUIRED_MARKETS if k in out}
+
+_NAMES = ("Match Winner", "match winner ", "Winner", "Double Chance", "Goals Over/Under", "Total", "Both Teams To Score",
+          "Goal/No Goal", "Goals Over/Under First Half", "1st Half Winner", "Second Half Winner", "Double Chance - 2nd Half",
+          "Asian Handicap", "Exact Score", "Both Teams To Score - Period", "", None)
+_LABELS = ("Home", "home", "HOME ", "1", "Draw", "draw", "x", "X", "Away", "away", "2", "Home/Draw", "Home/Away", "Draw/Away",
+           "home or draw", "Home or Away", "draw or away", "Away or Draw", "1X", "12", "X2", "x2", "Over 0.5", "O1.5",
+           "over 2.5", "Over2.5", "Under 2.5", "u3.5", "Under 3.5", "Over 3.5", "Under 1.5", "Yes", "No", "yes please",
+           "nope", "Home -0.5", "Away +1", "", None)
+
+def _odd(rnd):
+    return rnd.choice([f"{rnd.uniform(1.0, 9.0):.2f}", "1.06", "1.07", "1.05", 1.5, None, "", "n/d", "2"])
+
+def _block(rnd):
+    return [{"id": rnd.randint(1, 99), "name": rnd.choice(_NAMES),
+             "values": [{"value": rnd.choice(_LABELS), "odd": _odd(rnd)} for _ in range(rnd.randint(0, 6))]}
+            for _ in range(rnd.randint(0, 8))]
+
+@pytest.fixture
+def registry():
+    yield configure_markets
+    configure_markets(None)
+
+def test_registry_matches_old_parser(registry):
+    registry(None)  # EXTRA_MARKETS spento
+    rnd = random.Random(2024)
+    for _ in range(20000):
+        bets = _block(rnd)
+        assert APIFootball._parse_market_block(bets) == _old_parse_market_block(bets)
+
+def test_extras_do_not_change_standard_markets(registry):
+    registry("Over 3.5,Under 1.5,AH1 -0.5")
+    rnd = random.Random(7)
+    for _ in range(5000):
+        bets = _block(rnd)
+        got = APIFootball._parse_market_block(bets)
+        assert {k: v for k, v in got.items() if k in REQUIRED_MARKETS} == _old_parse_market_block(bets)
+
+def test_extras_parsed_when_enabled(registry):
+    registry("Over 3.5,AH1 -0.5")
+    bets = [{"name": "Goals Over/Under", "values": [{"value": "Over 3.5", "odd": "2.40"}, {"value": "Over 1.5", "odd": "1.30"}]},
+            {"name": "Asian Handicap", "values": [{"value": "Home -0.5", "odd": "1.90"}]}]
+    assert APIFootball._parse_market_block(bets) == {"Over 1.5": 1.30, "Over 3.5": 2.40, "AH1 -0.5": 1.90}
+    registry(None)
+    assert APIFootball._parse_market_block(bets) == {"Over 1.5": 1.30}
@@ -0,0 +1,39 @@
+# tests/test_pack_optimizer.py — branch-and-bound contro il pack greedy; la potatura di Pareto non cambia l'ottimo
+import pytest
+
+from app import pack_optimizer
+from app import value_builder as vb
+from bench.generators import candidate_pool
+
+def _score(plan):
+    return vb._pack_score(vb._plan_tickets(plan)) if any(plan.values()) else -1.0
+
+@pytest.fixture(scope="module", params=[(60, 1), (120, 2), (200, 3)], ids=lambda p: f"n{p[0]}")
+def pool(request):
+    n, seed = request.param
+    return candidate_pool(n, seed=seed)
+
+def test_never_worse_than_greedy(pool):
+    plan, info = pack_optimizer.search_pack(pool, 10, 2000)
+    assert info["score"] >= info["greedy_score"]
+    assert info["greedy_score"] == round(_score(vb._choose_best_pack(pool, 10)), 6)
+    assert info["score"] == round(_score(plan), 6)
+
+def test_plan_respects_constraints(pool):
+    plan, _ = pack_optimizer.search_pack(pool, 10, 2000)
+    legs = [c for v in plan.values() for c in v]
+    assert len({c["fixture_id"] for c in legs}) == len(legs)  # fixture disgiunte in tutto il pack
+    for fmt, ticket in vb._plan_tickets(plan):
+        # soglie del formato (il greedy può lasciare una doppia a una sola leg)
+        assert all(c["p_mod"] >= vb.MIN_PMOD_PER_LEG[fmt] for c in ticket)
+        assert sum(c["p_mod"] for c in ticket) / len(ticket) >= vb.MIN_AVG_PMOD[fmt]
+        if fmt in vb.MIN_TOTAL:
+            assert vb._compute_total(ticket) >= vb.MIN_TOTAL[fmt]
+
+def test_pareto_pruning_keeps_optimum(pool, monkeypatch):
+    _, pruned = pack_optimizer.search_pack(pool, 10, 5000)
+    monkeypatch.setattr(pack_optimizer, "pareto_front", list)
+    _, full = pack_optimizer.search_pack(pool, 10, 5000)
+    if pruned["timed_out"] or full["timed_out"]:
+        pytest.skip("budget esaurito: ottimo non garantito")
+    assert pruned["score"] == full["score"]
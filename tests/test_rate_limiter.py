@@ -0,0 +1,111 @@
+# tests/test_rate_limiter.py — token bucket con orologio finto: priorità, riserva giornaliera, header e 429
+import threading
+import time
+
+import pytest
+
+from app.rate_limiter import RateScheduler, PRIO_LIVE, PRIO_INTERACTIVE, PRIO_BULK, priority_for
+
+class _Clock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+def _advance(rs, clock, dt):
+    # l'orologio finto non sveglia nessuno: un update_from_headers vuoto fa notify_all come una risposta vera
+    clock.t += dt
+    rs.update_from_headers({})
+
+def _wait_queued(rs, n):
+    deadline = time.monotonic() + 5
+    while len(rs._waiters) < n:
+        assert time.monotonic() < deadline, "thread mai arrivati in coda"
+        time.sleep(0.001)
+
+def test_priority_for_jobs():
+    assert priority_for("live") == PRIO_LIVE
+    assert priority_for("morning") == PRIO_BULK
+    assert priority_for("sconosciuto") == PRIO_INTERACTIVE
+
+def test_burst_then_refill_arithmetic():
+    clock = _Clock()
+    rs = RateScheduler(per_minute=600, burst=3, clock=clock)  # 10 token/s
+    for _ in range(3):
+        rs.acquire()
+    assert rs._tokens == 0.0
+    clock.t += 0.25  # 2.5 token
+    rs.acquire()
+    assert rs._tokens == pytest.approx(1.5)
+    clock.t += 60  # mai oltre il burst
+    rs.acquire()
+    assert rs._tokens == pytest.approx(2.0)
+
+def test_waits_until_clock_gives_a_token():
+    clock = _Clock()
+    rs = RateScheduler(per_minute=600, burst=1, clock=clock)
+    rs.acquire()
+    t = threading.Thread(target=rs.acquire)
+    t.start()
+    _wait_queued(rs, 1)
+    t.join(0.05)
+    assert t.is_alive()  # orologio fermo: nessun token
+    _advance(rs, clock, 0.1)
+    t.join(5)
+    assert not t.is_alive() and rs._tokens == pytest.approx(0.0)
+
+def test_live_served_before_queued_bulk():
+    clock = _Clock()
+    rs = RateScheduler(per_minute=600, burst=1, clock=clock)
+    rs.acquire()
+    order = []
+
+    def take(prio, tag):
+        rs.acquire(prio)
+        order.append(tag)
+    threads = [threading.Thread(target=take, args=(PRIO_BULK, f"bulk{i}")) for i in range(3)]
+    for t in threads:
+        t.start()
+    _wait_queued(rs, 3)
+    live = threading.Thread(target=take, args=(PRIO_LIVE, "live"))
+    live.start()
+    _wait_queued(rs, 4)
+    for n in range(1, 5):  # un token alla volta
+        _advance(rs, clock, 0.1)
+        deadline = time.monotonic() + 5
+        while len(order) < n:
+            assert time.monotonic() < deadline
+            time.sleep(0.001)
+    for t in threads + [live]:
+        t.join(5)
+    assert order[0] == "live" and sorted(order[1:]) == ["bulk0", "bulk1", "bulk2"]
+
+def test_daily_reserve_blocks_only_bulk():
+    rs = RateScheduler(per_minute=6000, burst=10, daily_reserve=100, clock=_Clock())
+    rs.update_from_headers({"x-ratelimit-requests-remaining": "50"})
+    with pytest.raises(RuntimeError):
+        rs.acquire(PRIO_BULK)
+    rs.acquire(PRIO_LIVE)
+    rs.acquire(PRIO_INTERACTIVE)
+
+def test_headers_update_limits():
+    rs = RateScheduler(per_minute=30, clock=_Clock())
+    rs.update_from_headers({"X-RateLimit-Limit": "300", "X-RateLimit-Remaining": "0", "x-ratelimit-requests-remaining": "x"})
+    assert rs.per_minute == 300 and rs.capacity == 30.0
+    assert rs.minute_remaining == 0 and rs._tokens == 0.0 and rs.daily_remaining is None
+
+def test_rate_limited_pauses_until_retry_after():
+    clock = _Clock()
+    rs = RateScheduler(per_minute=6000, burst=10, clock=clock)
+    rs.on_rate_limited("30")
+    assert rs._tokens == 0.0 and rs._paused_until == clock.t + 30
+    t = threading.Thread(target=rs.acquire, args=(PRIO_LIVE,))
+    t.start()
+    _wait_queued(rs, 1)
+    _advance(rs, clock, 29)  # bucket pieno ma ancora in pausa
+    t.join(0.05)
+    assert t.is_alive()
+    _advance(rs, clock, 1)
+    t.join(5)
+    assert not t.is_alive()
@@ -0,0 +1,73 @@
+# tests/test_singleflight.py — chiamate concorrenti sulla stessa chiave eseguite una volta sola
+import threading
+import time
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+def _concurrent(sf, key, fn, n=8):
+    results, errors = [], []
+    start = threading.Barrier(n)
+
+    def worker():
+        start.wait()
+        try:
+            results.append(sf.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+def test_concurrent_calls_share_one_result():
+    sf = SingleFlight()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"n": len(calls)}
+    results, errors = _concurrent(sf, "k", fn)
+    assert not errors and len(calls) == 1
+    assert all(r is results[0] for r in results)
+
+def test_error_is_shared_and_key_released():
+    sf = SingleFlight()
+    calls = []
+
+    def boom():
+        calls.append(1)
+        time.sleep(0.1)
+        raise RuntimeError("giù")
+    results, errors = _concurrent(sf, "k", boom)
+    assert not results and len(errors) == 8 and len(calls) == 1
+    # nessuna cache: finita la chiamata la chiave si rifà
+    assert sf.do("k", lambda: 42) == 42
+
+def test_distinct_keys_run_separately():
+    sf = SingleFlight()
+    assert [sf.do(k, lambda k=k: k * 2) for k in range(3)] == [0, 2, 4]
+    with pytest.raises(ValueError):
+        sf.do("x", lambda: int("x"))
+
+def test_api_get_coalesces_concurrent_identical_requests():
+    from bench.generators import SyntheticWorld, WorldAPI
+    w = SyntheticWorld(n_fixtures=20, seed=1, history=1)
+    api = WorldAPI(w, latency_ms=100)
+    fid = next(iter(w.fixtures))
+    results = []
+    start = threading.Barrier(6)
+
+    def worker():
+        start.wait()
+        results.append(api.fixture_by_id(fid))
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert api.calls == 1 and len(results) == 6 and all(r is results[0] for r in results)
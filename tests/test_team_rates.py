@@ -0,0 +1,43 @@
+# tests/test_team_rates.py — rates_batch (NumPy) contro StatsEngine._rates_from_last, squadra per squadra
+import random
+
+from app.stats_engine import StatsEngine
+from app.team_rates import rates_batch
+from bench.generators import SyntheticWorld
+
+def _fx(home_id: int, away_id: int, gh, ga):
+    return {"teams": {"home": {"id": home_id}, "away": {"id": away_id}}, "goals": {"home": gh, "away": ga}}
+
+def _random_history(rnd: random.Random, team_id: int):
+    out = []
+    for _ in range(rnd.randint(0, 12)):
+        other = rnd.randint(1000, 2000)
+        gh, ga = rnd.randint(0, 6), rnd.randint(0, 6)
+        t = rnd.random()
+        if t < 0.05:
+            out.append({"teams": {}})            # dati rotti
+        elif t < 0.1:
+            out.append(_fx(team_id, other, None, ga))  # gol mancanti = 0
+        elif t < 0.55:
+            out.append(_fx(team_id, other, gh, ga))
+        else:
+            out.append(_fx(other, team_id, gh, ga))
+    return out
+
+def _loop(items):
+    se = StatsEngine(None)
+    return [se._rates_from_last(t, last) for t, last in items]
+
+def test_rates_batch_matches_loop_on_synthetic_world():
+    w = SyntheticWorld(n_fixtures=200, seed=5)
+    items = [(t, w.history(t)) for t in w.team_ids()]
+    assert rates_batch(items) == _loop(items)
+
+def test_rates_batch_matches_loop_on_edge_cases():
+    rnd = random.Random(9)
+    items = [(t, _random_history(rnd, t)) for t in range(1, 400)]
+    items += [(7, []), (8, [{"teams": {}}]), (9, [_fx(9, 1, 9, 0)] * 3)]  # vuoto, rotto, clamp alto
+    assert rates_batch(items) == _loop(items)
+
+def test_rates_batch_empty():
+    assert rates_batch([]) == []
@@ -0,0 +1,44 @@
+# tests/test_value_builder_incremental.py — build_daily_candidates che riusa le fixture invariate contro un calcolo da zero
+from app import value_builder as vb
+from app.api_football import SNAPSHOT_DATES
+from bench.generators import SyntheticWorld, WorldAPI
+
+class _Cfg:
+    TZ = "Europe/Rome"
+
+def _key(cands):
+    return [(c["fixture_id"], c["market"], c["odd"], c["p_mod"], c["value"]) for c in cands]
+
+def _build(api, w):
+    stats = {}
+    return vb.build_daily_candidates(api, _Cfg(), w.date, stats=stats), stats
+
+def test_reuse_matches_fresh_build():
+    w = SyntheticWorld(n_fixtures=300, seed=13)
+    api = WorldAPI(w)
+    first, st = _build(api, w)
+    assert first and st["reused"] == 0 and st["recomputed"] > 0
+    again, st = _build(api, w)
+    assert _key(again) == _key(first)
+    assert st["recomputed"] == 0 and st["reused"] > 0
+
+    # quote cambiate su una fixture: solo quella si ricalcola, il risultato è quello da zero
+    it = w.odds_items[5]
+    it["update"] = w.date + "T09:00:00+00:00"
+    for bet in it["bookmakers"][0]["bets"]:
+        for v in bet["values"]:
+            v["odd"] = "%.2f" % (float(v["odd"]) + 0.05)
+    changed, st = _build(api, w)
+    assert st["recomputed"] == 1
+    assert _key(changed) == _key(_build(WorldAPI(w), w)[0])
+    assert _key(changed) != _key(first)
+
+def test_cache_lives_on_the_client_and_is_bounded():
+    w = SyntheticWorld(n_fixtures=40, seed=2)
+    a, b = WorldAPI(w), WorldAPI(w)
+    _build(a, w)
+    _, st = _build(b, w)  # altro client: niente riuso
+    assert st["reused"] == 0
+    for d in ("2025-01-01", "2025-01-02", "2025-01-03", "2025-01-04"):
+        a.store_day_candidates(d, {})
+    assert len(a._day_cands) == SNAPSHOT_DATES and w.date not in a._day_cands